@@ -1,16 +1,12 @@
-from langchain_openai import ChatOpenAI
-
-from langchain_core.output_parsers import JsonOutputParser
+# from parsers import parse_python_code_from_text
+from llmregistry import LLMClientRegistry
+from parsers import parse_tools_and_plan, AppStreamParser
 
-from langchain.prompts import PromptTemplate
-from langchain.prompts.chat import (
-    ChatPromptTemplate,
-    SystemMessagePromptTemplate,
-    HumanMessagePromptTemplate
-)
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property
+from typing import Callable
 
-from prompts.abstract_templates import generate_abstract_tool_template, generate_abstract_plan_template
-# from parsers import parse_python_code_from_text
+import time
 
 
 class AbstractPlanner():
@@ -21,20 +17,99 @@ class AbstractPlanner():
     The purpose is to dissallow malicious apps to interfere with the planning process.
     """
 
-    def __init__(self):
-        self.toolgen_llm: ChatOpenAI = ChatOpenAI(model="Qwen/Qwen2.5-72B-Instruct", temperature=0.0,
-                                                  openai_api_base="http://localhost:8000/v1")
-        self.plan_llm: ChatOpenAI = ChatOpenAI(model="Qwen/Qwen2.5-72B-Instruct", temperature=0.0,
-                                               openai_api_base="http://localhost:8000/v1")
-        self.toolgen_template: ChatPromptTemplate = generate_abstract_tool_template()
-        self.plangen_template: ChatPromptTemplate = generate_abstract_plan_template()
+    def __init__(self, llm_clients: LLMClientRegistry = None, mode: str = "two_call"):
+        """
+        params:
+            llm_clients: Shared, pooled LLM clients. Tool and plan generation are the "toolgen" and "plan" stages.
+            mode: "two_call" generates the abstract tools, then the plan that uses them, in two requests.
+                  "combined" asks for both in a single response (the "plan" stage), halving the round trips.
+        """
+        if mode not in ("two_call", "combined"):
+            raise ValueError(f"Unknown planning mode {mode}")
+        self.llm_clients: LLMClientRegistry = llm_clients or LLMClientRegistry()
+        self.mode: str = mode
+
+    # The chains are built on first use, so creating a planner imports neither LangChain prompts nor the OpenAI client
+
+    @cached_property
+    def toolgen_chain(self):
+        """
+        Returns the chain that generates abstract tools, building it on first use
+        """
+        from langchain_core.output_parsers import JsonOutputParser
+        from prompts.abstract_templates import generate_abstract_tool_template
 
+        self.toolgen_llm = self.llm_clients.get("toolgen")
+        self.toolgen_template = generate_abstract_tool_template()
         # Need to figure out how to parse through the output correctly
         self.tool_parser = JsonOutputParser()
+        return self.toolgen_template | self.toolgen_llm | self.tool_parser
+
+    @cached_property
+    def toolgen_stream_chain(self):
+        """
+        Returns the abstract tool chain without its JSON parser, so the response can be parsed as it streams in
+        """
+        from prompts.abstract_templates import generate_abstract_tool_template
+
+        return generate_abstract_tool_template() | self.llm_clients.get("toolgen")
+
+    @cached_property
+    def plangen_chain(self):
+        """
+        Returns the chain that generates abstract plans, building it on first use
+        """
+        from prompts.abstract_templates import generate_abstract_plan_template
+
+        self.plan_llm = self.llm_clients.get("plan")
+        self.plangen_template = generate_abstract_plan_template()
         # self.plan_parser = PythonCodeOutputParser()
+        return self.plangen_template | self.plan_llm
 
-        self.toolgen_chain = self.toolgen_template | self.toolgen_llm | self.tool_parser
-        self.plangen_chain = self.plangen_template | self.plan_llm
+    @cached_property
+    def combined_chain(self):
+        """
+        Returns the chain that generates abstract tools and their plan in one response, building it on first use
+        """
+        from prompts.abstract_templates import generate_abstract_tools_and_plan_template
+
+        self.combined_llm = self.llm_clients.get("plan")
+        self.combined_template = generate_abstract_tools_and_plan_template()
+        return self.combined_template | self.combined_llm
+
+    def generate_abstract_tools_and_plan(self, query) -> tuple[dict, str]:
+        """
+        Generates the abstract tools and the plan that uses them with a single request
+
+        Returns:
+            The abstract tools, as generate_abstract_tools returns them, and the plan code
+        """
+        return parse_tools_and_plan(self.combined_chain.invoke({"input": query}))
+
+    async def agenerate_abstract_tools_and_plan(self, query) -> tuple[dict, str]:
+        """
+        Async version of generate_abstract_tools_and_plan
+        """
+        return parse_tools_and_plan(await self.combined_chain.ainvoke({"input": query}))
+
+    def generate_abstract_tools_and_plan_batch(self, queries: list[str], max_concurrency: int = None,
+                                               durations: list[float] = None) -> list:
+        """
+        Generates the abstract tools and plans of many queries, one request each
+        If durations is given, the seconds each query's request took are appended to it, in order.
+
+        Returns:
+            For each query, in order, its (abstract tools, plan code) or the error raised while generating them
+        """
+        responses = self.__batch(self.combined_chain, [{"input": query} for query in queries], max_concurrency,
+                                 durations)
+        results = []
+        for response in responses:
+            try:
+                results.append(response if isinstance(response, Exception) else parse_tools_and_plan(response))
+            except ValueError as error:
+                results.append(error)
+        return results
 
     def generate_abstract_tools(self, query, chat_history=None, debug=None) -> dict:
         """
@@ -46,6 +121,53 @@ class AbstractPlanner():
         output = self.toolgen_chain.invoke({"input": query})
         return output
 
+    def stream_abstract_tools(self, query, on_app: Callable[[dict], None]) -> dict:
+        """
+        Generates the abstract tools like generate_abstract_tools, but streams the response and calls on_app with
+        each app as soon as the model has finished writing it, while the rest are still being generated
+
+        Raises:
+            ValueError if the response is not a complete {"apps": [...]} list
+        """
+        parser = AppStreamParser()
+        for chunk in self.toolgen_stream_chain.stream({"input": query}):
+            for app in parser.feed(chunk.content):
+                on_app(app)
+        parser.close()
+        return {"apps": parser.apps}
+
+    async def astream_abstract_tools(self, query, on_app: Callable[[dict], None]) -> dict:
+        """
+        Async version of stream_abstract_tools
+        """
+        parser = AppStreamParser()
+        async for chunk in self.toolgen_stream_chain.astream({"input": query}):
+            for app in parser.feed(chunk.content):
+                on_app(app)
+        parser.close()
+        return {"apps": parser.apps}
+
+    def stream_abstract_tools_and_plan(self, query, on_app: Callable[[dict], None]) -> tuple[dict, str]:
+        """
+        Streaming version of generate_abstract_tools_and_plan. on_app is called with each app as soon as it is
+        complete, while the rest of the apps and the plan are still being generated.
+        """
+        parser = AppStreamParser()
+        for chunk in self.combined_chain.stream({"input": query}):
+            for app in parser.feed(chunk.content):
+                on_app(app)
+        return parse_tools_and_plan(parser.text)
+
+    async def astream_abstract_tools_and_plan(self, query, on_app: Callable[[dict], None]) -> tuple[dict, str]:
+        """
+        Async version of stream_abstract_tools_and_plan
+        """
+        parser = AppStreamParser()
+        async for chunk in self.combined_chain.astream({"input": query}):
+            for app in parser.feed(chunk.content):
+                on_app(app)
+        return parse_tools_and_plan(parser.text)
+
     def generate_abstract_plan(self, query, tools, chat_history=None, debug=None):
         """
         Generates a plan for the LLM to follow 
@@ -55,3 +177,71 @@ class AbstractPlanner():
             return
         output = self.plangen_chain.invoke({"input": query, "tools": tools})
         return output
+
+    async def agenerate_abstract_tools(self, query, chat_history=None, debug=None) -> dict:
+        """
+        Async version of generate_abstract_tools
+        """
+        if chat_history:
+            print("Chat history not yet created")
+            return
+        return await self.toolgen_chain.ainvoke({"input": query})
+
+    async def agenerate_abstract_plan(self, query, tools, chat_history=None, debug=None):
+        """
+        Async version of generate_abstract_plan
+        """
+        if chat_history:
+            print("Chat history not yet created")
+            return
+        return await self.plangen_chain.ainvoke({"input": query, "tools": tools})
+
+    def generate_abstract_tools_batch(self, queries: list[str], max_concurrency: int = None,
+                                      durations: list[float] = None) -> list:
+        """
+        Generates the abstract tools of many queries, with at most max_concurrency requests at once
+        If durations is given, the seconds each query's request took are appended to it, in order.
+
+        Returns:
+            For each query, in order, its abstract tools or the error raised while generating them
+        """
+        return self.__batch(self.toolgen_chain, [{"input": query} for query in queries], max_concurrency, durations)
+
+    def generate_abstract_plan_batch(self, queries: list[str], tools: list[dict], max_concurrency: int = None,
+                                     durations: list[float] = None) -> list:
+        """
+        Generates the abstract plans of many queries, each with its own abstract tools
+        If durations is given, the seconds each query's request took are appended to it, in order.
+
+        Returns:
+            For each query, in order, its abstract plan or the error raised while generating it
+        """
+        return self.__batch(self.plangen_chain, [{"input": query, "tools": abstract_tools}
+                                                 for query, abstract_tools in zip(queries, tools)],
+                            max_concurrency, durations)
+
+    def __batch(self, chain, inputs: list[dict], max_concurrency: int = None, durations: list[float] = None) -> list:
+        """
+        Invokes the chain on every input, with at most max_concurrency requests at once.
+        If durations is given, each request is timed on its own and the seconds it took are appended to durations.
+
+        Returns:
+            For each input, in order, the chain's output or the error it raised
+        """
+        if durations is None:
+            return chain.batch(inputs, config={"max_concurrency": max_concurrency}, return_exceptions=True)
+
+        def timed(input: dict) -> tuple:
+            started = time.perf_counter()
+            try:
+                output = chain.invoke(input)
+            except Exception as error:
+                output = error
+            return output, time.perf_counter() - started
+
+        if not inputs:
+            return []
+        with ThreadPoolExecutor(max_concurrency) as executor:
+            outputs = list(executor.map(timed, inputs))
+        durations.extend(seconds for _, seconds in outputs)
+        return [output for output, _ in outputs]
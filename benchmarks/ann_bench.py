@@ -0,0 +1,82 @@
+"""
+Benchmarks the approximate and cascade ToolIndex modes against exact search.
+
+Reports recall@k (fraction of the exact top-k that the approximate search also returns), top-1 agreement
+(how often the best tool is the same as with exact search) and per-query latency for catalogs of
+1k, 10k and 100k synthetic tools.
+
+Usage:
+    python benchmarks/ann_bench.py [--dim 384] [--k 4] [--queries 200] [--sizes 1000 10000 100000]
+                                   [--modes ivf hnsw cascade]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from toolindex import ToolIndex
+
+
+def synthetic_catalog(n: int, dim: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Tool embeddings drawn around a few hundred topic centers, which is closer to real descriptions than uniform noise
+    """
+    centers = rng.standard_normal((max(8, n // 50), dim)).astype(np.float32)
+    return centers[rng.integers(0, len(centers), n)] + 0.35 * rng.standard_normal((n, dim)).astype(np.float32)
+
+
+def run(size: int, dim: int, k: int, n_queries: int, modes: list[str]):
+    rng = np.random.default_rng(size)
+    vectors = synthetic_catalog(size, dim, rng)
+    names = [f"tool_{i}" for i in range(size)]
+    queries = vectors[rng.integers(0, size, n_queries)] + 0.35 * rng.standard_normal((n_queries, dim)).astype(np.float32)
+
+    exact = ToolIndex(mode="exact")
+    exact.add_many(names, vectors)
+    start = time.perf_counter()
+    truth = [exact.search(query, k)[0] for query in queries]
+    exact_ms = (time.perf_counter() - start) * 1000 / n_queries
+    print(f"{size:>7} tools  exact                       recall@{k}=1.000  top-1=1.000  {exact_ms:8.3f} ms/query")
+
+    for mode, settings in (("ivf", [{"nprobe": 4}, {"nprobe": 16}, {"nprobe": 64}]),
+                           ("hnsw", [{"ef_search": 16}, {"ef_search": 64}, {"ef_search": 256}]),
+                           ("cascade", [{"cascade_candidates": 64}, {"cascade_candidates": 256},
+                                        {"cascade_candidates": 1024}])):
+        if mode not in modes:
+            continue
+        index = ToolIndex(mode=mode, min_ann_size=0)
+        start = time.perf_counter()
+        index.add_many(names, vectors)
+        index.search(queries[0], k)
+        build_s = time.perf_counter() - start
+        for setting in settings:
+            for attr, value in setting.items():
+                setattr(index, attr, value)
+            start = time.perf_counter()
+            found = [index.search(query, k)[0] for query in queries]
+            ms = (time.perf_counter() - start) * 1000 / n_queries
+            recall = np.mean([len({name for name, _ in f} & {name for name, _ in t}) / len(t)
+                              for f, t in zip(found, truth)])
+            top1 = np.mean([f[0][0] == t[0][0] for f, t in zip(found, truth)])
+            label = " ".join(f"{attr}={value}" for attr, value in setting.items())
+            print(f"{size:>7} tools  {mode:<7} {label:<20} recall@{k}={recall:.3f}  top-1={top1:.3f}  {ms:8.3f} ms/query"
+                  f"  (build {build_s:.2f} s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--modes", nargs="+", default=["ivf", "hnsw", "cascade"])
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    args = parser.parse_args()
+    for size in args.sizes:
+        run(size, args.dim, args.k, args.queries, args.modes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Benchmarks the planning modes end to end: two-call and combined (single-call), with and without streamed abstract tools.
+
+Queries go through Orchestrator.run_query against a stand-in OpenAI-compatible server started in process. The server
+answers like a generating model: each response takes a fixed time to first token plus a time per output token
+(about 4 characters), and returns canned abstract tools, plans or combined responses depending on the prompt.
+Streamed responses are sent token by token. It also serves embeddings (hashed n-grams) with a fixed latency per
+request, so matching costs what a remote embedding call does.
+Reports the planning latency per query and the number of LLM round trips of each mode.
+
+Usage:
+    python benchmarks/planning_bench.py [--queries 20] [--ttft 0.3] [--per-token 0.01] [--embed-latency 0.15]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from embeddingbackends import HashedNgramEmbeddings
+from llmregistry import LLMClientRegistry
+from orchestrator import Orchestrator
+from registeredtool import RegisteredTool
+
+TOOLS = {"apps": [
+    {"name": "WeatherForecaster", "description": "A tool that gets the weather forecast for a city",
+     "inputs": {"city": {"type": "str", "description": "The city to get the forecast of"}},
+     "output": {"type": "str", "description": "The forecast"}},
+    {"name": "EmailSender", "description": "A tool that sends an email with the provided content to an address",
+     "inputs": {"email_address": {"type": "str", "description": "The address to send the content to"},
+                "content": {"type": "str", "description": "The content of the email"}},
+     "output": {"type": "str", "description": "A confirmation that the email has been sent"}}]}
+PLAN = ("def main():\n"
+        "    weather: str = WeatherForecaster(\"Boston\")\n"
+        "    conf: str = EmailSender(\"johndoe@northeastern.edu\", weather)\n"
+        "    return conf")
+
+
+def response(kind: str, request: int) -> str:
+    """
+    The canned response of a prompt. Descriptions are numbered per request, so no embedding is ever cached.
+    """
+    tools = {"apps": [{**app, "description": f"{app['description']} (request {request})"} for app in TOOLS["apps"]]}
+    if kind == "toolgen":
+        return json.dumps(tools, indent=4)
+    if kind == "plan":
+        return f"```python\n{PLAN}\n```"
+    return f"```json\n{json.dumps(tools, indent=4)}\n```\n```python\n{PLAN}\n```"
+
+
+def forecast(city: str) -> str:
+    return f"Sunny in {city}"
+
+
+def send_email(email_address: str, content: str) -> str:
+    return f"Sent to {email_address}: {content}"
+
+
+class StandInLLM(BaseHTTPRequestHandler):
+    """
+    Chat completions endpoint that sleeps like a model generating the canned response, and embeddings endpoint
+    """
+    protocol_version = "HTTP/1.1"
+    ttft = 0.3
+    per_token = 0.01
+    embed_latency = 0.15
+    calls = 0
+    embedder = HashedNgramEmbeddings()
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if self.path.endswith("/embeddings"):
+            time.sleep(self.embed_latency)
+            vectors = self.embedder.embed_documents(body["input"])
+            return self.send_json({"object": "list", "model": body["model"],
+                                   "data": [{"object": "embedding", "index": i, "embedding": vector}
+                                            for i, vector in enumerate(vectors)],
+                                   "usage": {"prompt_tokens": 0, "total_tokens": 0}})
+
+        prompt = json.dumps(body["messages"])
+        kind = "combined" if "```json block" in prompt else "toolgen" if "tool generator" in prompt else "plan"
+        StandInLLM.calls += 1
+        content = response(kind, StandInLLM.calls)
+        time.sleep(self.ttft)
+        if not body.get("stream"):
+            time.sleep(len(content) / 4 * self.per_token)
+            return self.send_json({"id": "bench", "object": "chat.completion", "created": 0, "model": body["model"],
+                                   "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                                                "finish_reason": "stop"}],
+                                   "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}})
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for start in range(0, len(content) + 4, 4):
+            time.sleep(self.per_token)
+            delta = {"content": content[start:start + 4]} if start < len(content) else {}
+            chunk = {"id": "bench", "object": "chat.completion.chunk", "created": 0, "model": body["model"],
+                     "choices": [{"index": 0, "delta": delta, "finish_reason": None if delta else "stop"}]}
+            self.send_chunk(f"data: {json.dumps(chunk)}\n\n".encode())
+        self.send_chunk(b"data: [DONE]\n\n")
+        self.send_chunk(b"")
+
+    def send_json(self, payload: dict):
+        out = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+    def send_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+
+def run(mode: str, stream: bool, base_url: str, n_queries: int):
+    orchestrator = Orchestrator(debug=False, embedding_cache_path=None, embedding_backend="openai",
+                                llm_clients=LLMClientRegistry(base_url, api_key="bench"), planning_mode=mode,
+                                stream_tools=stream, openai_api_base=base_url, openai_api_key="bench",
+                                check_embedding_ctx_length=False)
+    orchestrator.add_tool(RegisteredTool(
+        "Forecast", forecast, "Gets the weather forecast for a city",
+        inputs=[{"name": "city", "type": "str", "description": "The city"}]))
+    orchestrator.add_tool(RegisteredTool(
+        "Email", send_email, "Sends an email with the provided content to an email address",
+        inputs=[{"name": "email_address", "type": "str", "description": "The recipient"},
+                {"name": "content", "type": "str", "description": "The body of the email"}]))
+
+    # One warm-up query, so client creation and imports are not counted
+    with contextlib.redirect_stdout(io.StringIO()):
+        orchestrator.run_query("What is the weather in Boston? Email it to me.")
+    calls = StandInLLM.calls
+    latencies = []
+    for i in range(n_queries):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = orchestrator.run_query(f"What is the weather in Boston? Email it to me. ({i})")
+        latencies.append(time.perf_counter() - start)
+    assert result.startswith("Sent to"), result
+    latencies.sort()
+    name = f"{mode} stream" if stream else mode
+    print(f"{name:>15}  {(StandInLLM.calls - calls) / n_queries:.1f} LLM calls/query  "
+          f"mean {statistics.mean(latencies) * 1000:7.1f} ms  p50 {latencies[len(latencies) // 2] * 1000:7.1f} ms  "
+          f"p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:7.1f} ms")
+    return statistics.mean(latencies)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--ttft", type=float, default=0.3, help="Seconds to the first token of each response")
+    parser.add_argument("--per-token", type=float, default=0.01, help="Seconds per output token")
+    parser.add_argument("--embed-latency", type=float, default=0.15, help="Seconds per embedding request")
+    args = parser.parse_args()
+
+    StandInLLM.ttft, StandInLLM.per_token, StandInLLM.embed_latency = args.ttft, args.per_token, args.embed_latency
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInLLM)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+    print(f"{args.queries} queries, {args.ttft * 1000:.0f} ms to first token, {args.per_token * 1000:.0f} ms per token, "
+          f"{args.embed_latency * 1000:.0f} ms per embedding request")
+    two_call = run("two_call", False, base_url, args.queries)
+    for mode, stream in (("two_call", True), ("combined", False), ("combined", True)):
+        latency = run(mode, stream, base_url, args.queries)
+        print(f"{'':>15}  {latency / two_call:.0%} of the two-call planning latency")
+    server.shutdown()
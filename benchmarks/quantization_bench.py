@@ -0,0 +1,55 @@
+"""
+Compares ToolIndex storage types (float32, float16, int8) for exact search.
+
+Reports, per catalog size: recall@k of the quantized index against full precision,
+per-query latency and the memory used by the stored rows.
+
+Usage:
+    python benchmarks/quantization_bench.py [--dim 1536] [--k 4] [--queries 200] [--sizes 1000 10000 100000]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from toolindex import ToolIndex
+from ann_bench import synthetic_catalog
+
+
+def run(size: int, dim: int, k: int, n_queries: int):
+    rng = np.random.default_rng(size)
+    vectors = synthetic_catalog(size, dim, rng)
+    names = [f"tool_{i}" for i in range(size)]
+    queries = vectors[rng.integers(0, size, n_queries)] + 0.35 * rng.standard_normal((n_queries, dim)).astype(np.float32)
+
+    truth = None
+    for dtype in ("float32", "float16", "int8"):
+        index = ToolIndex(dtype=dtype)
+        index.add_many(names, vectors)
+        start = time.perf_counter()
+        found = [index.search(query, k)[0] for query in queries]
+        ms = (time.perf_counter() - start) * 1000 / n_queries
+        if truth is None:
+            truth = found
+        recall = np.mean([len({name for name, _ in f} & {name for name, _ in t}) / len(t) for f, t in zip(found, truth)])
+        top1 = np.mean([f[0][0] == t[0][0] for f, t in zip(found, truth)])
+        print(f"{size:>7} tools  {dtype:<7}  recall@{k}={recall:.3f}  top-1 agreement={top1:.3f}  "
+              f"{ms:8.3f} ms/query  {index.nbytes / 2 ** 20:8.1f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    args = parser.parse_args()
+    for size in args.sizes:
+        run(size, args.dim, args.k, args.queries)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+from registeredtool import RegisteredTool
+from catalogloader import load_manifest, tool_from_entry
+from embeddingcache import EmbeddingCache, CachedEmbeddings, embedding_model, embed_matrix
+from embeddingbackends import load_embeddings
+from toolindex import normalize
+from langchain_core.embeddings import Embeddings
+import numpy as np
+
+import argparse
+import json
+import mmap
+import os
+import struct
+
+
+"""
+Precompiled tool catalogs.
+
+compile_catalog imports, introspects and embeds every tool once, offline, and writes the result to a single file:
+    MAGIC | header length (uint64) | JSON header | padding | description vectors | document vectors
+The header holds the tool metadata (in the manifest format of catalogloader) along with each tool's source text and
+validated signature. Both vector blocks are (count, dim) matrices of normalized float32 embeddings: descriptions for
+ToolSelector and match documents for ConcretePlanner. They are aligned so they can be used straight from a memory map.
+
+Usage:
+    python catalogartifact.py tools.jsonl tools.toolcat --backend hashed
+"""
+
+MAGIC = b"TOOLCAT1"
+ALIGNMENT = 64
+
+
+def compile_catalog(tools: list[RegisteredTool], embeddings: Embeddings, path: str):
+    """
+    Writes a compiled catalog
+
+    params:
+        tools: The tools to compile. Their functions must be importable by "module:function" reference.
+        embeddings: The backend the orchestrator that opens the catalog will embed queries with
+        path: Where to write the catalog. The file is replaced atomically.
+
+    raises:
+        ValueError if a tool's declared inputs do not fit its function, or its function cannot be referenced
+    """
+    # Tools are stored in clearance order, so each clearance partition of ConcretePlanner maps a contiguous block
+    tools = sorted(tools, key=lambda tool: tool.clearence.value)
+    if not tools:
+        raise ValueError("Cannot compile an empty catalog")
+    entries = []
+    for tool in tools:
+        tool.validate_signature()
+        entries.append({
+            "name": tool.get_name(),
+            "description": tool.get_description(),
+            "provider": tool.provider,
+            "clearance": tool.clearence.name,
+            "inputs": tool.inputs,
+            "output": tool.output,
+            "function": tool.func_reference(),
+            "source": tool.get_source(),
+            "signature": tool.get_signature(),
+        })
+    descriptions = normalize(embed_matrix(embeddings, [tool.get_description() for tool in tools]))
+    documents = normalize(embed_matrix(embeddings, [tool.document() for tool in tools]))
+
+    header = json.dumps({"model": embedding_model(embeddings), "count": len(tools), "dim": descriptions.shape[1],
+                         "tools": entries}).encode()
+    start = len(MAGIC) + 8 + len(header)
+    padding = -start % ALIGNMENT
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as file:
+        file.write(MAGIC)
+        file.write(struct.pack("<Q", len(header)))
+        file.write(header)
+        file.write(b"\0" * padding)
+        file.write(descriptions.tobytes())
+        file.write(documents.tobytes())
+    os.replace(temporary, path)
+
+
+class CatalogArtifact:
+    """
+    A compiled catalog opened for serving.
+    The file is memory mapped copy-on-write: vector pages are only read once they are touched, and indexes may modify
+    (e.g. remove) rows in place without the change ever reaching the file.
+    Tools come with their source and signature, so nothing is embedded, imported or introspected to serve a query.
+    """
+
+    def __init__(self, path: str):
+        self.path: str = path
+        with open(path, "rb") as file:
+            self._map: mmap.mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_COPY)
+        if self._map[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a compiled tool catalog")
+        (length,) = struct.unpack_from("<Q", self._map, len(MAGIC))
+        start = len(MAGIC) + 8
+        header = json.loads(self._map[start:start + length])
+
+        self.model: str = header["model"]
+        self.tools: list[RegisteredTool] = [tool_from_entry(entry) for entry in header["tools"]]
+        count, dim = header["count"], header["dim"]
+        offset = start + length + (-(start + length) % ALIGNMENT)
+        self.description_vectors: np.ndarray = np.frombuffer(
+            self._map, np.float32, count * dim, offset).reshape(count, dim)
+        self.document_vectors: np.ndarray = np.frombuffer(
+            self._map, np.float32, count * dim, offset + count * dim * 4).reshape(count, dim)
+
+    def __len__(self) -> int:
+        return len(self.tools)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compile a tool manifest into a catalog artifact")
+    parser.add_argument("manifest", help="JSON or JSONL manifest, see catalogloader")
+    parser.add_argument("output", help="Path of the compiled catalog")
+    parser.add_argument("--backend", default="openai", help="Embedding backend, see embeddingbackends.load_embeddings")
+    parser.add_argument("--model-path", help="Model path of the sentence-transformers backend")
+    parser.add_argument("--cache", default=".embedding_cache", help="Embedding cache directory, empty to disable")
+    args = parser.parse_args()
+
+    embeddings = load_embeddings(args.backend, **({"model_path": args.model_path} if args.model_path else {}))
+    if args.cache:
+        embeddings = CachedEmbeddings(embeddings, EmbeddingCache(args.cache))
+    tools = load_manifest(args.manifest)
+    compile_catalog(tools, embeddings, args.output)
+    print(f"Compiled {len(tools)} tools into {args.output}")
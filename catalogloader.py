@@ -0,0 +1,58 @@
+from registeredtool import RegisteredTool
+from clearence import Clearence
+
+import json
+
+
+"""
+Loads tool catalogs from manifest files.
+
+A manifest is either a JSON file holding a list of entries (or {"tools": [...]}), or a JSONL file with one entry
+per line. Each entry looks like:
+    {
+        "name": "Outlook",
+        "description": "Outlook allows users to send emails through Outlook Email",
+        "provider": "Microsoft Office",
+        "clearance": "LOW",
+        "inputs": {"reciever_address": {"type": "str", "description": "..."}},
+        "output": {"type": "str", "description": "..."},
+        "function": "addtoolfunctions:send_outlook_email"
+    }
+Only name, description and function are required. Functions are not imported while loading, see RegisteredTool.
+Entries may also carry the function's source and signature, as compiled catalogs (see catalogartifact) do.
+"""
+
+
+def read_manifest(path: str) -> list[dict]:
+    """
+    Returns the raw entries of a JSON or JSONL manifest
+    """
+    with open(path) as manifest:
+        if path.endswith(".jsonl"):
+            return [json.loads(line) for line in manifest if line.strip()]
+        entries = json.load(manifest)
+    if isinstance(entries, dict):
+        entries = entries.get("tools", [])
+    return entries
+
+
+def tool_from_entry(entry: dict) -> RegisteredTool:
+    """
+    Builds a RegisteredTool from one manifest entry
+    """
+    for key in ("name", "description", "function"):
+        if key not in entry:
+            raise ValueError(f"Manifest entry {entry.get('name', entry)} has no {key}")
+    try:
+        clearance = Clearence[entry.get("clearance", "LOW").upper()]
+    except KeyError:
+        raise ValueError(f"Unrecognized clearance for {entry['name']}: {entry['clearance']}")
+    return RegisteredTool(entry["name"], entry["function"], entry["description"], entry.get("provider", "Unaffiliated"),
+                          entry.get("inputs"), entry.get("output"), clearance, entry.get("source"), entry.get("signature"))
+
+
+def load_manifest(path: str) -> list[RegisteredTool]:
+    """
+    Reads a manifest into RegisteredTools without importing any of their functions
+    """
+    return [tool_from_entry(entry) for entry in read_manifest(path)]
@@ -1,22 +1,24 @@
-from langchain_openai import ChatOpenAI
-
 from registeredtool import RegisteredTool
+from toolregistry import CatalogSnapshot
+from clearence import Clearence
 
-from langchain.prompts.chat import ChatPromptTemplate
-
-from prompts.concrete_templates import generate_concrete_template
-
-from langchain_core.output_parsers import JsonOutputParser
+from langchain_core.embeddings import Embeddings
+from embeddingbackends import load_embeddings
+from embeddingcache import EmbeddingCache, CachedEmbeddings, embed_cached, aembed_cached, embed_matrix
+from lrucache import LRUCache
+from llmregistry import LLMClientRegistry
+from toolindex import ToolIndex
+from lexicalindex import BM25Index, hybrid_scores
+from planexecutor import PlanExecutor
+from rwlock import ReadWriteLock
 
-from langchain.embeddings.huggingface import HuggingFaceEmbeddings
-from langchain_community.vectorstores import FAISS
-from langchain_openai import OpenAIEmbeddings
-from langchain.schema import Document
+import numpy as np
 
-from typing import Callable
-
-import inspect
+from functools import cached_property
+from typing import Container
 
+import asyncio
+import heapq
 
 """
 Expiremental
@@ -29,6 +31,27 @@ Ideation:
         - It is critical that the session cannot be interfered with by another apps description if its from a different group
 """
 
+# Number of closest concrete tools considered for each abstract tool
+MATCH_CANDIDATES = 4
+
+
+class PartitionFilter:
+    """
+    Membership test for the tools of some clearance partitions, optionally within a set of allowed names.
+    Lets the lexical index be restricted to the partitions searched without building a set of all their tools.
+    """
+
+    __slots__ = ("indexes", "allowed")
+
+    def __init__(self, indexes: list[ToolIndex], allowed: set[str] = None):
+        self.indexes: list[ToolIndex] = indexes
+        self.allowed: set[str] | None = allowed
+
+    def __contains__(self, name: str) -> bool:
+        if self.allowed is not None and name not in self.allowed:
+            return False
+        return any(name in index for index in self.indexes)
+
 
 class ConcretePlanner():
     """
@@ -41,28 +64,155 @@ class ConcretePlanner():
             - This would avoid more attack surfaces
     """
 
-    def __init__(self, debug: bool = True):
-        self.planner_llm: ChatOpenAI = ChatOpenAI(model="Qwen/Qwen2.5-72B-Instruct", temperature=0.0,
-                                                  openai_api_base="http://localhost:8000/v1")
+    def __init__(self, debug: bool = True, embedding_cache: EmbeddingCache = None, index_mode: str = "exact",
+                 embeddings: Embeddings = None, prefilter: int = None, hybrid_weight: float = 0.0,
+                 index_dtype: str = "float32", query_cache: LRUCache = None, llm_clients: LLMClientRegistry = None,
+                 plan_workers: int = 8, index_options: dict = None):
+        self.debug = debug
+        # Shared, pooled LLM clients, this planner is the "concrete" stage
+        self.llm_clients: LLMClientRegistry = llm_clients or LLMClientRegistry()
+
+        # Any backend from embeddingbackends.load_embeddings (e.g. the offline "hashed" one) can be passed in
+        self.embeddings: Embeddings = embeddings or load_embeddings()
+        if embedding_cache is not None:
+            self.embeddings = CachedEmbeddings(self.embeddings, embedding_cache)
+
+        # Long-lived indexes over every concrete tool, keyed by tool name, one per clearance level.
+        # A request only searches the levels it is cleared for, so higher clearance tools are never scored for it.
+        # index_dtype="float16"/"int8" trades a little precision for 2-4x less memory per tool.
+        # index_options are passed to every ToolIndex, e.g. {"nprobe": 32, "ef_search": 128, "min_ann_size": 5000}
+        self.index_options: dict = dict(index_options or {})
+        self.indexes: dict[Clearence, ToolIndex] = {
+            clearance: ToolIndex(mode=index_mode, dtype=index_dtype, **self.index_options) for clearance in Clearence}
+        # If prefilter is set, each abstract tool is only scored against its prefilter best BM25 matches.
+        # hybrid_weight mixes the BM25 score into the similarity the match thresholds are applied to.
+        self.lexical_index: BM25Index = BM25Index()
+        self.prefilter: int | None = prefilter
+        self.hybrid_weight: float = hybrid_weight
+        self.tools: dict[str, RegisteredTool] = {}
+        # Bumped on every change to the indexes, so a snapshot found to hold exactly the indexed tools is only checked once
+        self._generation: int = 0
+        self._matching_catalog: tuple[int, int] | None = None
+        # Adding and removing tools changes the indexes, the lexical index and tools together, so it excludes searches
+        self._index_lock: ReadWriteLock = ReadWriteLock()
+        # In-memory cache of abstract tool embeddings, may be shared with other pipeline stages
+        self.query_cache: LRUCache | None = query_cache
+        # Runs independent statements of a plan's main() concurrently, plan_workers=1 to run plans sequentially
+        self.executor: PlanExecutor = PlanExecutor(plan_workers)
+
+    @cached_property
+    def plangen_chain(self):
+        """
+        Returns the LLM matching chain, building it on first use
+        """
+        from langchain_core.output_parsers import JsonOutputParser
+        from prompts.concrete_templates import generate_concrete_template
+
+        self.planner_llm = self.llm_clients.get("concrete")
         # We may end up not using this
-        self.planner_template: ChatPromptTemplate = generate_concrete_template()
+        self.planner_template = generate_concrete_template()
         self.planner_parser = JsonOutputParser()
-        self.debug = debug
+        return self.planner_template | self.planner_llm | self.planner_parser
+
+    def tool_document(self, tool: RegisteredTool) -> str:
+        """
+        Returns the text a concrete tool is indexed and matched by
+        """
+        return tool.document()
+
+    def add_tool(self, tool: RegisteredTool):
+        """
+        Embeds a concrete tool into the index
+        """
+        self.add_tools([tool])
+
+    def add_tools(self, tools: list[RegisteredTool]):
+        """
+        Embeds any tools that are not yet indexed in one request. A new tool with an already indexed name replaces the old one.
+        """
+        new_tools = [tool for tool in tools if self.tools.get(tool.get_name()) is not tool]
+        if not new_tools:
+            return
+        self.add_embedded_tools(new_tools, embed_matrix(self.embeddings, [self.tool_document(tool) for tool in new_tools]))
 
-        self.plangen_chain = self.planner_template | self.planner_llm | self.planner_parser
+    def add_embedded_tools(self, tools: list[RegisteredTool], vectors, normalized: bool = False):
+        """
+        Adds tools whose document embeddings were computed ahead of time, e.g. by a compiled catalog (see catalogartifact)
 
-    def adapt_plan(self, tools: set[RegisteredTool], abs_tools: list[dict], abs_code: str):
+        params:
+            tools: The tools to add
+            vectors: One embedding of tool_document per tool
+            normalized: Whether the embeddings are already unit length, which lets the index use them without a copy
+        """
+        # A name added twice in one batch keeps its last tool, like adding the tools one by one would
+        last = {tool.get_name(): row for row, tool in enumerate(tools)}
+        if len(last) != len(tools):
+            rows = sorted(last.values())
+            tools = [tools[row] for row in rows]
+            vectors = np.asarray(vectors)[rows]
+        with self._index_lock.write():
+            for tool in tools:
+                # A tool moving to another clearance leaves its old partition, whichever that is
+                for clearance, index in self.indexes.items():
+                    if clearance != tool.clearence and tool.get_name() in index:
+                        index.remove(tool.get_name())
+            for clearance, index in self.indexes.items():
+                rows = [row for row, tool in enumerate(tools) if tool.clearence == clearance]
+                if not rows:
+                    continue
+                # Catalogs compiled in clearance order hand each partition a contiguous slice, which is used without a copy
+                if rows[-1] - rows[0] + 1 == len(rows):
+                    partition = vectors[rows[0]:rows[-1] + 1]
+                else:
+                    partition = np.asarray(vectors)[rows]
+                index.add_many([tools[row].get_name() for row in rows], partition, normalized)
+            for tool in tools:
+                # The lexical index is only read when prefiltering
+                if self.prefilter is not None:
+                    self.lexical_index.add(tool.get_name(), self.tool_document(tool))
+                self.tools[tool.get_name()] = tool
+            self._generation += 1
+
+    def remove_tool(self, name: str):
+        """
+        Removes a concrete tool from the index by name
+        """
+        with self._index_lock.write():
+            tool = self.tools.pop(name, None)
+            if tool is not None:
+                self.indexes[tool.clearence].remove(name)
+            self.lexical_index.remove(name)
+            self._generation += 1
+
+    def adapt_plan(self, tools: set[RegisteredTool] | CatalogSnapshot, abs_tools: list[dict], abs_code: str,
+                   clearance: Clearence = None, matches: dict[str, RegisteredTool] = None):
         """
         Adapts an abstract plan, creating a concrete executable equivelent
         Starts by matching each abstract developed tool with an existing concrete tool
         Then reformats the abstract plan to use the selected concrete tools
+        Only tools up to the given clearance level are matched, None allows every level
+        matches may be passed in if the abstract tools were already matched (see match_tools)
+
+        Returns:
+            What the plan's main function returned, None if it has none
         """
-        matches: dict[str, RegisteredTool] = {}
-        for abs_tool in abs_tools:
-            # Return value/type of __match_tool() currently unknown
-            selected_tool = self.__match_tool(tools, abs_tool)
-            matches[abs_tool['name']] = selected_tool
+        if matches is None:
+            matches = self.match_tools(tools, abs_tools, clearance)
+        return self.run_plan(self.concretize(abs_code, matches))
 
+    async def aadapt_plan(self, tools: set[RegisteredTool] | CatalogSnapshot, abs_tools: list[dict], abs_code: str,
+                          clearance: Clearence = None, matches: dict[str, RegisteredTool] = None):
+        """
+        Async version of adapt_plan. The tools run on a worker thread so they never block the event loop.
+        """
+        if matches is None:
+            matches = await self.amatch_tools(tools, abs_tools, clearance)
+        return await asyncio.to_thread(self.run_plan, self.concretize(abs_code, matches))
+
+    def concretize(self, abs_code: str, matches: dict[str, RegisteredTool]) -> str:
+        """
+        Returns the abstract plan rewritten to call the matched concrete tools
+        """
         if self.debug:
             for abs_name in matches:
                 print(
@@ -72,11 +222,18 @@ class ConcretePlanner():
         code = self.__match_func(abs_code, matches)
         if self.debug:
             print(f"Code:\n {code}")
+        return code
 
+    def run_plan(self, code: str):
+        """
+        Executes adapted plan code and returns what its main function returned.
+        Tool calls that do not depend on each other run concurrently, see planexecutor.
+        """
+        result = None
         exec_scope = {}
         exec(code, exec_scope)
         if "main" in exec_scope:
-            result = exec_scope["main"]()
+            result = self.executor.run(code, exec_scope)
             if self.debug:
                 print(f"RESULTS:\n", result)
         else:
@@ -84,53 +241,139 @@ class ConcretePlanner():
                 print(f"Results NOT FOUND")
         if self.debug:
             print("\n")
+        return result
 
-    def __match_tool(self, tools: set[RegisteredTool], abstract_tool: dict) -> RegisteredTool:
+    def match_tools(self, tools: set[RegisteredTool] | CatalogSnapshot, abs_tools: list[dict],
+                    clearance: Clearence = None) -> dict[str, RegisteredTool]:
         """
-        Matches abstract tools to concrete tools.
-
-        Parameters:
-            tool_grouping: A dictionary mapping a provider (e.g., "Microsoft") to a set of RegisteredTool objects.
-                        Each RegisteredTool represents a concrete LLM application with attributes such as name,
-                        description, function, and provider.
-            abstract_tool: A dictionary representing an abstract tool. This should include keys such as 'name',
-                        'description', 'input', and 'output'. The matching is done based on the tool's name and description.
+        Matches every abstract tool to a concrete tool in one pass.
+        All abstract tools are embedded in a single request and searched against the index as one batch,
+        then the threshold, tie window and clearance tie-break of __choose_tool are applied to each of them.
+        Only the indexes of clearance levels up to clearance are searched, None searches every level.
 
         Returns:
-            A dictionary mapping each provider group (string) to a list of matched RegisteredTool objects.
-            The list is expected to be ordered from the most to the least similar tool. In the current implementation,
-            it will usually be only one tool that gets matched.
+            A dictionary mapping each abstract tool name to its matched RegisteredTool
         """
+        texts = self.__abstract_documents(abs_tools)
+        if not texts:
+            return {}
+        vectors = embed_cached(self.embeddings, texts, self.query_cache)
+        return self.__match_vectors(tools, abs_tools, texts, vectors, clearance)
+
+    async def amatch_tools(self, tools: set[RegisteredTool] | CatalogSnapshot, abs_tools: list[dict],
+                           clearance: Clearence = None) -> dict[str, RegisteredTool]:
+        """
+        Async version of match_tools. The abstract tools are embedded asynchronously, the index is searched on a worker
+        thread: waiting for the index lock, or indexing a plain set of new tools, must not block the event loop.
+        """
+        texts = self.__abstract_documents(abs_tools)
+        if not texts:
+            return {}
+        vectors = await aembed_cached(self.embeddings, texts, self.query_cache)
+        return await asyncio.to_thread(self.__match_vectors, tools, abs_tools, texts, vectors, clearance)
+
+    def match_tools_batch(self, tools: set[RegisteredTool] | CatalogSnapshot, abs_tools_batch: list[list[dict]],
+                          clearance: Clearence = None) -> list[dict[str, RegisteredTool] | Exception]:
+        """
+        Matches the abstract tools of many plans at once. The abstract tools of every plan are embedded in one
+        request and searched against the index as one batch.
 
-        if "description" not in abstract_tool:
-            raise ValueError("Abstract Tool has no description")
-
-        embeddings = OpenAIEmbeddings()  # for now; should change to local model later!!!
-        # embeddings = OpenAIEmbeddings(
-        #     model="sentence-transformers/all-MiniLM-L6-v2", openai_api_base="http://localhost:8001/v1")
-        # embeddings = HuggingFaceEmbeddings(
-        #     model_name="sentence-transformers/all-MiniLM-L6-v2")
-        # embeddings = NormalizedHuggingFaceEmbeddings(
-        #     model_name="sentence-transformers/all-MiniLM-L6-v2")
-
-        if self.debug and "name" in abstract_tool:
-            print("\n-------------------------")
-            print("Matching: " + abstract_tool["name"])
-            print("-------------------------\n")
-
-        names: dict = {}
+        Returns:
+            For each plan, in order, what match_tools would return, or the error it would raise.
+            If embedding or searching the batch fails, every plan that needed it gets that error.
+        """
+        results: list[dict[str, RegisteredTool] | Exception] = []
+        texts: list[str] = []
+        spans: list[tuple[int, int]] = []
+        for abs_tools in abs_tools_batch:
+            try:
+                documents = self.__abstract_documents(abs_tools)
+            except Exception as error:
+                results.append(error)
+                continue
+            results.append({})
+            spans.append((len(results) - 1, len(texts)))
+            texts.extend(documents)
+        if not texts:
+            return results
+
+        try:
+            names, version = self.__catalog(tools)
+            vectors = embed_cached(self.embeddings, texts, self.query_cache)
+            rows = self.__search_vectors(vectors, texts, names, version, clearance)
+        except Exception as error:
+            for position, _ in spans:
+                results[position] = error
+            return results
+        for position, start in spans:
+            abs_tools = abs_tools_batch[position]
+            try:
+                results[position] = self.__choose_tools(
+                    abs_tools, rows[start:start + len(abs_tools)], names, clearance)
+            except Exception as error:
+                results[position] = error
+        return results
 
-        docs = []
+    def __abstract_documents(self, abs_tools: list[dict]) -> list[str]:
+        """
+        Validates the abstract tools and returns the text each of them is matched by
+        """
+        for abstract_tool in abs_tools:
+            if "description" not in abstract_tool:
+                raise ValueError("Abstract Tool has no description")
+        return [self.__abstract_document(abstract_tool) for abstract_tool in abs_tools]
 
-        for tool in tools:
-            names[tool.get_name()] = tool
+    def __match_vectors(self, tools: set[RegisteredTool] | CatalogSnapshot, abs_tools: list[dict], texts: list[str],
+                        vectors: list[list[float]], clearance: Clearence = None) -> dict[str, RegisteredTool]:
+        """
+        Searches the index for the embedded abstract tools and picks a concrete tool for each of them
+        """
+        names, version = self.__catalog(tools)
+        return self.__choose_tools(
+            abs_tools, self.__search_vectors(vectors, texts, names, version, clearance), names, clearance)
 
-            doc = Document(page_content=(tool.get_name(
-            ) + ": " + tool.get_description() + tool.input_str() + tool.output_str()))
-            docs.append(doc)
+    def __choose_tools(self, abs_tools: list[dict], rows: list[list[tuple[str, float]]],
+                       names: dict[str, RegisteredTool], clearance: Clearence = None) -> dict[str, RegisteredTool]:
+        """
+        Picks a concrete tool for each abstract tool from its search results
+        """
+        matches: dict[str, RegisteredTool] = {}
+        for abstract_tool, scored in zip(abs_tools, rows):
+            if self.debug and "name" in abstract_tool:
+                print("\n-------------------------")
+                print("Matching: " + abstract_tool["name"])
+                print("-------------------------\n")
+            matches[abstract_tool['name']] = self.__choose_tool(scored, names, abstract_tool['name'], clearance)
+        return matches
+
+    def __catalog(self, tools: set[RegisteredTool] | CatalogSnapshot) -> tuple[dict[str, RegisteredTool], int | None]:
+        """
+        Returns a mapping from tool name to tool for the given catalog, and the catalog's version if it is a snapshot.
+        A snapshot is only read: its tools were indexed when they were registered, and a tool it still holds that has
+        since been removed is simply not found. A plain set of tools is indexed first, only new tools get embedded.
+        """
+        if isinstance(tools, CatalogSnapshot):
+            return tools.by_name, tools.version
+        self.add_tools(list(tools))
+        return {tool.get_name(): tool for tool in tools}, None
 
-        faiss_store = FAISS.from_documents(docs, embeddings)
+    def __allowed(self, names: dict[str, RegisteredTool], version: int | None) -> set[str] | None:
+        """
+        Returns the names searches must be restricted to, or None when the indexes hold exactly the catalog's tools.
+        Must be called under the index lock.
+        """
+        if version is not None and self._matching_catalog == (version, self._generation):
+            return None
+        if len(names) != len(self.tools) or any(name not in self.tools for name in names):
+            return set(names)
+        if version is not None:
+            self._matching_catalog = (version, self._generation)
+        return None
 
+    def __abstract_document(self, abstract_tool: dict) -> str:
+        """
+        Returns the text an abstract tool is matched by
+        """
         compstr: str = abstract_tool["name"] + \
             ": " + abstract_tool["description"]
         compstr += "\nInputs:"
@@ -141,34 +384,96 @@ class ConcretePlanner():
                 print("Input parse error: ", e)
 
         compstr += f"\nOutput ({abstract_tool['output']['type']}: {abstract_tool['output']['description']})"
+        return compstr
 
-        retrieved_docs_with_scores = faiss_store.similarity_search_with_score(
-            compstr)
+    def __search_vectors(self, vectors: list[list[float]], texts: list[str], names: dict[str, RegisteredTool],
+                         version: int | None, clearance: Clearence = None) -> list[list[tuple[str, float]]]:
+        """
+        Searches the indexes of every clearance level up to clearance for every query vector at once
+
+        Returns:
+            For each vector, the closest tools in names as (tool name, distance) pairs, closest first
+        """
+        with self._index_lock.read():
+            indexes = [index for level, index in self.indexes.items()
+                       if len(index) and (clearance is None or level.value <= clearance.value)]
+            # The indexes may hold tools outside of this catalog, in which case only the ones passed in are considered
+            allowed = self.__allowed(names, version)
+            if self.prefilter is None:
+                rows = self.__search_indexes(indexes, vectors, MATCH_CANDIDATES, allowed)
+            else:
+                # BM25 has a single index, so it is restricted to the partitions searched, and never scores a tool
+                # above the clearance. Membership is checked against the partitions as is, without copying them.
+                lexical_allowed = allowed if clearance is None else PartitionFilter(indexes, allowed)
+                rows = [self.__search_prefiltered(indexes, vector, text, allowed, lexical_allowed)
+                        for vector, text in zip(vectors, texts)]
+        # The thresholds in __choose_tool are squared L2 distances, which for unit vectors is 2 - 2 * cosine similarity
+        return [[(name, 2.0 - 2.0 * score) for name, score in row] for row in rows]
+
+    def __search_indexes(self, indexes: list[ToolIndex], vectors: list[list[float]], k: int,
+                         allowed: set[str] | None) -> list[list[tuple[str, float]]]:
+        """
+        Searches each index and merges their results
 
+        Returns:
+            For each vector, the k most similar tools across the indexes as (tool name, cosine similarity) pairs
+        """
+        if len(indexes) == 1:
+            return indexes[0].search(vectors, k, allowed)
+        rows = [[] for _ in vectors]
+        for index in indexes:
+            for row, found in zip(rows, index.search(vectors, k, allowed)):
+                row.extend(found)
+        return [heapq.nlargest(k, row, key=lambda item: item[1]) for row in rows]
+
+    def __search_prefiltered(self, indexes: list[ToolIndex], vector: list[float], text: str, allowed: set[str] | None,
+                             lexical_allowed: Container[str] | None) -> list[tuple[str, float]]:
+        """
+        Scores only the best BM25 matches of the text by embedding similarity.
+        Falls back to a full search when no tool shares a term with the text.
+        lexical_allowed restricts the BM25 matches, allowed the embedding search.
+        """
+        lexical = dict(self.lexical_index.search(text, self.prefilter, lexical_allowed))
+        if not lexical:
+            return self.__search_indexes(indexes, [vector], MATCH_CANDIDATES, allowed)[0]
+        scored = self.__search_indexes(indexes, [vector], len(lexical), set(lexical))[0]
+        return hybrid_scores(scored, lexical, self.hybrid_weight)[:MATCH_CANDIDATES]
+
+    def __choose_tool(self, scored: list[tuple[str, float]], names: dict[str, RegisteredTool], abstract_name: str = None,
+                      clearance: Clearence = None) -> RegisteredTool:
+        """
+        Picks a concrete tool out of the closest candidates.
+        Candidates must be under the distance threshold and within the tie window of the best one,
+        ties are broken by the highest clearance level.
+        Raises a ValueError naming the abstract tool and the clearance when no candidate qualifies.
+        """
         best = float('inf')
-        for doc, score in retrieved_docs_with_scores:
+        for name, score in scored:
             best = min(score, best)
             if self.debug:
                 print(
-                    f"Tool: {doc.page_content.split(':')[0]}, Similarity Score: {score:.4f}")
+                    f"Tool: {name}, Similarity Score: {score:.4f}")
 
         chosen_tools = list(filter(
-            lambda item: len(item) > 1 and item[1] < 0.6 and abs(
+            lambda item: item[1] < 0.6 and abs(
                 item[1] - best) < 0.03,
-            retrieved_docs_with_scores
+            scored
         ))
 
-        best_doc: tuple = max(chosen_tools, key=lambda tool: names[tool[0].page_content.split(
-            ":")[0]].get_clearance_level())
+        if not chosen_tools:
+            if self.debug:
+                print("No tools chosen.\n")
+            level = f"at clearance {clearance.name} or below" if clearance else "in the catalog"
+            if not scored:
+                raise ValueError(f"No tool {level} can match abstract tool {abstract_name!r}")
+            raise ValueError(f"No tool {level} is close enough to abstract tool {abstract_name!r}")
 
+        best_match: tuple = max(chosen_tools, key=lambda item: names[item[0]].get_clearance_level())
         if self.debug:
-            if not best_doc:
-                print("No tools chosen.")
-            else:
-                print(f"Chosen tool: {best_doc}")
+            print(f"Chosen tool: {best_match}")
             print("\n")
 
-        return names[best_doc[0].page_content.split(":")[0]]
+        return names[best_match[0]]
 
     def __match_func(self, code: str, matches: dict[str, RegisteredTool]) -> str:
         """
@@ -196,8 +501,28 @@ class ConcretePlanner():
         for abs_tool in matches:
             function_map[abs_tool.replace(" ", "")] = abs_tool
 
+        # Tools are told apart by their full function reference, not the bare name their source defines: two manifest
+        # tools like pkg_a:run and pkg_b:run both define run, so each gets its own alias when the bare names collide
+        aliases: dict = {}
+        bare_names: dict[str, list] = {}
+        for tool in matches.values():
+            key = self.__func_key(tool)
+            if key not in aliases:
+                aliases[key] = tool.get_func_name()
+                bare_names.setdefault(tool.get_func_name(), []).append(key)
+        taken: set[str] = set(bare_names)
+        for bare_name, keys in bare_names.items():
+            if len(keys) == 1:
+                continue
+            number = 1
+            for key in keys:
+                while f"{bare_name}_{number}" in taken:
+                    number += 1
+                aliases[key] = f"{bare_name}_{number}"
+                taken.add(aliases[key])
+
         functions: set[str] = set(function_map.keys())
-        used_functions: set[Callable] = set()
+        used_functions: set = set()
         code: list[str] = code.splitlines()
         new_code: str = ""
         conc_tool: RegisteredTool = None
@@ -211,12 +536,29 @@ class ConcretePlanner():
                 if self.debug:
                     print("Concrete tool found:", conc_tool.get_name())
                 new_code += line.replace(found,
-                                         conc_tool.get_func().__name__) + "\n"
+                                         aliases[self.__func_key(conc_tool)]) + "\n"
             else:
                 new_code += line + "\n"
 
-            if conc_tool and conc_tool.get_func() not in used_functions:
-                used_functions.add(conc_tool.get_func())
-                new_code = inspect.getsource(conc_tool.get_func()) + "\n" + new_code
+            # Sources are read once per tool (or come precompiled with the catalog), so nothing is imported here
+            if conc_tool and self.__func_key(conc_tool) not in used_functions:
+                key = self.__func_key(conc_tool)
+                used_functions.add(key)
+                source = conc_tool.get_source() + "\n"
+                if aliases[key] != conc_tool.get_func_name():
+                    # Bound right after its definition, before another tool's source redefines the bare name
+                    source += f"{aliases[key]} = {conc_tool.get_func_name()}\n"
+                new_code = source + new_code
                 
-        return new_code.lstrip()
\ No newline at end of file
+        return new_code.lstrip()
+
+    def __func_key(self, tool: RegisteredTool):
+        """
+        Identifies a tool's function: its "module:function" reference, or the function itself once imported
+        """
+        if isinstance(tool.func, str):
+            return tool.func
+        try:
+            return tool.func_reference()
+        except ValueError:
+            return tool.func
@@ -0,0 +1,206 @@
+from langchain_core.embeddings import Embeddings
+import numpy as np
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+import abc
+import re
+import threading
+import zlib
+
+
+"""
+Embedding backends that can be used in place of the remote OpenAI endpoint.
+Every backend implements LangChain's Embeddings interface, so they plug into ToolSelector, ConcretePlanner
+and CachedEmbeddings unchanged.
+"""
+
+
+class LazyEmbeddings(Embeddings):
+    """
+    Defers creating a remote embedding client, and importing its SDK, until a text actually has to be embedded.
+    model names the backend up front, so cache lookups never need the client and a warm cache never loads it.
+    """
+
+    def __init__(self, factory: Callable[[], Embeddings], model: str):
+        self.factory: Callable[[], Embeddings] = factory
+        self.model: str = model
+        self._embeddings: Embeddings | None = None
+        self._lock: threading.Lock = threading.Lock()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        """
+        Returns the wrapped client, creating it on first use
+        """
+        with self._lock:
+            if self._embeddings is None:
+                self._embeddings = self.factory()
+            return self._embeddings
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embeddings.embed_query(text)
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        return await self.embeddings.aembed_documents(texts)
+
+    async def aembed_query(self, text: str) -> list[float]:
+        return await self.embeddings.aembed_query(text)
+
+
+class BatchedEmbeddings(Embeddings):
+    """
+    Base class for in-process embedding backends.
+    Splits the texts into batches and embeds the batches concurrently on a CPU thread pool.
+    Subclasses implement _embed_batch and set model, which names the backend in embedding cache keys.
+    The thread pool is started the first time several batches are embedded at once, close() shuts it down.
+    """
+
+    model: str = "batched"
+
+    def __init__(self, batch_size: int = 64, max_workers: int = 4):
+        self.batch_size: int = batch_size
+        self.max_workers: int = max_workers
+        self._pool: ThreadPoolExecutor | None = None
+        self._pool_lock: threading.Lock = threading.Lock()
+
+    @property
+    def pool(self) -> ThreadPoolExecutor:
+        """
+        Returns the thread pool batches are embedded on, starting it on first use
+        """
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=type(self).__name__)
+            return self._pool
+
+    def close(self):
+        """
+        Shuts the thread pool down. The backend stays usable, a new pool is started if it is needed again.
+        """
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.embed_array(texts).tolist()
+
+    def embed_array(self, texts: list[str]) -> np.ndarray:
+        """
+        Returns the embeddings of texts as a float32 matrix
+        """
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        if len(batches) == 1:
+            return self._embed_batch(batches[0])
+        return np.concatenate(list(self.pool.map(self._embed_batch, batches)))
+
+    def embed_query(self, text: str) -> list[float]:
+        return self._embed_batch([text])[0].tolist()
+
+    @abc.abstractmethod
+    def _embed_batch(self, texts: list[str]) -> np.ndarray:
+        """
+        Returns one normalized float32 embedding per text
+        """
+
+
+class HashedNgramEmbeddings(BatchedEmbeddings):
+    """
+    Dependency-free lexical embedder.
+    Words and character n-grams of each word are hashed into a fixed number of signed buckets (the hashing trick),
+    which keeps tool names like "Outlook" and their misspellings close without any model or vocabulary.
+    """
+
+    def __init__(self, dim: int = 1024, ngram_range: tuple[int, int] = (3, 5), batch_size: int = 64, max_workers: int = 4):
+        super().__init__(batch_size, max_workers)
+        self.dim: int = dim
+        self.ngram_range: tuple[int, int] = ngram_range
+        self.model: str = f"hashed-ngram-{dim}-{ngram_range[0]}-{ngram_range[1]}"
+
+    def features(self, text: str) -> list[str]:
+        """
+        Returns the words of the text and the character n-grams of each word
+        """
+        words = re.findall(r"\w+", text.lower())
+        features = list(words)
+        low, high = self.ngram_range
+        for word in words:
+            padded = f"<{word}>"
+            for n in range(low, high + 1):
+                features.extend(padded[i:i + n] for i in range(len(padded) - n + 1))
+        return features
+
+    def _embed_batch(self, texts: list[str]) -> np.ndarray:
+        result = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            hashes = np.fromiter((zlib.crc32(feature.encode()) for feature in self.features(text)), dtype=np.uint32)
+            if not len(hashes):
+                continue
+            # The top bit picks the sign so that collisions cancel out instead of piling up
+            signs = np.where(hashes >> 31, -1.0, 1.0).astype(np.float32)
+            np.add.at(result[row], hashes % self.dim, signs)
+        norms = np.linalg.norm(result, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return result / norms
+
+
+class SentenceTransformerEmbeddings(BatchedEmbeddings):
+    """
+    Runs a sentence-transformers model from a local path (e.g. a downloaded all-MiniLM-L6-v2) on the CPU.
+    The model is loaded on first use, once, even when the first batches are embedded concurrently.
+    """
+
+    def __init__(self, model_path: str, batch_size: int = 64, max_workers: int = 2):
+        super().__init__(batch_size, max_workers)
+        self.model_path: str = model_path
+        self.model: str = f"sentence-transformers:{model_path}"
+        self._model = None
+        self._lock: threading.Lock = threading.Lock()
+
+    def _embed_batch(self, texts: list[str]) -> np.ndarray:
+        return self._load().encode(texts, batch_size=self.batch_size, convert_to_numpy=True,
+                                   normalize_embeddings=True).astype(np.float32)
+
+    def _load(self):
+        """
+        Returns the model, loading it on first use
+        """
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from sentence_transformers import SentenceTransformer
+                    self._model = SentenceTransformer(self.model_path, device="cpu")
+        return self._model
+
+
+def load_embeddings(backend: str = "openai", **kwargs) -> Embeddings:
+    """
+    Creates an embedding backend by name
+
+    params:
+        backend: "openai", "hashed" or "sentence-transformers"
+        kwargs: Passed to the backend, e.g. model_path for sentence-transformers
+
+    returns:
+        The Embeddings instance
+    """
+    if backend == "openai":
+        # The model is pinned here so that cache keys always name the model that produced the vectors
+        model = kwargs.pop("model", "text-embedding-ada-002")
+
+        def create() -> Embeddings:
+            from langchain_openai import OpenAIEmbeddings
+            return OpenAIEmbeddings(model=model, **kwargs)
+
+        return LazyEmbeddings(create, model)
+    if backend == "hashed":
+        return HashedNgramEmbeddings(**kwargs)
+    if backend == "sentence-transformers":
+        return SentenceTransformerEmbeddings(**kwargs)
+    raise ValueError(f"Unrecognized embedding backend: {backend}")
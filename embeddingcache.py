@@ -0,0 +1,293 @@
+from langchain_core.embeddings import Embeddings
+from lrucache import LRUCache
+import numpy as np
+
+import fcntl
+import hashlib
+import json
+import os
+import threading
+
+
+KEY_SIZE = 16
+
+
+def embedding_key(model: str, text: str) -> bytes:
+    """
+    Returns the content address of an embedding: a hash of the model name and the embedded text
+    """
+    return hashlib.blake2b(model.encode() + b"\0" + text.encode(), digest_size=KEY_SIZE).digest()
+
+
+def embedding_model(embeddings: Embeddings) -> str:
+    """
+    Returns the name embeddings from this backend are cached under
+    """
+    return getattr(embeddings, "model", None) or type(embeddings).__name__
+
+
+def embed_matrix(embeddings: Embeddings, texts: list[str]) -> np.ndarray:
+    """
+    Embeds texts into a (len(texts), dim) float32 matrix.
+    Backends that can produce arrays directly (embed_array) skip the round trip through Python lists.
+    """
+    embed_array = getattr(embeddings, "embed_array", None)
+    if embed_array is not None:
+        return embed_array(texts)
+    return np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+
+
+def embed_cached(embeddings: Embeddings, texts: list[str], cache: LRUCache | None) -> list[list[float]]:
+    """
+    Embeds texts through an in-memory LRU cache shared across pipeline stages.
+    Entries are keyed by (model, text) and only the misses are sent to the backend, in one batch.
+    """
+    if cache is None:
+        return embeddings.embed_documents(texts)
+    model = embedding_model(embeddings)
+    vectors = [cache.get((model, text)) for text in texts]
+    missing = list(dict.fromkeys(text for text, vector in zip(texts, vectors) if vector is None))
+    if missing:
+        embedded = dict(zip(missing, embeddings.embed_documents(missing)))
+        for text, vector in embedded.items():
+            cache.put((model, text), vector)
+        vectors = [embedded[text] if vector is None else vector for text, vector in zip(texts, vectors)]
+    return vectors
+
+
+def embed_query_cached(embeddings: Embeddings, query: str, cache: LRUCache | None) -> list[float]:
+    """
+    Embeds a search query with the backend's embed_query, through the same in-memory LRU cache as embed_cached.
+    Query embeddings are cached apart from document embeddings, since backends may embed the two differently.
+    """
+    if cache is None:
+        return embeddings.embed_query(query)
+    key = (embedding_model(embeddings), "query", query)
+    vector = cache.get(key)
+    if vector is None:
+        vector = embeddings.embed_query(query)
+        cache.put(key, vector)
+    return vector
+
+
+async def aembed_cached(embeddings: Embeddings, texts: list[str], cache: LRUCache | None) -> list[list[float]]:
+    """
+    Async version of embed_cached, misses are embedded with the backend's aembed_documents
+    """
+    if cache is None:
+        return await embeddings.aembed_documents(texts)
+    model = embedding_model(embeddings)
+    vectors = [cache.get((model, text)) for text in texts]
+    missing = list(dict.fromkeys(text for text, vector in zip(texts, vectors) if vector is None))
+    if missing:
+        embedded = dict(zip(missing, await embeddings.aembed_documents(missing)))
+        for text, vector in embedded.items():
+            cache.put((model, text), vector)
+        vectors = [embedded[text] if vector is None else vector for text, vector in zip(texts, vectors)]
+    return vectors
+
+
+class EmbeddingCache:
+    """
+    Persistent, content-addressed store of embedding vectors shared by every process on the host.
+
+    Each model has its own arena, a subdirectory of the cache named by a hash of the model, holding:
+        - vectors.f32: an append-only arena of float32 rows, memory-mapped for reads
+        - keys.bin: the KEY_SIZE byte key of every row, in row order
+        - meta.json: the vector dimension
+    so backends of different dimensions can share one cache directory.
+    Appends are serialized with an exclusive lock. Rows are written before their keys, so a reader never sees a key
+    without its vector. A writer that crashed between the two writes leaves rows without keys, or a torn key; both
+    are truncated away before the next append, so row i always belongs to key i.
+    """
+
+    def __init__(self, path: str = ".embedding_cache"):
+        self.path: str = path
+        os.makedirs(path, exist_ok=True)
+        self.arenas: dict[str, _Arena] = {}
+        self._lock: threading.Lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return sum(len(arena.rows) for arena in list(self.arenas.values()))
+
+    def arena_path(self, model: str) -> str:
+        """
+        Returns the directory the embeddings of model are stored in
+        """
+        return os.path.join(self.path, hashlib.blake2b(model.encode(), digest_size=8).hexdigest())
+
+    def dim(self, model: str) -> int | None:
+        """
+        Returns the dimension of the embeddings cached for model, None if there are none yet
+        """
+        return self._arena(model).dim
+
+    def get_many(self, model: str, texts: list[str]) -> list[np.ndarray | None]:
+        """
+        Looks up the cached embedding of each text
+
+        returns:
+            A read-only view into the memory-mapped arena for every hit, None for every miss
+        """
+        return self._arena(model).get_many([embedding_key(model, text) for text in texts])
+
+    def put_many(self, model: str, texts: list[str], vectors) -> None:
+        """
+        Appends embeddings to the cache. Texts that are already cached are skipped.
+        """
+        if not texts:
+            return
+        self._arena(model).put_many([embedding_key(model, text) for text in texts],
+                                    np.asarray(vectors, dtype=np.float32))
+
+    def _arena(self, model: str) -> "_Arena":
+        arena = self.arenas.get(model)
+        if arena is None:
+            with self._lock:
+                arena = self.arenas.get(model)
+                if arena is None:
+                    arena = self.arenas[model] = _Arena(self.arena_path(model))
+        return arena
+
+
+class _Arena:
+    """
+    The files of one model in an EmbeddingCache, and the rows read from them so far.
+    The rows and the memory map are swapped by _refresh, so reading and refreshing them is serialized with a lock
+    between the threads of this process, and appending with a file lock between processes.
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(path, exist_ok=True)
+        self.keys_path: str = os.path.join(path, "keys.bin")
+        self.vectors_path: str = os.path.join(path, "vectors.f32")
+        self.meta_path: str = os.path.join(path, "meta.json")
+        self.lock_path: str = os.path.join(path, ".lock")
+
+        self.dim: int | None = None
+        self.rows: dict[bytes, int] = {}
+        self.vectors: np.ndarray | None = None
+        self._keys_read: int = 0
+        self._lock: threading.Lock = threading.Lock()
+        self._refresh()
+
+    def get_many(self, keys: list[bytes]) -> list[np.ndarray | None]:
+        with self._lock:
+            if any(key not in self.rows for key in keys):
+                # Another process may have embedded them since we last looked
+                self._refresh()
+            return [self.vectors[self.rows[key]] if key in self.rows else None for key in keys]
+
+    def put_many(self, keys: list[bytes], vectors: np.ndarray) -> None:
+        with self._lock, open(self.lock_path, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                self._refresh()
+                if self.dim is None:
+                    self.dim = vectors.shape[1]
+                    with open(self.meta_path, "w") as meta:
+                        json.dump({"dim": self.dim}, meta)
+                elif vectors.shape[1] != self.dim:
+                    raise ValueError(f"Expected embeddings of dimension {self.dim}, got {vectors.shape[1]}")
+
+                new_rows: dict[bytes, np.ndarray] = {}
+                for key, vector in zip(keys, vectors):
+                    if key not in self.rows:
+                        new_rows.setdefault(key, vector)
+                if not new_rows:
+                    return
+
+                # Drop what a crashed writer left past the last complete key
+                for path, size in ((self.keys_path, self._keys_read * KEY_SIZE),
+                                   (self.vectors_path, self._keys_read * self.dim * 4)):
+                    if os.path.exists(path) and os.path.getsize(path) > size:
+                        os.truncate(path, size)
+                with open(self.vectors_path, "ab") as arena:
+                    arena.write(np.stack(list(new_rows.values())).tobytes())
+                    arena.flush()
+                    os.fsync(arena.fileno())
+                with open(self.keys_path, "ab") as keys_file:
+                    keys_file.write(b"".join(new_rows.keys()))
+                self._refresh()
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _refresh(self) -> None:
+        """
+        Picks up keys appended since the last refresh and remaps the arena. Called with the lock held.
+        """
+        if self.dim is None:
+            if not os.path.exists(self.meta_path):
+                return
+            with open(self.meta_path) as meta:
+                self.dim = json.load(meta)["dim"]
+        if not os.path.exists(self.keys_path):
+            return
+
+        with open(self.keys_path, "rb") as keys:
+            keys.seek(self._keys_read * KEY_SIZE)
+            data = keys.read()
+        count = len(data) // KEY_SIZE
+        if count == 0 and self.vectors is not None:
+            return
+        for i in range(count):
+            self.rows[data[i * KEY_SIZE:(i + 1) * KEY_SIZE]] = self._keys_read + i
+        self._keys_read += count
+
+        if self._keys_read:
+            self.vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(self._keys_read, self.dim))
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps an embedding backend so every text is looked up in an EmbeddingCache before the backend is called.
+    Only cache misses are sent to the backend, in a single batch.
+    """
+
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingCache, model: str = None):
+        self.embeddings: Embeddings = embeddings
+        self.cache: EmbeddingCache = cache
+        self.model: str = model or embedding_model(embeddings)
+        # Backends may embed queries differently from documents, so they are cached under their own model name
+        self.query_model: str = self.model + "\0query"
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.embed_array(texts).tolist()
+
+    def embed_array(self, texts: list[str]) -> np.ndarray:
+        """
+        Returns the embeddings of texts as a float32 matrix, gathered straight from the cache arena
+        """
+        if not texts:
+            return np.zeros((0, self.cache.dim(self.model) or 0), dtype=np.float32)
+        cached = self.cache.get_many(self.model, texts)
+        missing = list(dict.fromkeys(text for text, vector in zip(texts, cached) if vector is None))
+        if missing:
+            self.cache.put_many(self.model, missing, embed_matrix(self.embeddings, missing))
+            cached = self.cache.get_many(self.model, texts)
+        return np.stack(cached)
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        # Cache lookups are local memory map reads, only the backend call for the misses is awaited
+        if not texts:
+            return []
+        cached = self.cache.get_many(self.model, texts)
+        missing = list(dict.fromkeys(text for text, vector in zip(texts, cached) if vector is None))
+        if missing:
+            self.cache.put_many(self.model, missing, await self.embeddings.aembed_documents(missing))
+            cached = self.cache.get_many(self.model, texts)
+        return np.stack(cached).tolist()
+
+    async def aembed_query(self, text: str) -> list[float]:
+        cached = self.cache.get_many(self.query_model, [text])[0]
+        if cached is None:
+            self.cache.put_many(self.query_model, [text], [await self.embeddings.aembed_query(text)])
+            cached = self.cache.get_many(self.query_model, [text])[0]
+        return cached.tolist()
+
+    def embed_query(self, text: str) -> list[float]:
+        cached = self.cache.get_many(self.query_model, [text])[0]
+        if cached is None:
+            self.cache.put_many(self.query_model, [text], [self.embeddings.embed_query(text)])
+            cached = self.cache.get_many(self.query_model, [text])[0]
+        return cached.tolist()
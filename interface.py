@@ -1,9 +1,10 @@
-from langchain_openai import ChatOpenAI
 from orchestrator import Orchestrator
 from addtoolfunctions import *
 
+from typing import Callable
 
-def run_interface(debug: bool):
+
+def run_interface(debug: bool, on_ready: Callable[[], None] = None):
     orchestrator: Orchestrator = Orchestrator()
     # add_food_delivery_suite(orchestrator)
     # add_workspace_utility_suite(orchestrator)
@@ -14,12 +15,12 @@ def run_interface(debug: bool):
         print("Running in Debug Mode... \n")
     else:
         print("Running in Normal Mode... \n")
-    model = ChatOpenAI(model="Qwen/Qwen2.5-72B-Instruct", temperature=0.0,
-                       openai_api_base="http://localhost:8000/v1")
-    #    base_url="http:/localhost:8000")
-    model_name: str = model.model_name
+    # The planners create their LLM clients on first use, so nothing has been sent to the model yet
+    model_name: str = orchestrator.llm_clients.model("orchestrator")
     print("Using " + model_name + "... \n")
     print("Message " + model_name + " (Type :q to exit):")
+    if on_ready:
+        on_ready()
     office_prompt = """
     I would like to summarize the document named "Findings", the graph named "Analysis", and the slideshow "Results" and send the summaries to johndoe@northeastern.edu
     """
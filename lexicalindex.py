@@ -0,0 +1,133 @@
+from typing import Container
+
+import heapq
+import math
+import re
+
+
+WORD = re.compile(r"[A-Za-z0-9]+")
+CAMEL_CASE_PART = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|[0-9]+")
+
+STOPWORDS = {"a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is", "it", "of", "on", "or",
+             "that", "the", "their", "them", "this", "to", "with", "allows", "users", "user", "tool"}
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Splits text into lowercase terms. CamelCase words are split as well, so "DocumentSummarizer" matches "document".
+    """
+    terms = []
+    for word in WORD.findall(text):
+        lower = word.lower()
+        if lower not in STOPWORDS:
+            terms.append(lower)
+        # Only words with an inner capital or digit can split into more than one part
+        if not (word[1:].islower() and word[1:].isalpha()):
+            parts = CAMEL_CASE_PART.findall(word)
+            if len(parts) > 1:
+                terms.extend(part.lower() for part in parts if part.lower() not in STOPWORDS)
+    return terms
+
+
+def hybrid_scores(semantic: list[tuple[str, float]], lexical: dict[str, float], weight: float) -> list[tuple[str, float]]:
+    """
+    Combines embedding similarities with BM25 scores
+
+    params:
+        semantic: (tool name, cosine similarity) pairs
+        lexical: Mapping from tool name to its BM25 score
+        weight: How much the lexical signal counts, 0 keeps the semantic score as is
+
+    returns:
+        (tool name, (1 - weight) * similarity + weight * normalized BM25 score) pairs, highest first
+    """
+    if weight == 0 or not lexical:
+        return sorted(semantic, key=lambda item: item[1], reverse=True)
+    top = max(lexical.values()) or 1.0
+    combined = [(name, (1 - weight) * score + weight * lexical.get(name, 0.0) / top) for name, score in semantic]
+    return sorted(combined, key=lambda item: item[1], reverse=True)
+
+
+class BM25Index:
+    """
+    Inverted index over tool documents, scored with Okapi BM25.
+    Used to cheaply narrow a catalog down to the tools that share terms with a query (e.g. "Outlook", "Excel")
+    before they are scored by embedding similarity.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1: float = k1
+        self.b: float = b
+        self.postings: dict[str, dict[str, int]] = {}
+        self.terms: dict[str, dict[str, int]] = {}
+        self.lengths: dict[str, int] = {}
+        self.total_length: int = 0
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.terms
+
+    def add(self, name: str, text: str):
+        """
+        Indexes a tool document, replacing the previous one with the same name
+        """
+        self.remove(name)
+        counts: dict[str, int] = {}
+        terms = tokenize(text)
+        for term in terms:
+            counts[term] = counts.get(term, 0) + 1
+        for term, count in counts.items():
+            self.postings.setdefault(term, {})[name] = count
+        self.terms[name] = counts
+        self.lengths[name] = len(terms)
+        self.total_length += len(terms)
+
+    def remove(self, name: str) -> bool:
+        """
+        Removes a tool document by name
+
+        returns:
+            Whether the tool was indexed
+        """
+        counts = self.terms.pop(name, None)
+        if counts is None:
+            return False
+        for term in counts:
+            posting = self.postings[term]
+            del posting[name]
+            if not posting:
+                del self.postings[term]
+        self.total_length -= self.lengths.pop(name)
+        return True
+
+    def scores(self, query: str, allowed: Container[str] = None) -> dict[str, float]:
+        """
+        Returns the BM25 score of every tool that shares at least one term with the query.
+        If allowed is given, only tools in it are scored, it only needs to support membership tests.
+        """
+        if not self.terms:
+            return {}
+        n = len(self.terms)
+        average_length = self.total_length / n or 1.0
+        result: dict[str, float] = {}
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+            for name, count in posting.items():
+                if allowed is not None and name not in allowed:
+                    continue
+                length = self.lengths[name]
+                tf = count * (self.k1 + 1) / (count + self.k1 * (1 - self.b + self.b * length / average_length))
+                result[name] = result.get(name, 0.0) + idf * tf
+        return result
+
+    def search(self, query: str, k: int, allowed: Container[str] = None) -> list[tuple[str, float]]:
+        """
+        Returns the k highest scoring (tool name, BM25 score) pairs, highest first
+        """
+        scores = self.scores(query, allowed)
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
@@ -0,0 +1,335 @@
+from collections import deque
+from typing import Any, Callable
+
+import asyncio
+import threading
+
+
+"""
+One pooled LLM client shared by every stage of the pipeline.
+
+Stages ask the registry for their client by name instead of building their own ChatOpenAI:
+    "orchestrator"  Orchestrator.llm
+    "toolgen"       AbstractPlanner abstract tool generation
+    "plan"          AbstractPlanner abstract plan generation
+    "concrete"      ConcretePlanner
+    "planner"       Planner
+    "memory"        Memory
+All clients send their requests through the same keep-alive connection pool, and no more than max_in_flight requests
+are sent to the server at once, whichever stages they come from.
+Async connections belong to the event loop that opened them, so the async pool is kept per running loop: clients
+may be awaited from several loops (e.g. one asyncio.run per thread), each reusing its own connections.
+"""
+
+DEFAULT_BASE_URL = "http://localhost:8000/v1"
+DEFAULT_MODEL = "Qwen/Qwen2.5-72B-Instruct"
+
+
+class InFlightLimiter:
+    """
+    Caps the number of requests in flight across threads and event loops.
+    A slot is held from the moment a request is sent until its response has been read and closed.
+    Waiters, sync or async, are queued and handed freed slots in the order they arrived.
+    """
+
+    def __init__(self, limit: int):
+        if limit <= 0:
+            raise ValueError("The in-flight limit must be positive")
+        self.limit: int = limit
+        self._lock: threading.Lock = threading.Lock()
+        self._waiters: deque[Waiter] = deque()
+        self.in_flight: int = 0
+        self.peak: int = 0
+
+    def acquire(self):
+        """
+        Waits for a free slot
+        """
+        with self._lock:
+            if self._take():
+                return
+            event = threading.Event()
+            self._waiters.append(Waiter(event.set))
+        event.wait()
+
+    async def acquire_async(self):
+        """
+        Waits for a free slot without blocking the event loop
+        """
+        with self._lock:
+            if self._take():
+                return
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            waiter = Waiter(lambda: loop.call_soon_threadsafe(_resolve, future))
+            self._waiters.append(waiter)
+        try:
+            await future
+        except BaseException:
+            with self._lock:
+                if not waiter.granted:
+                    self._waiters.remove(waiter)
+                    raise
+            # The slot was handed over just as the waiter was cancelled, so it is passed on
+            self.release()
+            raise
+
+    def release(self):
+        """
+        Frees a slot, handing it straight to the longest waiting caller if there is one
+        """
+        with self._lock:
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                waiter.granted = True
+                try:
+                    waiter.wake()
+                    return
+                except RuntimeError:
+                    # The waiter's event loop has been closed, nobody is left to take the slot
+                    continue
+            self.in_flight -= 1
+
+    def reset_peak(self):
+        """
+        Restarts peak tracking from the requests in flight now
+        """
+        with self._lock:
+            self.peak = self.in_flight
+
+    def _take(self) -> bool:
+        """
+        Takes a free slot unless there is none or others are already waiting for one. Must be called under the lock.
+        """
+        if self.in_flight >= self.limit or self._waiters:
+            return False
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        return True
+
+
+class Waiter:
+    """
+    A caller queued for an in-flight slot. wake is called, under the limiter's lock, once the slot is its.
+    """
+
+    __slots__ = ("wake", "granted")
+
+    def __init__(self, wake: Callable[[], Any]):
+        self.wake: Callable[[], Any] = wake
+        self.granted: bool = False
+
+
+def _resolve(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+class LLMClientRegistry:
+    """
+    Hands out the chat model of each pipeline stage.
+
+    Has the following responsibilities:
+        - Share one keep-alive HTTP connection pool (sync and async) between every client
+        - Cap the requests in flight to the server across all stages
+        - Resolve per-stage model/temperature overrides, creating one client per distinct configuration
+    Clients, and the OpenAI SDK, are only created the first time a stage asks for one.
+    """
+
+    def __init__(self, base_url: str = DEFAULT_BASE_URL, model: str = DEFAULT_MODEL, temperature: float = 0.0,
+                 max_in_flight: int = 8, max_connections: int = None, keepalive_expiry: float = 30.0,
+                 timeout: float = 600.0, overrides: dict[str, dict[str, Any]] = None, **client_kwargs):
+        """
+        params:
+            base_url: The OpenAI compatible endpoint, e.g. a vLLM server
+            model, temperature: Defaults for every stage
+            max_in_flight: The most requests sent to the server at once, across all stages
+            max_connections: Size of the connection pool, defaults to max_in_flight
+            keepalive_expiry: Seconds an idle pooled connection is kept open
+            timeout: Request timeout in seconds
+            overrides: Per-stage settings, e.g. {"toolgen": {"temperature": 0.2}, "plan": {"model": "..."}}
+            client_kwargs: Passed to every ChatOpenAI, e.g. api_key
+        """
+        self.base_url: str = base_url
+        self.defaults: dict[str, Any] = {"model": model, "temperature": temperature}
+        self.overrides: dict[str, dict[str, Any]] = dict(overrides or {})
+        self.max_connections: int = max_connections or max_in_flight
+        self.keepalive_expiry: float = keepalive_expiry
+        self.timeout: float = timeout
+        self.client_kwargs: dict[str, Any] = client_kwargs
+        self.limiter: InFlightLimiter = InFlightLimiter(max_in_flight)
+        self._clients: dict[tuple, Any] = {}
+        self._http_client = None
+        self._http_async_client = None
+        self._lock: threading.Lock = threading.Lock()
+
+    def settings(self, stage: str) -> dict[str, Any]:
+        """
+        Returns the model settings of a stage: the defaults updated with its overrides
+        """
+        return {**self.defaults, **self.overrides.get(stage, {})}
+
+    def model(self, stage: str) -> str:
+        """
+        Returns the model name a stage uses, without creating a client
+        """
+        return self.settings(stage)["model"]
+
+    def get(self, stage: str):
+        """
+        Returns the ChatOpenAI client of a stage. Stages with the same settings share one client.
+        """
+        settings = self.settings(stage)
+        key = tuple(sorted(settings.items()))
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                from langchain_openai import ChatOpenAI
+
+                self._create_http_clients()
+                client = ChatOpenAI(openai_api_base=self.base_url, http_client=self._http_client,
+                                    http_async_client=self._http_async_client, **settings, **self.client_kwargs)
+                self._clients[key] = client
+            return client
+
+    def stats(self) -> dict[str, int]:
+        """
+        Returns the current and peak number of requests in flight, and the number of clients created
+        """
+        return {"in_flight": self.limiter.in_flight, "peak_in_flight": self.limiter.peak,
+                "max_in_flight": self.limiter.limit, "clients": len(self._clients)}
+
+    def reset_peak(self):
+        """
+        Restarts the peak_in_flight of stats() from the requests in flight now, e.g. to measure a single run
+        """
+        self.limiter.reset_peak()
+
+    def close(self):
+        """
+        Closes the pooled connections. Async connections are dropped without awaiting their close, each pool is
+        bound to a loop that may no longer be running.
+        """
+        with self._lock:
+            if self._http_client is not None:
+                self._http_client.close()
+            self._http_client = None
+            self._http_async_client = None
+            self._clients.clear()
+
+    def _create_http_clients(self):
+        if self._http_client is not None:
+            return
+        import httpx
+
+        LimitedTransport, LimitedAsyncTransport = _limited_transports()
+        limits = httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections,
+                              keepalive_expiry=self.keepalive_expiry)
+        self._http_client = httpx.Client(
+            transport=LimitedTransport(httpx.HTTPTransport(limits=limits), self.limiter), timeout=self.timeout)
+        # The AsyncClient only holds settings, the connections live in one AsyncHTTPTransport per running loop
+        self._http_async_client = httpx.AsyncClient(
+            transport=LimitedAsyncTransport(lambda: httpx.AsyncHTTPTransport(limits=limits), self.limiter),
+            timeout=self.timeout)
+
+
+def _limited_transports():
+    """
+    Defines the httpx transports that hold an in-flight slot per request. Deferred so httpx is only imported on use.
+    """
+    import httpx
+
+    class ReleasingStream(httpx.SyncByteStream):
+        def __init__(self, stream, release):
+            self.stream = stream
+            self.release = release
+
+        def __iter__(self):
+            yield from self.stream
+
+        def close(self):
+            try:
+                self.stream.close()
+            finally:
+                if self.release is not None:
+                    self.release()
+                    self.release = None
+
+    class AsyncReleasingStream(httpx.AsyncByteStream):
+        def __init__(self, stream, release):
+            self.stream = stream
+            self.release = release
+
+        async def __aiter__(self):
+            async for chunk in self.stream:
+                yield chunk
+
+        async def aclose(self):
+            try:
+                await self.stream.aclose()
+            finally:
+                if self.release is not None:
+                    self.release()
+                    self.release = None
+
+    class LimitedTransport(httpx.BaseTransport):
+        def __init__(self, transport: httpx.BaseTransport, limiter: InFlightLimiter):
+            self.transport = transport
+            self.limiter = limiter
+
+        def handle_request(self, request):
+            self.limiter.acquire()
+            try:
+                response = self.transport.handle_request(request)
+            except BaseException:
+                self.limiter.release()
+                raise
+            return httpx.Response(response.status_code, headers=response.headers,
+                                  stream=ReleasingStream(response.stream, self.limiter.release),
+                                  extensions=response.extensions)
+
+        def close(self):
+            self.transport.close()
+
+    class LimitedAsyncTransport(httpx.AsyncBaseTransport):
+        def __init__(self, create_transport, limiter: InFlightLimiter):
+            self.create_transport = create_transport
+            self.limiter = limiter
+            self.transports: dict[asyncio.AbstractEventLoop, httpx.AsyncBaseTransport] = {}
+            self.lock = threading.Lock()
+
+        def transport(self) -> httpx.AsyncBaseTransport:
+            """
+            Returns the connection pool of the running event loop, creating it on the loop's first request
+            """
+            loop = asyncio.get_running_loop()
+            with self.lock:
+                transport = self.transports.get(loop)
+                if transport is None:
+                    # The pools of closed loops can never be used again, nor closed, so they are just dropped
+                    for closed in [other for other in self.transports if other.is_closed()]:
+                        del self.transports[closed]
+                    transport = self.transports[loop] = self.create_transport()
+                return transport
+
+        async def handle_async_request(self, request):
+            transport = self.transport()
+            await self.limiter.acquire_async()
+            try:
+                response = await transport.handle_async_request(request)
+            except BaseException:
+                self.limiter.release()
+                raise
+            return httpx.Response(response.status_code, headers=response.headers,
+                                  stream=AsyncReleasingStream(response.stream, self.limiter.release),
+                                  extensions=response.extensions)
+
+        async def aclose(self):
+            # Only the running loop's pool can be closed from here, the others are dropped
+            with self.lock:
+                transport = self.transports.pop(asyncio.get_running_loop(), None)
+                self.transports.clear()
+            if transport is not None:
+                await transport.aclose()
+
+    return LimitedTransport, LimitedAsyncTransport
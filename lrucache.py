@@ -0,0 +1,98 @@
+from collections import OrderedDict
+from typing import Any, Hashable
+
+import threading
+import time
+
+
+class LRUCache:
+    """
+    Bounded, thread-safe least-recently-used cache with an optional time to live.
+
+    Has the following responsibilities:
+        - Keep at most maxsize entries, evicting the least recently used one first
+        - Treat entries older than ttl seconds as missing
+        - Count hits, misses, evictions and expirations so the cache can be sized
+    """
+
+    def __init__(self, maxsize: int = 4096, ttl: float | None = None):
+        if maxsize <= 0:
+            raise ValueError("maxsize must be positive")
+        self.maxsize: int = maxsize
+        self.ttl: float | None = ttl
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock: threading.Lock = threading.Lock()
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+        self.expirations: int = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and not self._expired(entry)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Returns the cached value and marks it as recently used, or default if it is missing or expired
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry):
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """
+        Caches a value, evicting the least recently used entry if the cache is full
+        """
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Removes an entry and returns its value
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            return default if entry is None else entry[1]
+
+    def clear(self) -> None:
+        """
+        Removes every entry. Counters are kept.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, float]:
+        """
+        Returns the cache counters along with its current size and hit rate
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def _expired(self, entry: tuple[float, Any]) -> bool:
+        return self.ttl is not None and time.monotonic() - entry[0] > self.ttl
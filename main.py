@@ -1,21 +1,32 @@
-from langchain.tools import StructuredTool
-from langchain.agents import AgentExecutor, create_tool_calling_agent
-from langchain_core.prompts import ChatPromptTemplate
-from interface import run_interface
+from startupreport import ImportTimer
+import argparse
 import os
-from toolselector import ToolSelector
-from apikeys.OPENAI_API_KEY import OPENAI_API_KEY
-from registeredtool import RegisteredTool
 
-os.environ["OPENAI_API_KEY"] = OPENAI_API_KEY
 
 def foo(x):
     return x
 
 def main():
-    run_interface(True)
+    parser = argparse.ArgumentParser(description="Runs Sentinel")
+    parser.add_argument("--startup-report", nargs="?", const=2, type=int, metavar="DEPTH",
+                        help="Print the import times (DEPTH levels deep, default 2) and the time to the first prompt")
+    args = parser.parse_args()
+    # Heavy modules (LangChain, the OpenAI client) are only imported by the code paths that use them,
+    # so the report shows what is actually on the way to the first prompt
+    timer = ImportTimer().install() if args.startup_report is not None else None
+
+    from apikeys.OPENAI_API_KEY import OPENAI_API_KEY
+    os.environ["OPENAI_API_KEY"] = OPENAI_API_KEY
+    from interface import run_interface
+
+    def on_ready():
+        if timer is not None:
+            timer.uninstall()
+            timer.report(args.startup_report)
+
+    run_interface(True, on_ready)
     
 
 if __name__ == "__main__":
     print("Running Sentinel... ")
-    main()
\ No newline at end of file
+    main()
@@ -1,8 +1,8 @@
 from langchain.memory import ConversationBufferMemory
-from langchain.chat_models import ChatOpenAI
 from langchain.chains import LLMChain
 from langchain.prompts import PromptTemplate
 from langchain_community.chat_message_histories import RedisChatMessageHistory
+from llmregistry import LLMClientRegistry
 
 """
 To be implemented
@@ -15,8 +15,9 @@ class Memory:
     Reponsible for saving and retrieving conversation data, summarizing past conversations, and tracking entities.
     """
 
-    def __init__(self, name: str):
+    def __init__(self, name: str, llm_clients: LLMClientRegistry = None):
         # Expiration for the key
         self.TTL: int = 450
-        llm = ChatOpenAI(model="Qwen/Qwen2.5-72B-Instruct", temperature=0.0,
-                         openai_api_base="http://localhost:8000/v1")
+        # Shared, pooled LLM clients, memory is the "memory" stage
+        self.llm_clients: LLMClientRegistry = llm_clients or LLMClientRegistry()
+        llm = self.llm_clients.get("memory")
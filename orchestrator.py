@@ -1,14 +1,26 @@
-from planner import Planner
 from abstractplanner import AbstractPlanner
 from toolselector import ToolSelector
 from registeredtool import RegisteredTool
+from toolregistry import ToolRegistry, CatalogSnapshot
+from clearence import Clearence
+from catalogloader import load_manifest
+from catalogartifact import CatalogArtifact, compile_catalog
 from concreteplanner import ConcretePlanner
-
-from langchain_openai import ChatOpenAI
-from langchain.schema import AIMessage, HumanMessage, SystemMessage
+from embeddingcache import EmbeddingCache, embedding_model, embed_cached, aembed_cached
+from embeddingbackends import load_embeddings
+from lrucache import LRUCache
+from llmregistry import LLMClientRegistry
+from plancache import PlanCache, plan_key
+from semanticplancache import SemanticPlanCache
+from plantemplates import PlanTemplates
 
 from parsers import *
 
+from concurrent.futures import ThreadPoolExecutor
+
+import asyncio
+import time
+
 
 class Orchestrator:
     """
@@ -16,15 +28,68 @@ class Orchestrator:
     In charge of executing tools in an isolated space and delegating responsibilities to other system components.
     """
 
-    def __init__(self, debug: bool = True):
-        # Map from app names to the RegisteredApp
-        self.tools: set[RegisteredTool] = set()
-        self.tool_blind_planner: AbstractPlanner = AbstractPlanner()
-        self.concrete_planner: ConcretePlanner = ConcretePlanner(debug)
-        self.tool_selector: ToolSelector = ToolSelector()
+    def __init__(self, debug: bool = True, embedding_cache_path: str | None = ".embedding_cache", index_mode: str = "exact",
+                 embedding_backend: str = "openai", prefilter: int = None, hybrid_weight: float = 0.0,
+                 index_dtype: str = "float32", query_cache_size: int = 4096, query_cache_ttl: float | None = 3600,
+                 llm_clients: LLMClientRegistry = None, planning_mode: str = "two_call", stream_tools: bool = False,
+                 plan_cache_size: int = 1024, plan_cache_path: str | None = None,
+                 semantic_cache_threshold: float | None = None, plan_templates: bool = True,
+                 plan_workers: int = 8, index_options: dict = None, **embedding_kwargs):
+        # Registered tools, indexed by name, provider and clearance
+        self.tools: ToolRegistry = ToolRegistry()
+        # Shared on-disk embedding cache, pass None to always call the embedding backend
+        self.embedding_cache: EmbeddingCache | None = EmbeddingCache(
+            embedding_cache_path) if embedding_cache_path else None
+        # One embedding backend shared by tool selection and matching, e.g. "hashed" for fully offline runs
+        self.embeddings = load_embeddings(embedding_backend, **embedding_kwargs)
+        # Query and abstract tool embeddings shared by every stage, see query_cache.stats() to size it
+        self.query_cache: LRUCache = LRUCache(query_cache_size, query_cache_ttl)
+        # One pooled LLM client, with a global in-flight cap, shared by every stage that talks to the model
+        self.llm_clients: LLMClientRegistry = llm_clients or LLMClientRegistry()
+        # "combined" generates the abstract tools and their plan with one LLM call instead of two
+        self.tool_blind_planner: AbstractPlanner = AbstractPlanner(self.llm_clients, planning_mode)
+        # prefilter narrows selection and matching down to the best BM25 candidates before embedding similarity.
+        # Up to plan_workers independent tool calls of a plan run at once.
+        # index_options tune every tool index (see ToolIndex), e.g. {"nprobe": 32} or {"ef_search": 128}
+        self.concrete_planner: ConcretePlanner = ConcretePlanner(
+            debug, self.embedding_cache, index_mode, self.embeddings, prefilter, hybrid_weight, index_dtype,
+            self.query_cache, self.llm_clients, plan_workers, index_options)
+        self.tool_selector: ToolSelector = ToolSelector(
+            self.embedding_cache, index_mode, self.embeddings, prefilter, hybrid_weight, index_dtype, self.query_cache,
+            index_options)
+        # Finished plans by normalized query and catalog, plan_cache_size=0 to always plan. Persisted to plan_cache_path.
+        self.plan_cache: PlanCache | None = PlanCache(
+            plan_cache_size, plan_cache_path) if plan_cache_size else None
+        # Plans with the query's quoted names, emails, URLs and numbers lifted into slots, so queries that only differ
+        # in those are served without planning
+        self.plan_templates: PlanTemplates | None = PlanTemplates(
+            plan_cache_size) if plan_templates and plan_cache_size else None
+        # Reuses the plan of a past query at least this similar (cosine) on exact misses, None to disable
+        self.semantic_cache: SemanticPlanCache | None = SemanticPlanCache(
+            semantic_cache_threshold, plan_cache_size or 1024) if semantic_cache_threshold else None
+        # Match each abstract tool as soon as it is streamed in, instead of once the whole response has arrived
+        self.stream_tools: bool = stream_tools
         self.debug = debug
-        self.llm: ChatOpenAI = ChatOpenAI(
-            model="Qwen/Qwen2.5-72B-Instruct", temperature=0.0, openai_api_base="http://localhost:8000/v1")
+
+    @property
+    def llm(self):
+        """
+        Returns the orchestrator's own LLM (the "orchestrator" stage), creating it on first use
+        """
+        return self.llm_clients.get("orchestrator")
+
+    def cache_stats(self) -> dict[str, dict]:
+        """
+        Returns the counters of every cache: hit rates, sizes and, for the semantic plan cache, the planning time saved
+        """
+        stats = {"query": self.query_cache.stats()}
+        if self.plan_cache is not None:
+            stats["plan"] = self.plan_cache.stats()
+        if self.plan_templates is not None:
+            stats["plan_templates"] = self.plan_templates.stats()
+        if self.semantic_cache is not None:
+            stats["semantic_plan"] = self.semantic_cache.stats()
+        return stats
 
     def add_tool(self, tool: RegisteredTool):
         """
@@ -36,11 +101,84 @@ class Orchestrator:
         returns:
             self for easy callback
         """
+        # Registered once indexed, so a failed embedding never leaves a tool in the catalog that cannot be matched
+        self.tool_selector.add_tool(tool)
+        self.concrete_planner.add_tool(tool)
         self.tools.add(tool)
         if (self.debug):
             print(f"{tool.get_name()} added to {tool.provider}")
         return self
 
+    def add_tools(self, tools: list[RegisteredTool], batch_size: int = 512):
+        """
+        Adds many tools at once. Embeddings are computed in batches of batch_size instead of once per tool.
+        Each batch is registered once it is indexed, so if embedding fails, the batches before it stay added and the
+        rest are not registered.
+
+        param:
+            RegisteredTools to add
+
+        returns:
+            self for easy callback
+        """
+        for start in range(0, len(tools), batch_size):
+            batch = tools[start:start + batch_size]
+            self.tool_selector.add_tools(batch)
+            self.concrete_planner.add_tools(batch)
+            for tool in batch:
+                self.tools.add(tool)
+        if (self.debug):
+            print(f"{len(tools)} tools added")
+        return self
+
+    def load_catalog(self, path: str, batch_size: int = 512):
+        """
+        Adds every tool of a JSON/JSONL manifest (see catalogloader).
+        Tool functions are only imported once a tool is matched or executed.
+
+        param:
+            Path of the manifest
+
+        returns:
+            self for easy callback
+        """
+        return self.add_tools(load_manifest(path), batch_size)
+
+    def compile_catalog(self, path: str):
+        """
+        Compiles every registered tool into a catalog artifact that other orchestrators can open (see catalogartifact)
+
+        param:
+            Path of the compiled catalog
+
+        returns:
+            self for easy callback
+        """
+        compile_catalog(list(self.tools), self.concrete_planner.embeddings, path)
+        return self
+
+    def open_catalog(self, path: str):
+        """
+        Adds every tool of a compiled catalog. The precompiled embeddings are memory mapped and used as they are,
+        so no tool is embedded, imported or introspected.
+
+        param:
+            Path of the compiled catalog
+
+        returns:
+            self for easy callback
+        """
+        artifact = CatalogArtifact(path)
+        if artifact.model != embedding_model(self.embeddings):
+            raise ValueError(f"{path} was compiled with {artifact.model}, not {embedding_model(self.embeddings)}")
+        self.tool_selector.add_embedded_tools(artifact.tools, artifact.description_vectors, normalized=True)
+        self.concrete_planner.add_embedded_tools(artifact.tools, artifact.document_vectors, normalized=True)
+        for tool in artifact.tools:
+            self.tools.add(tool)
+        if (self.debug):
+            print(f"{len(artifact)} tools opened from {path}")
+        return self
+
     def remove_tool(self, tool: RegisteredTool):
         """
         Removes a tool from the state
@@ -51,9 +189,7 @@ class Orchestrator:
         returns:
             self for easy callback
         """
-        self.tools.pop(tool.get_name(), None)
-        print(f"{tool.get_name()} removed")
-        return self
+        return self.remove_tool_by_name(tool.get_name())
 
     def remove_tool_by_name(self, name: str):
         """
@@ -65,16 +201,19 @@ class Orchestrator:
         returns:
             self for easy callback
         """
-        self.tools.pop(name, None)
+        self.tools.remove(name)
+        self.tool_selector.remove_tool(name)
+        self.concrete_planner.remove_tool(name)
         print(f"{name} removed")
         return self
 
-    def run_query(self, query: str) -> str:
+    def run_query(self, query: str, clearance: Clearence = None):
         """
         Runs the query. Uses relevant apps sequentially, synthesizes outputs and returns a final response to the user
+        Only tools up to the given clearance level are used, None allows every level
 
         Returns:
-        - A final output for the user
+        - What the executed plan returned
 
         Steps:
         - An sequential execution plan involving tools is created
@@ -93,7 +232,126 @@ class Orchestrator:
             response = self.llm.invoke(messages)
             return response.content
         """
-        self.__planning_step(query)
+        return self.__planning_step(query, clearance)
+
+    async def arun_query(self, query: str, clearance: Clearence = None):
+        """
+        Async version of run_query, for serving many queries from one event loop.
+        LLM calls and embeddings are awaited instead of blocking a thread, and the abstract plan is generated while the
+        abstract tools are matched to concrete tools, since neither needs the other.
+
+        Returns:
+        - What the executed plan returned
+        """
+        if self.debug:
+            print(f"Running {query}...")
+        return await self.__aplanning_step(query, clearance)
+
+    def run_queries(self, queries: list[str], max_concurrency: int = 8, clearance: Clearence = None) -> dict:
+        """
+        Runs many queries, e.g. for offline evaluation. Identical queries are only run once.
+        Abstract tools and plans are generated with batched LLM calls, at most max_concurrency at once, the abstract
+        tools of every query are embedded and matched together, and the plans are executed max_concurrency at a time.
+        A failing query does not stop the others.
+
+        Returns:
+        - {"results": [...], "errors": [...], "stats": {...}}
+          results and errors follow the order of queries: each query has either its result, or None and the
+          exception it failed with. stats holds the totals and the throughput of the run, and the most LLM requests
+          it had in flight at once.
+        """
+        started = time.perf_counter()
+        self.llm_clients.reset_peak()
+        unique: list[str] = list(dict.fromkeys(queries))
+        outcomes: dict[str, tuple] = {}
+        if self.debug:
+            print(f"Running {len(queries)} queries, {len(unique)} unique...")
+
+        def fail(query: str, outcome) -> bool:
+            if isinstance(outcome, Exception):
+                outcomes[query] = (None, outcome)
+                return True
+            return False
+
+        snapshot = self.tools.snapshot()
+        cached: dict[str, dict] = {}
+        for query in unique:
+            plan = self.__cached_plan(query, snapshot, clearance, semantic=False)
+            if plan is not None:
+                cached[query] = plan
+        misses: list[str] = [query for query in unique if query not in cached]
+        if self.semantic_cache is not None and misses:
+            # Only exact misses are embedded, all in one request
+            for query, vector in zip(misses, embed_cached(self.embeddings, misses, self.query_cache)):
+                plan = self.__semantic_plan(query, vector, snapshot, clearance)
+                if plan is not None:
+                    cached[query] = plan
+            misses = [query for query in misses if query not in cached]
+
+        planned: list[tuple[str, dict]] = []
+        # Each planned query's own planning time: its share of the batched requests, not the time the batch took
+        planning_seconds: list[float] = []
+        if not misses:
+            plans = []
+        elif self.tool_blind_planner.mode == "combined":
+            plans = []
+            durations: list[float] = []
+            for query, generated, seconds in zip(misses, self.tool_blind_planner.generate_abstract_tools_and_plan_batch(
+                    misses, max_concurrency, durations), durations):
+                if not fail(query, generated):
+                    planned.append((query, generated[0]))
+                    plans.append(generated[1])
+                    planning_seconds.append(seconds)
+        else:
+            durations: list[float] = []
+            for query, tools, seconds in zip(misses, self.tool_blind_planner.generate_abstract_tools_batch(
+                    misses, max_concurrency, durations), durations):
+                if isinstance(tools, dict) and 'apps' in tools:
+                    planned.append((query, tools))
+                    planning_seconds.append(seconds)
+                elif not fail(query, tools):
+                    fail(query, ValueError(f"No abstract tools were generated: {tools}"))
+            durations = []
+            plans = self.tool_blind_planner.generate_abstract_plan_batch(
+                [query for query, _ in planned], [tools for _, tools in planned], max_concurrency, durations)
+            planning_seconds = [toolgen + plangen for toolgen, plangen in zip(planning_seconds, durations)]
+        matching_started = time.perf_counter()
+        matches = self.concrete_planner.match_tools_batch(snapshot, [tools['apps'] for _, tools in planned], clearance)
+        # Every plan's abstract tools are matched in the same pass, so each one is charged an even share of it
+        matching_seconds = (time.perf_counter() - matching_started) / max(len(planned), 1)
+
+        def execute(query: str, tools: dict, plan, matched, seconds: float):
+            if fail(query, plan) or fail(query, matched):
+                return
+            try:
+                code = parse_text_to_python(plan)
+                outcomes[query] = (self.__run_and_cache(
+                    query, snapshot, clearance, tools, code, matched, seconds + matching_seconds), None)
+            except Exception as error:
+                fail(query, error)
+
+        def execute_cached(query: str, plan: dict):
+            try:
+                outcomes[query] = (self.__execute_plan(plan), None)
+            except Exception as error:
+                fail(query, error)
+
+        with ThreadPoolExecutor(max_concurrency) as executor:
+            for query, plan in cached.items():
+                executor.submit(execute_cached, query, plan)
+            for (query, tools), plan, matched, seconds in zip(planned, plans, matches, planning_seconds):
+                executor.submit(execute, query, tools, plan, matched, seconds)
+
+        elapsed = time.perf_counter() - started
+        results = [outcomes[query][0] for query in queries]
+        errors = [outcomes[query][1] for query in queries]
+        failed = sum(error is not None for error in errors)
+        stats = {"queries": len(queries), "unique": len(unique), "cached": len(cached), "succeeded": len(queries) - failed,
+                 "failed": failed, "seconds": elapsed, "queries_per_second": len(queries) / elapsed if elapsed else 0.0,
+                 "peak_in_flight": self.llm_clients.stats()["peak_in_flight"]}
+        if self.debug:
+            print(f"Ran {len(queries)} queries in {elapsed:.2f}s, {failed} failed")
+        return {"results": results, "errors": errors, "stats": stats}
 
     def __selection_step(self, query: str) -> dict[str, set[str]]:
         """
@@ -107,7 +365,7 @@ class Orchestrator:
             print("Filtering and grouping tools...\n\n")
 
         similarities: dict[RegisteredTool, float] = self.tool_selector.get_similarities(
-            query, self.tools)
+            query, self.tools.snapshot())
 
         """
         if self.debug:
@@ -140,19 +398,211 @@ class Orchestrator:
         """
         return grouping
 
-    def __planning_step(self, query: str):
+    def __planning_step(self, query: str, clearance: Clearence = None):
         """
         Performs the planning step (step 3). Plans the tools accordingly to their group.
+        In "combined" planning mode the abstract tools and the plan come from a single LLM call.
+        With stream_tools, each abstract tool is matched while the rest of the response is still being generated.
 
         Params:
             - A dictionary mapping providers to a set of correlated tool names
+            - The highest clearance level a planned tool may have
 
         Returns:
-            - A sequential plan of execution for the apps
+            - What the executed plan returned
         """
 
-        abstract_tools: dict[list] = self.tool_blind_planner.generate_abstract_tools(
-            query)
+        planner = self.tool_blind_planner
+        snapshot = self.tools.snapshot()
+        cached = self.__cached_plan(query, snapshot, clearance)
+        if cached is not None:
+            return self.__execute_plan(cached)
+
+        started = time.perf_counter()
+
+        matches: dict[str, RegisteredTool] = None
+        if self.stream_tools:
+            abstract_tools, code, matches = self.__streaming_planning_step(query, snapshot, clearance)
+        elif planner.mode == "combined":
+            abstract_tools, code = planner.generate_abstract_tools_and_plan(query)
+            self.__print_abstract_tools(abstract_tools)
+        else:
+            abstract_tools: dict[list] = planner.generate_abstract_tools(
+                query)
+            self.__print_abstract_tools(abstract_tools)
+            plan = planner.generate_abstract_plan(
+                query, abstract_tools)
+            code = parse_text_to_python(plan)
+        if matches is None:
+            matches = self.concrete_planner.match_tools(snapshot, abstract_tools['apps'], clearance)
+        return self.__run_and_cache(
+            query, snapshot, clearance, abstract_tools, code, matches, time.perf_counter() - started)
+
+    def __planner_id(self) -> str:
+        """
+        Identifies what plans are made by: the planning mode and every model involved
+        """
+        return ":".join((self.tool_blind_planner.mode, self.llm_clients.model("toolgen"),
+                         self.llm_clients.model("plan"), embedding_model(self.embeddings)))
+
+    def __cached_plan(self, query: str, snapshot: CatalogSnapshot, clearance: Clearence = None,
+                      semantic: bool = True) -> dict:
+        """
+        Looks a query up in the exact plan cache, then in the plan templates, then in the semantic cache
+
+        params:
+            semantic: False to skip the semantic cache, e.g. to embed the queries that miss in one batch
+
+        Returns:
+            The cached plan (see plancache) along with its concrete "code", or None
+        """
+        plan = None
+        if self.plan_cache is not None:
+            plan = self.plan_cache.get(plan_key(query, snapshot.fingerprint(), self.__planner_id(), clearance))
+            if plan is not None and self.debug:
+                print("Using the cached plan\n")
+        if plan is None and self.plan_templates is not None:
+            plan = self.plan_templates.fill(query, snapshot.fingerprint(), self.__planner_id(), clearance)
+            if plan is not None and self.debug:
+                print(f"Using the plan template of {plan['template_query']!r}\n")
+        if plan is not None:
+            return self.__concretize_cached(plan, snapshot)
+        if semantic and self.semantic_cache is not None:
+            vector = embed_cached(self.embeddings, [query], self.query_cache)[0]
+            return self.__semantic_plan(query, vector, snapshot, clearance)
+        return None
+
+    def __semantic_plan(self, query: str, vector, snapshot: CatalogSnapshot, clearance: Clearence = None) -> dict:
+        """
+        Looks a query up in the semantic cache by its embedding
+
+        Returns:
+            The cached plan of a similar query along with its concrete "code", or None
+        """
+        plan = self.semantic_cache.get(query, vector, snapshot, self.__planner_id(), clearance)
+        if plan is None:
+            return None
+        if self.debug:
+            print(f"Using the cached plan of {plan['cached_query']!r} (similarity {plan['similarity']:.3f})\n")
+        return self.__concretize_cached(plan, snapshot)
+
+    def __concretize_cached(self, plan: dict, snapshot: CatalogSnapshot) -> dict | None:
+        """
+        Rebuilds the concrete code of a cached plan from its matches, so it always runs the tools' current sources
+
+        Returns:
+            The plan along with its "code", or None if one of its matched tools is no longer registered
+        """
+        matches = {abstract_name: snapshot.get(name) for abstract_name, name in plan["matches"].items()}
+        if None in matches.values():
+            return None
+        return {**plan, "code": self.concrete_planner.concretize(plan["abstract_code"], matches)}
+
+    def __run_and_cache(self, query: str, snapshot: CatalogSnapshot, clearance: Clearence, abstract_tools: dict,
+                        abstract_code: str, matches: dict[str, RegisteredTool], planning_seconds: float):
+        """
+        Runs a freshly made plan, and caches it once it has run successfully
+
+        params:
+            planning_seconds: How long making this plan took, so the cache can report the planning time its hits save
+
+        Returns:
+            What the executed plan returned
+        """
+        code = self.concrete_planner.concretize(abstract_code, matches)
+        plan = {
+            "abstract_tools": abstract_tools,
+            "abstract_code": abstract_code,
+            "matches": {abstract_name: tool.get_name() for abstract_name, tool in matches.items()},
+            "planning_seconds": planning_seconds,
+        }
+        result = self.__execute_plan({**plan, "code": code})
+        if self.plan_cache is not None:
+            self.plan_cache.put(plan_key(query, snapshot.fingerprint(), self.__planner_id(), clearance), plan)
+        if self.plan_templates is not None:
+            self.plan_templates.learn(query, plan, snapshot.fingerprint(), self.__planner_id(), clearance)
+        if self.semantic_cache is not None:
+            vector = embed_cached(self.embeddings, [query], self.query_cache)[0]
+            self.semantic_cache.put(query, vector, plan, snapshot, self.__planner_id(), clearance)
+        return result
+
+    def __streaming_planning_step(self, query: str, snapshot, clearance: Clearence = None) -> tuple[dict, str, dict]:
+        """
+        Planning with streamed abstract tools. Each abstract tool is matched on a worker thread as soon as it is
+        complete, so matching overlaps with generating the rest of the tools and the plan.
+
+        Returns:
+            The abstract tools, the plan code and the matches
+        """
+        planner = self.tool_blind_planner
+        with ThreadPoolExecutor(1) as executor:
+            matching = []
+
+            def on_app(app: dict):
+                matching.append(executor.submit(self.concrete_planner.match_tools, snapshot, [app], clearance))
+
+            if planner.mode == "combined":
+                abstract_tools, code = planner.stream_abstract_tools_and_plan(query, on_app)
+                self.__print_abstract_tools(abstract_tools)
+            else:
+                abstract_tools = planner.stream_abstract_tools(query, on_app)
+                self.__print_abstract_tools(abstract_tools)
+                code = parse_text_to_python(planner.generate_abstract_plan(query, abstract_tools))
+            matches: dict[str, RegisteredTool] = {}
+            for future in matching:
+                matches.update(future.result())
+        return abstract_tools, code, matches
+
+    async def __aplanning_step(self, query: str, clearance: Clearence = None):
+        """
+        Async version of __planning_step. Plan generation and tool matching run concurrently.
+        """
+        planner = self.tool_blind_planner
+        snapshot = self.tools.snapshot()
+        cached = self.__cached_plan(query, snapshot, clearance, semantic=False)
+        if cached is None and self.semantic_cache is not None:
+            vector = (await aembed_cached(self.embeddings, [query], self.query_cache))[0]
+            cached = self.__semantic_plan(query, vector, snapshot, clearance)
+        if cached is not None:
+            return await asyncio.to_thread(self.__execute_plan, cached)
+
+        started = time.perf_counter()
+
+        matching = []
+        if self.stream_tools:
+            def on_app(app: dict):
+                matching.append(asyncio.create_task(self.concrete_planner.amatch_tools(snapshot, [app], clearance)))
+
+            try:
+                if planner.mode == "combined":
+                    abstract_tools, code = await planner.astream_abstract_tools_and_plan(query, on_app)
+                else:
+                    abstract_tools = await planner.astream_abstract_tools(query, on_app)
+            except BaseException:
+                for task in matching:
+                    task.cancel()
+                raise
+        else:
+            if planner.mode == "combined":
+                abstract_tools, code = await planner.agenerate_abstract_tools_and_plan(query)
+            else:
+                abstract_tools: dict[list] = await planner.agenerate_abstract_tools(query)
+            matching.append(self.concrete_planner.amatch_tools(snapshot, abstract_tools['apps'], clearance))
+        self.__print_abstract_tools(abstract_tools)
+
+        if planner.mode == "combined":
+            matched = await asyncio.gather(*matching)
+        else:
+            plan, *matched = await asyncio.gather(planner.agenerate_abstract_plan(query, abstract_tools), *matching)
+            code = parse_text_to_python(plan)
+        matches: dict[str, RegisteredTool] = {}
+        for partial in matched:
+            matches.update(partial)
+        planning_seconds = time.perf_counter() - started
+        return await asyncio.to_thread(
+            self.__run_and_cache, query, snapshot, clearance, abstract_tools, code, matches, planning_seconds)
+
+    def __print_abstract_tools(self, abstract_tools: dict[list]):
         if self.debug:
             print("Generating a plan of execution... \n\n")
             print("Abstract tool signatures:\n")
@@ -170,19 +620,13 @@ class Orchestrator:
                     n += 1
             else:
                 print(abstract_tools)
-        plan = self.tool_blind_planner.generate_abstract_plan(
-            query, abstract_tools)
-        code = parse_text_to_python(plan)
-        self.concrete_planner.adapt_plan(
-            self.tools, abstract_tools['apps'], code)
-        return plan
 
     def __execute_plan(self, plan: dict):
         """
-        Executes the given plan. Gives its outputs.
-        Fourth step in the process
+        Executes the given plan (see plancache). Gives its outputs.
+        Fourth step in the process. Tool calls that do not depend on each other's outputs run concurrently.
         """
-        pass
+        return self.concrete_planner.run_plan(plan["code"])
 
     def __conform_types(self):
         """
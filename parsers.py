@@ -1,13 +1,21 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
 import ast
+import json
 import re
-from langchain.schema import AIMessage
+
+if TYPE_CHECKING:
+    from langchain_core.messages import AIMessage
 
 def parse_text_to_python(text: str | AIMessage) -> str:
     """
     Extracts Python code enclosed in triple backticks (optionally marked with 'python')
     from the provided text.
     """
-    if isinstance (text, AIMessage):
+    # Messages are only duck-typed, so parsing never imports LangChain
+    if not isinstance(text, str):
         text = text.content
     pattern = r"```(?:python)?\n(.*?)```"
     match = re.search(pattern, text, re.DOTALL)
@@ -31,4 +39,108 @@ def parse_python_code_to_ast(text: str | AIMessage) -> ast.Module:
     code = parse_text_to_python(text)
     syntax_tree = ast.parse(code)
     print("AST DUMP:\n", ast.dump(syntax_tree, indent=4))
-    return syntax_tree
\ No newline at end of file
+    return syntax_tree
+
+def parse_tools_and_plan(text: str | AIMessage) -> tuple[dict, str]:
+    """
+    Splits a single-call planning response into its abstract tools and its plan code.
+    The response holds a ```json block with the {"apps": [...]} tools followed by a ```python block with the plan.
+
+    Returns:
+        The abstract tools, as generate_abstract_tools returns them, and the plan code
+
+    Raises:
+        ValueError if either part is missing or the tools are not valid JSON
+    """
+    if not isinstance(text, str):
+        text = text.content
+    tools_match = re.search(r"```json\s*\n(.*?)```", text, re.DOTALL)
+    code_match = re.search(r"```python\s*\n(.*?)```", text, re.DOTALL)
+    if tools_match is None or code_match is None:
+        raise ValueError(f"Expected a json and a python block in the response:\n{text}")
+    try:
+        tools = json.loads(tools_match.group(1))
+    except json.JSONDecodeError as error:
+        raise ValueError(f"The abstract tools are not valid JSON: {error}") from error
+    if not isinstance(tools, dict) or "apps" not in tools:
+        raise ValueError(f"The abstract tools have no apps: {tools}")
+    return tools, code_match.group(1).strip()
+
+
+class AppStreamParser:
+    """
+    Incrementally parses a streamed {"apps": [...]} response, handing out each abstract app as soon as its JSON object
+    is complete instead of waiting for the whole response.
+    """
+
+    def __init__(self):
+        self.text: str = ""
+        # Every app completed so far
+        self.apps: list[dict] = []
+        # Where scanning resumes, the start of the app being read and the nesting depth inside the apps list
+        self._position: int = 0
+        self._start: int = -1
+        self._depth: int = 0
+        self._in_string: bool = False
+        self._escaped: bool = False
+        self._in_apps: bool = False
+        self.done: bool = False
+
+    def feed(self, chunk: str) -> list[dict]:
+        """
+        Adds the next chunk of the response
+
+        Returns:
+            The apps completed by this chunk, in order
+        """
+        self.text += chunk
+        apps: list[dict] = []
+        if not self._in_apps:
+            # The apps list starts at the first "[" after the "apps" key
+            key = self.text.find('"apps"')
+            opening = self.text.find("[", key) if key != -1 else -1
+            if opening == -1:
+                return apps
+            self._in_apps = True
+            self._position = opening + 1
+
+        text = self.text
+        position = self._position
+        while position < len(text) and not self.done:
+            char = text[position]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == "{":
+                if self._depth == 0:
+                    self._start = position
+                self._depth += 1
+            elif char == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    try:
+                        apps.append(json.loads(text[self._start:position + 1], strict=False))
+                    except json.JSONDecodeError as error:
+                        raise ValueError(f"Invalid abstract app in the response: {error}") from error
+                    self.apps.append(apps[-1])
+            elif char == "]" and self._depth == 0:
+                self.done = True
+            position += 1
+        self._position = position
+        return apps
+
+    def close(self):
+        """
+        Checks that the whole apps list was received
+
+        Raises:
+            ValueError if the response ended before the apps list was closed
+        """
+        if not self.done:
+            raise ValueError(f"The response has no complete apps list:\n{self.text}")
@@ -0,0 +1,159 @@
+from lrucache import LRUCache
+from clearence import Clearence
+
+from typing import Any
+
+import hashlib
+import json
+import os
+import time
+import unicodedata
+
+
+"""
+Exact-match cache of finished plans.
+
+A plan is cached under its normalized query, the catalog it was matched against (CatalogSnapshot.fingerprint), the
+models and mode that planned it, and the clearance it was matched at. Adding or removing a tool changes the
+fingerprint, so plans made against an older catalog are never served again: they age out of the LRU, and out of the
+persistent backend, which keeps a bounded number of plan files and evicts the oldest written first.
+Each entry holds:
+    "abstract_tools"  the {"apps": [...]} of the abstract planner
+    "abstract_code"   the abstract plan code
+    "matches"         abstract tool name -> concrete tool name
+    "planning_seconds"  how long planning took
+Only planning is cached. The concrete code is rebuilt from the matches on every hit, so a tool whose implementation
+changed runs its current source, and tools always run. The abstract code is still executed once concretized, so
+path must only be writable by trusted processes.
+"""
+
+
+def normalize_query(query: str) -> str:
+    """
+    Returns the query as it is cached: unicode normalized, without leading, trailing or repeated whitespace.
+    Case is kept, since it can matter to the plan (e.g. document names).
+    """
+    return " ".join(unicodedata.normalize("NFC", query).split())
+
+
+def plan_key(query: str, fingerprint: str, planner: str, clearance: Clearence = None) -> str:
+    """
+    Returns the key a plan is cached under
+
+    params:
+        query: The query as the user typed it
+        fingerprint: The fingerprint of the catalog the plan is matched against
+        planner: Identifies what produced the plan, e.g. the planning mode and models
+        clearance: The highest clearance level the plan may use, None for every level
+    """
+    content = "\0".join((normalize_query(query), fingerprint, planner, clearance.name if clearance else ""))
+    return hashlib.blake2b(content.encode(), digest_size=16).hexdigest()
+
+
+class PlanCache:
+    """
+    Bounded LRU of plans, optionally backed by a directory so plans survive restarts and are shared between processes.
+
+    Has the following responsibilities:
+        - Keep the most recently used plans in memory, see stats() to size it
+        - Write each plan to path as one JSON file, replaced atomically, and read it back on a memory miss
+        - Keep at most disk_maxsize files in path, and treat files older than ttl as missing, by their mtime
+    """
+
+    def __init__(self, maxsize: int = 1024, path: str | None = None, ttl: float | None = None,
+                 disk_maxsize: int = None):
+        """
+        params:
+            maxsize: Most plans kept in memory
+            path: Directory of the persistent backend, None to only cache in memory
+            ttl: Seconds a plan is served after it was cached, from memory or from disk, None for no limit
+            disk_maxsize: Most plan files kept in path, defaults to 4 * maxsize
+        """
+        self.memory: LRUCache = LRUCache(maxsize, ttl)
+        self.path: str | None = path
+        self.ttl: float | None = ttl
+        self.disk_maxsize: int = disk_maxsize or 4 * maxsize
+        if path:
+            os.makedirs(path, exist_ok=True)
+        self.disk_hits: int = 0
+        self.disk_evictions: int = 0
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        """
+        Returns the plan cached under key, or None
+        """
+        plan = self.memory.get(key)
+        if plan is None and self.path:
+            try:
+                with open(self._file(key)) as file:
+                    if self.ttl is not None and time.time() - os.fstat(file.fileno()).st_mtime > self.ttl:
+                        self._remove(self._file(key))
+                        return None
+                    plan = json.load(file)
+            except (OSError, ValueError):
+                return None
+            self.disk_hits += 1
+            self.memory.put(key, plan)
+        return plan
+
+    def put(self, key: str, plan: dict[str, Any]):
+        """
+        Caches a plan, see the module docstring for its fields
+        """
+        self.memory.put(key, plan)
+        if self.path:
+            temporary = f"{self._file(key)}.{os.getpid()}.tmp"
+            try:
+                with open(temporary, "w") as file:
+                    json.dump(plan, file)
+                os.replace(temporary, self._file(key))
+            except BaseException:
+                self._remove(temporary)
+                raise
+            self._evict()
+
+    def clear(self):
+        """
+        Removes every plan, from memory and from disk
+        """
+        self.memory.clear()
+        if self.path:
+            for name in os.listdir(self.path):
+                if name.endswith(".json"):
+                    os.remove(os.path.join(self.path, name))
+
+    def stats(self) -> dict[str, float]:
+        """
+        Returns the memory cache counters, along with the misses that were served from disk
+        """
+        return {**self.memory.stats(), "disk_hits": self.disk_hits, "disk_evictions": self.disk_evictions}
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self.path, f"{key}.json")
+
+    def _evict(self):
+        """
+        Removes the oldest written plan files beyond disk_maxsize, and every expired one
+        """
+        files = []
+        with os.scandir(self.path) as entries:
+            for entry in entries:
+                if entry.name.endswith(".json"):
+                    try:
+                        files.append((entry.stat().st_mtime, entry.path))
+                    except OSError:
+                        # Removed by another process sharing the directory
+                        continue
+        files.sort(reverse=True)
+        expired = time.time() - self.ttl if self.ttl is not None else None
+        for position, (mtime, path) in enumerate(files):
+            if position >= self.disk_maxsize or (expired is not None and mtime < expired):
+                self._remove(path)
+                self.disk_evictions += 1
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,198 @@
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+
+import ast
+import threading
+
+
+"""
+Parallel execution of plans.
+
+A plan's main() is a list of tool calls bound to variables, e.g.
+
+    def main():
+        document: str = DocumentSummarizer("Findings")
+        graph: str = GraphSummarizer("Analysis")
+        slides: str = SlideshowSummarizer("Results")
+        return EmailSender("johndoe@northeastern.edu", document + graph + slides)
+
+Each statement of main() is a node of a data-dependency graph: it runs after every earlier statement that writes a
+variable it reads, or that reads or writes a variable it writes. Tool calls may also depend on each other through
+what they do rather than what they return, so a statement also runs after:
+    - every earlier statement that passes one of the same literals, e.g. DocumentCreator("Report") before
+      DocumentWriter("Report", text)
+    - every earlier call whose result is not bound (a bare call statement), if it is one itself
+Statements run on a thread pool as soon as those are done, so the three summarizers above run at once and the plan
+takes about as long as its critical path. The return statement runs last, after every other statement.
+Statements share one namespace (a copy of the plan's globals), so results are bound back to plan variables by name.
+A plan whose main() has control flow (if, for, try...) or arguments is run sequentially, as is.
+"""
+
+# Statements main() may consist of to be run as a graph
+GRAPH_STATEMENTS = (ast.Assign, ast.AnnAssign, ast.AugAssign, ast.Expr, ast.Return, ast.Pass)
+
+
+def plan_graph(main: ast.FunctionDef) -> tuple[list[ast.stmt], list[set[int]]] | None:
+    """
+    Splits the body of main() into a data-dependency graph
+
+    Returns:
+        The statements up to the first return, and the indexes of the statements each one depends on.
+        None if main() cannot be run as a graph.
+    """
+    arguments = main.args
+    if arguments.posonlyargs or arguments.args or arguments.vararg or arguments.kwonlyargs or arguments.kwarg:
+        return None
+    statements, dependencies, variables = [], [], []
+    for statement in main.body:
+        if not isinstance(statement, GRAPH_STATEMENTS):
+            return None
+        if isinstance(statement, ast.Return):
+            dependencies.append(set(range(len(statements))))
+            statements.append(statement)
+            break
+        reads, writes = _variables(statement)
+        literals = _literals(statement)
+        unbound = isinstance(statement, ast.Expr)
+        dependencies.append({i for i, (earlier_reads, earlier_writes, earlier_literals, earlier_unbound)
+                             in enumerate(variables)
+                             if earlier_writes & (reads | writes) or earlier_reads & writes
+                             or earlier_literals & literals or earlier_unbound and unbound})
+        variables.append((reads, writes, literals, unbound))
+        statements.append(statement)
+    return statements, dependencies
+
+
+def _variables(statement: ast.stmt) -> tuple[set[str], set[str]]:
+    """
+    Returns the names a statement reads and the names it writes.
+    Names whose attributes or items are assigned, or whose methods are called (e.g. summaries.append(...)), count as
+    written, since the object they name may change.
+    """
+    reads, writes = set(), set()
+    for node in ast.walk(statement):
+        if isinstance(node, ast.Name):
+            (writes if isinstance(node.ctx, ast.Store) else reads).add(node.id)
+        elif isinstance(node, (ast.Attribute, ast.Subscript)) and not isinstance(node.ctx, ast.Load):
+            writes.update(_base_names(node))
+        elif isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute):
+            writes.update(_base_names(node.func))
+    if isinstance(statement, ast.AugAssign):
+        reads.update(_base_names(statement.target))
+    return reads, writes
+
+
+def _literals(statement: ast.stmt) -> set[str | int | float]:
+    """
+    Returns the string and number literals of a statement, leaving out strings without a letter or a digit
+    """
+    return {node.value for node in ast.walk(statement)
+            if isinstance(node, ast.Constant) and isinstance(node.value, (str, int, float))
+            and not isinstance(node.value, bool)
+            and (not isinstance(node.value, str) or any(character.isalnum() for character in node.value))}
+
+
+def _base_names(node: ast.expr) -> set[str]:
+    while isinstance(node, (ast.Attribute, ast.Subscript, ast.Starred)):
+        node = node.value
+    return {node.id} if isinstance(node, ast.Name) else set()
+
+
+class PlanExecutor:
+    """
+    Runs the main() of plans, with independent statements executing concurrently.
+
+    Has the following responsibilities:
+        - Split main() into a data-dependency graph, see plan_graph
+        - Run each statement on a shared thread pool once the statements it depends on are done
+        - Fall back to calling main() when it cannot be split, or when no two statements are independent
+    """
+
+    def __init__(self, max_workers: int = 8):
+        """
+        params:
+            max_workers: Most statements run at once, over every plan. 1 runs every main() sequentially.
+        """
+        self.max_workers: int = max_workers
+        self._pool: ThreadPoolExecutor | None = None
+        self._lock: threading.Lock = threading.Lock()
+        self.parallel: int = 0
+        self.sequential: int = 0
+
+    def run(self, code: str, scope: dict):
+        """
+        Calls the main() defined by code
+
+        params:
+            code: The plan code
+            scope: The globals code was executed in
+
+        Returns:
+            What main() returned
+        """
+        main = next((node for node in ast.parse(code).body
+                     if isinstance(node, ast.FunctionDef) and node.name == "main"), None)
+        graph = plan_graph(main) if main is not None and self.max_workers > 1 else None
+        if graph is None or all(i - 1 in dependencies for i, dependencies in enumerate(graph[1]) if i):
+            with self._lock:
+                self.sequential += 1
+            return scope["main"]()
+        with self._lock:
+            self.parallel += 1
+        return self._run_graph(*graph, dict(scope))
+
+    def stats(self) -> dict[str, int]:
+        """
+        Returns how many plans ran as graphs and how many ran sequentially
+        """
+        with self._lock:
+            return {"parallel": self.parallel, "sequential": self.sequential, "max_workers": self.max_workers}
+
+    def _run_graph(self, statements: list[ast.stmt], dependencies: list[set[int]], namespace: dict):
+        pool = self._executor()
+        compiled = [self._compile(statement) for statement in statements]
+        waiting = [set(depends_on) for depends_on in dependencies]
+        dependents: list[list[int]] = [[] for _ in statements]
+        for i, depends_on in enumerate(dependencies):
+            for j in depends_on:
+                dependents[j].append(i)
+
+        running: dict[Future, int] = {}
+        results = [None] * len(statements)
+
+        def submit(i: int):
+            running[pool.submit(eval if isinstance(statements[i], ast.Return) else exec, compiled[i], namespace)] = i
+
+        for i, depends_on in enumerate(waiting):
+            if not depends_on:
+                submit(i)
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                i = running.pop(future)
+                if future.exception() is not None:
+                    for pending in running:
+                        pending.cancel()
+                    raise future.exception()
+                results[i] = future.result()
+                for j in dependents[i]:
+                    waiting[j].discard(i)
+                    if not waiting[j]:
+                        submit(j)
+        return results[-1] if statements and isinstance(statements[-1], ast.Return) else None
+
+    @staticmethod
+    def _compile(statement: ast.stmt):
+        if isinstance(statement, ast.Return):
+            expression = ast.Expression(statement.value or ast.Constant(None))
+            return compile(ast.fix_missing_locations(ast.copy_location(expression, statement)), "<plan>", "eval")
+        # Annotations of locals are never evaluated in a function, so they are dropped rather than stored globally
+        if isinstance(statement, ast.AnnAssign):
+            statement = ast.copy_location(ast.Assign([statement.target], statement.value) if statement.value
+                                          else ast.Pass(), statement)
+        return compile(ast.fix_missing_locations(ast.Module([statement], type_ignores=[])), "<plan>", "exec")
+
+    def _executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(self.max_workers, thread_name_prefix="plan")
+            return self._pool
@@ -1,9 +1,8 @@
-from langchain_openai import ChatOpenAI
-
 from langchain_core.output_parsers import JsonOutputParser
+from llmregistry import LLMClientRegistry
 
-from langchain.prompts import PromptTemplate
-from langchain.prompts.chat import (
+from langchain_core.prompts import PromptTemplate
+from langchain_core.prompts.chat import (
     ChatPromptTemplate,
     SystemMessagePromptTemplate,
     HumanMessagePromptTemplate
@@ -89,9 +88,10 @@ class Planner:
     Has the ability to take in map of selected tools and their provider, and generate an execuction plan accordingly
     """
 
-    def __init__(self):
-        self.llm: ChatOpenAI = ChatOpenAI(model="Qwen/Qwen2.5-72B-Instruct", temperature=0.0,
-                                          openai_api_base="http://localhost:8000/v1")
+    def __init__(self, llm_clients: LLMClientRegistry = None):
+        # Shared, pooled LLM clients, this planner is the "planner" stage
+        self.llm_clients: LLMClientRegistry = llm_clients or LLMClientRegistry()
+        self.llm = self.llm_clients.get("planner")
         self.template: ChatPromptTemplate = generate_template()
 
         self.parser = JsonOutputParser()
@@ -0,0 +1,240 @@
+from lrucache import LRUCache
+from plancache import plan_key
+from clearence import Clearence
+
+from typing import Any
+
+import ast
+import json
+import re
+import threading
+
+
+"""
+Parameterized plan templates.
+
+Many queries only differ in their entities: document names, recipients, amounts. Once a plan has been made, the
+entities of its query are lifted out of the abstract plan code into numbered slots, and the skeleton is stored under
+the shape of the query (the query with each entity replaced by its kind):
+
+    summarize the document named "Findings" and send it to johndoe@northeastern.edu
+    summarize the document named "<text>" and send it to <email>
+
+A later query with the same shape is served by extracting its entities and filling them into the slots, without any
+LLM call. Entities are found by cheap patterns only: quoted strings, emails, URLs and numbers.
+A plan is only turned into a template when every entity shows up exactly once in the plan, as a literal argument of a
+tool call, and nowhere else (neither in the abstract tools, nor as another constant, nor inside other literals);
+queries whose entities cannot be extracted unambiguously are planned in full.
+"""
+
+# Tried in order, a later pattern never matches inside an earlier match
+SLOT_PATTERNS: list[tuple[str, re.Pattern]] = [
+    ("text", re.compile(r'"([^"\n]+)"')),
+    ("text", re.compile(r"“([^”\n]+)”")),
+    ("text", re.compile(r"(?<!\w)'([^'\n]+)'(?!\w)")),
+    ("email", re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")),
+    ("url", re.compile(r"https?://[^\s\"'<>]+[^\s\"'<>.,;:!?)]")),
+    ("number", re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?![\w.]|\.\d)")),
+]
+
+
+def extract_slots(query: str) -> list[tuple[int, int, str, str]] | None:
+    """
+    Finds the entities of a query
+
+    Returns:
+        (start, end, kind, value) of each entity in order of appearance, spans include any quotes.
+        None if the query cannot be split unambiguously, e.g. it has an unclosed quote.
+    """
+    if query.count('"') % 2 or query.count("“") != query.count("”"):
+        return None
+    slots: list[tuple[int, int, str, str]] = []
+    taken: list[tuple[int, int]] = []
+    for kind, pattern in SLOT_PATTERNS:
+        for match in pattern.finditer(query):
+            start, end = match.span()
+            if any(start < taken_end and taken_start < end for taken_start, taken_end in taken):
+                continue
+            taken.append((start, end))
+            slots.append((start, end, kind, match.group(1) if pattern.groups else match.group(0)))
+    return sorted(slots)
+
+
+def query_shape(query: str, slots: list[tuple[int, int, str, str]]) -> str:
+    """
+    Returns the query with every entity replaced by its kind, e.g. 'send "<text>" to <email>'
+    """
+    shape, position = [], 0
+    for start, end, kind, _ in slots:
+        shape.append(query[position:start])
+        shape.append(f'"<{kind}>"' if kind == "text" else f"<{kind}>")
+        position = end
+    shape.append(query[position:])
+    return "".join(shape)
+
+
+class PlanTemplates:
+    """
+    Bounded LRU of plan skeletons, keyed by query shape, catalog fingerprint, planner and clearance.
+
+    Has the following responsibilities:
+        - Turn a finished plan into a skeleton with one slot per query entity, when that is safe
+        - Serve queries of a known shape by filling their entities into the skeleton
+        - Count hits, misses, and the queries or plans that could not be templated
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        """
+        params:
+            maxsize: Most templates kept
+        """
+        self.templates: LRUCache = LRUCache(maxsize)
+        self._lock: threading.Lock = threading.Lock()
+        self.hits: int = 0
+        self.misses: int = 0
+        # Queries whose entities could not be extracted unambiguously
+        self.ambiguous: int = 0
+        self.learned: int = 0
+        # Plans that could not be turned into templates
+        self.unlearnable: int = 0
+
+    def learn(self, query: str, plan: dict[str, Any], fingerprint: str, planner: str, clearance: Clearence = None) -> bool:
+        """
+        Stores the skeleton of a finished plan (see plancache for its fields)
+
+        Returns:
+            Whether the plan could be turned into a template
+        """
+        slots = extract_slots(query)
+        template = self._skeleton(slots, plan) if slots else None
+        with self._lock:
+            if template is None:
+                self.unlearnable += 1
+                return False
+            self.learned += 1
+        self.templates.put(self._key(query, slots, fingerprint, planner, clearance), {
+            "query": query,
+            "chunks": template[0],
+            "fills": template[1],
+            "abstract_tools": plan["abstract_tools"],
+            "matches": plan["matches"],
+            "planning_seconds": plan.get("planning_seconds", 0.0),
+        })
+        return True
+
+    def fill(self, query: str, fingerprint: str, planner: str, clearance: Clearence = None) -> dict[str, Any] | None:
+        """
+        Fills the entities of a query into the template of its shape
+
+        Returns:
+            The abstract tools, the filled abstract plan code and the matches (see plancache), or None if the query
+            has no template or its entities cannot be filled in unambiguously
+        """
+        slots = extract_slots(query)
+        if not slots:
+            with self._lock:
+                self.ambiguous += slots is None
+                self.misses += 1
+            return None
+        template = self.templates.get(self._key(query, slots, fingerprint, planner, clearance))
+        code = self._render(template, slots) if template is not None else None
+        with self._lock:
+            if code is None:
+                self.misses += 1
+                self.ambiguous += template is not None
+                return None
+            self.hits += 1
+        return {"abstract_tools": template["abstract_tools"], "abstract_code": code, "matches": template["matches"],
+                "planning_seconds": template["planning_seconds"], "template_query": template["query"]}
+
+    def stats(self) -> dict[str, float]:
+        """
+        Returns the template counters along with the hit rate
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"size": len(self.templates), "hits": self.hits, "misses": self.misses, "ambiguous": self.ambiguous,
+                    "learned": self.learned, "unlearnable": self.unlearnable,
+                    "hit_rate": self.hits / lookups if lookups else 0.0}
+
+    @staticmethod
+    def _key(query: str, slots: list, fingerprint: str, planner: str, clearance: Clearence = None) -> str:
+        return plan_key(query_shape(query, slots), fingerprint, planner, clearance)
+
+    @staticmethod
+    def _skeleton(slots: list[tuple[int, int, str, str]], plan: dict[str, Any]) -> tuple[list[str], list] | None:
+        """
+        Splits the abstract plan code around the literals of each entity
+
+        Returns:
+            The code chunks between the literals, and the (slot, literal type) of each literal, or None if the plan
+            depends on an entity in any other way than one literal argument of a call
+        """
+        values = [value for _, _, _, value in slots]
+        if len(set(values)) != len(values):
+            return None
+        tools = json.dumps(plan["abstract_tools"])
+        if any(value in tools for value in values):
+            return None
+        code = plan["abstract_code"]
+        try:
+            tree = ast.parse(code)
+        except SyntaxError:
+            return None
+
+        # ast offsets are in UTF-8 bytes
+        source = code.encode()
+        line_starts = [0]
+        for line in source.splitlines(keepends=True):
+            line_starts.append(line_starts[-1] + len(line))
+        # Only literals passed to a tool call are entities, a matching constant anywhere else (e.g. range(2)) is
+        # part of the plan itself. Abstract tools are called by their name without spaces, see ConcretePlanner.
+        apps = plan["abstract_tools"].get("apps", []) if isinstance(plan["abstract_tools"], dict) else []
+        tool_names = {app["name"].replace(" ", "") for app in apps if isinstance(app, dict) and "name" in app}
+        arguments = set()
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in tool_names:
+                arguments.update(id(argument) for argument in node.args)
+                arguments.update(id(keyword.value) for keyword in node.keywords)
+        literals = []
+        for node in ast.walk(tree):
+            if not isinstance(node, ast.Constant) or isinstance(node.value, bool):
+                continue
+            for slot, (_, _, kind, value) in enumerate(slots):
+                if isinstance(node.value, str) and kind != "number" and node.value == value:
+                    literal_type = str
+                elif isinstance(node.value, (int, float)) and kind == "number" and str(node.value) == value:
+                    literal_type = type(node.value)
+                else:
+                    continue
+                if id(node) not in arguments or any(slot == taken for _, _, taken, _ in literals):
+                    return None
+                literals.append((line_starts[node.lineno - 1] + node.col_offset,
+                                 line_starts[node.end_lineno - 1] + node.end_col_offset, slot, literal_type))
+                break
+        if {slot for _, _, slot, _ in literals} != set(range(len(slots))):
+            return None
+
+        literals.sort()
+        chunks, fills, position = [], [], 0
+        for start, end, slot, literal_type in literals:
+            chunks.append(source[position:start].decode())
+            fills.append((slot, literal_type.__name__))
+            position = end
+        chunks.append(source[position:].decode())
+        # An entity anywhere else in the code (e.g. inside a longer string) would not be replaced
+        if any(value in chunk for chunk in chunks for value in values):
+            return None
+        return chunks, fills
+
+    @staticmethod
+    def _render(template: dict[str, Any], slots: list[tuple[int, int, str, str]]) -> str | None:
+        casts = {"str": str, "int": int, "float": float}
+        parts = [template["chunks"][0]]
+        try:
+            for (slot, literal_type), chunk in zip(template["fills"], template["chunks"][1:]):
+                parts.append(repr(casts[literal_type](slots[slot][3])))
+                parts.append(chunk)
+        except ValueError:
+            return None
+        return "".join(parts)
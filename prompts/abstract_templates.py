@@ -1,6 +1,6 @@
 
-from langchain.prompts import PromptTemplate
-from langchain.prompts.chat import (
+from langchain_core.prompts import PromptTemplate
+from langchain_core.prompts.chat import (
     ChatPromptTemplate,
     SystemMessagePromptTemplate,
     HumanMessagePromptTemplate
@@ -283,3 +283,120 @@ def generate_abstract_tool_template() -> ChatPromptTemplate:
     template_planner = template_planner.partial(output_format=tools_output_format, output_format_empty=tools_output_empty_format,
                                                 shot_1=shot_1, shot_2=shot_2)
     return template_planner
+
+
+def generate_abstract_tools_and_plan_template() -> ChatPromptTemplate:
+    """
+    Prompt of the single-call planning mode: the abstract tools and the plan that uses them in one response
+    """
+    shot_1: str = ("""
+        # This is an example of a user query that requires a single abstract app.
+
+        User: Generate a poem and count the number of r's
+
+        Generated output:
+        ```json
+        {
+            "apps": [
+                {
+                    "name": "PoemGenerator",
+                    "description": "A tool that generates a poem based on a given theme or prompt",
+                    "inputs": {
+                        "theme": {"type": "str", "description": "The theme or prompt for the poem"}
+                    },
+                    "output": {"type": "str", "description": "The generated poem"}
+                }
+            ]
+        }
+        ```
+        ```python
+        def main():
+            poem: str = PoemGenerator("nature")
+            result = poem.count('r')
+            return result
+        ```
+    """)
+
+    shot_2: str = ("""
+        # This is an example of a user query that requires two abstract apps and a user input (builtin).
+
+        User: Please summarize the latest news articles on the topic of AI and send the result in an email
+
+        Generated output:
+        ```json
+        {
+            "apps": [
+                {
+                    "name": "NewsSummarizer",
+                    "description": "A tool that summarizes the latest news articles on a given topic",
+                    "inputs": {
+                        "topic": {"type": "str", "description": "The topic to summarize news about"}
+                    },
+                    "output": {"type": "str", "description": "A summary of the latest news articles on the topic"}
+                },
+                {
+                    "name": "EmailSender",
+                    "description": "A tool that sends an email with the provided content to a specified email address",
+                    "inputs": {
+                        "email_address": {"type": "str", "description": "The email address to send the content to"},
+                        "content": {"type": "str", "description": "The content to be sent in the email"}
+                    },
+                    "output": {"type": "str", "description": "A confirmation that the email has been sent"}
+                }
+            ]
+        }
+        ```
+        ```python
+        def main():
+            news: str = NewsSummarizer("AI")
+            email_addr: str = UserInput()
+            conf: str = EmailSender(email_addr, news)
+            return conf
+        ```
+    """)
+
+    template_str = ("""
+        # Prompt
+
+        Objective:
+        Your task is to devise the abstract apps needed to complete a user query, and a plan that uses them.
+        These tasks may or may not involve the usage of external tools, so there can be 0 or many abstract apps.
+        Assume that each abstract app is designed for a particular task.
+
+        Tools:
+        An abstract app performs a specific task and has a name, a description, inputs and an output.
+        The inputs and output are described using data types and brief descriptions.
+        Data types that can be used are a primitive or a list of primitives. Primitives can be an integer, float, or str.
+        The created signatures should be brief yet informative.
+
+        In addition to abstract apps, you always have access to the following built-in functions:
+        - UserInput(): A function that prompts the user to provide an input.
+        - GetAllImplementations(app_name): A function that returns all implementations of a given abstract app.
+
+        Output format:
+        First the abstract apps as JSON in a ```json block, in the format {{"apps": [...]}}, with an empty list
+        if no apps are needed. Then the plan in a ```python block: a function main() that calls the abstract apps
+        by name and returns the result.
+
+        Example 1:
+        {shot_1}
+
+        Example 2:
+        {shot_2}
+
+        You MUST STRICTLY follow the above provided output examples. Only answer with the two blocks, no other text
+    """)
+
+    template_planner_message = [SystemMessagePromptTemplate(prompt=PromptTemplate(
+        input_variables=['shot_1', 'shot_2'], template=template_str)),
+        HumanMessagePromptTemplate(prompt=PromptTemplate(input_variables=['input'],
+                                                         template="User Query: {input} \n Ensure that a tool is always used if applicable."))
+    ]
+
+    template_planner = ChatPromptTemplate(
+        input_variables=['shot_1', 'shot_2', 'input'],
+        messages=template_planner_message
+    )
+
+    template_planner = template_planner.partial(shot_1=shot_1, shot_2=shot_2)
+    return template_planner
@@ -1,27 +1,46 @@
-from langchain.tools import StructuredTool
 from clearence import Clearence
 from typing import Callable
 
+import hashlib
+import importlib
+import inspect
+
+INPUT_TYPES = ("str", "int", "float", "list[str]", "list[int]", "list[float]", "dict")
+
+
 class RegisteredTool():
     """
     Represents an app containing a tool that is registered in the orcherstrator
-    Composes with StructuredTool
+    Composes with StructuredTool, which is only built the first time it is used
     State also includes clearance level and tool provider
+    func may be given as a "module:function" reference, which is imported the first time the function is needed
+    source and signature may be given up front (e.g. by a compiled catalog), otherwise they are read from func on first use
     """
+    __slots__ = ("name", "func", "description", "provider", "clearence", "inputs", "output", "source", "signature",
+                 "_tool", "_document", "_content_hash")
+
     def __init__(self, name: str, func, description: str, provider: str = "Unaffiliated", inputs: list[dict] = None, output: dict = None,\
-        clearance: Clearence = Clearence.LOW):
-        self.tool: StructuredTool = StructuredTool.from_function(name=name, func=func, description=description)
+        clearance: Clearence = Clearence.LOW, source: str = None, signature: str = None):
+        self.name: str = name
+        self.func: Callable | str = func
+        self.description: str = description
         self.provider: str = provider
         self.clearence: Clearence = clearance
+        self.source: str | None = source
+        self.signature: str | None = signature
+        self._tool = None
+        self._document: str | None = None
+        self._content_hash: str | None = None
         if not inputs:
             self.inputs = []
         else:
-            for input in inputs:
+            # Inputs are either a list of {type, description} dicts or a mapping from parameter name to one
+            for input in (inputs.values() if isinstance(inputs, dict) else inputs):
                 if not "type" in input or not "description" in input:
                     raise ValueError("Inputs must each have a type and description")
-                if input["type"] not in ("str", "int", "float", "list[str]", "list[int]", "list[float]", "dict"):
+                if input["type"] not in INPUT_TYPES:
                     raise ValueError("Unrecognized type")
-            self.inputs: list[dict] = inputs
+            self.inputs: list[dict] | dict[str, dict] = inputs
         if not output:
             self.output = {}
         else:
@@ -29,44 +48,123 @@ class RegisteredTool():
                 raise ValueError("Output must be a dict with type and description")
             self.output: dict = output
 
+    @property
+    def tool(self):
+        """
+        Returns the LangChain StructuredTool for this tool, building it on first use
+        """
+        if self._tool is None:
+            from langchain.tools import StructuredTool
+            self._tool = StructuredTool.from_function(name=self.name, func=self.get_func(), description=self.description)
+        return self._tool
+
     def get_name(self) -> str:
         """
         Returns the name of the field.
         Equivelent to self.tool.name
         """
-        return self.tool.name
-    
-    
-    
+        return self.name
+
+
+
     def get_func(self) -> Callable:
         """
-        Returns the func of the field.
+        Returns the func of the field, importing it first if it was registered as a "module:function" reference.
         Equivelent to self.tool.func
         """
-        return self.tool.func
-    
-    
+        if isinstance(self.func, str):
+            module, _, function = self.func.partition(":")
+            if not function:
+                raise ValueError(f"Function reference must look like module:function, got {self.func}")
+            target = importlib.import_module(module)
+            for attribute in function.split("."):
+                target = getattr(target, attribute)
+            self.func = target
+        return self.func
+
+    def get_func_name(self) -> str:
+        """
+        Returns the name the function is defined under, without importing it
+        """
+        if isinstance(self.func, str):
+            return self.func.rpartition(".")[2].rpartition(":")[2]
+        return self.func.__name__
+
+    def func_reference(self) -> str:
+        """
+        Returns the "module:function" reference the function can be imported from
+
+        raises:
+            ValueError if the function cannot be imported by reference, e.g. a lambda or a function defined in __main__
+        """
+        if isinstance(self.func, str):
+            return self.func
+        module, qualname = self.func.__module__, self.func.__qualname__
+        if module == "__main__" or "<" in qualname:
+            raise ValueError(f"The function of {self.name} ({module}.{qualname}) cannot be imported by reference")
+        return f"{module}:{qualname}"
+
+    def get_source(self) -> str:
+        """
+        Returns the source code of the function. Read once and cached.
+        """
+        if self.source is None:
+            self.source = inspect.getsource(self.get_func())
+        return self.source
+
+    def get_signature(self) -> str:
+        """
+        Returns the signature of the function, e.g. "(document_name: str) -> str". Read once and cached.
+        """
+        if self.signature is None:
+            self.signature = str(inspect.signature(self.get_func()))
+        return self.signature
+
+    def validate_signature(self):
+        """
+        Checks that the declared inputs can be passed to the function
+
+        raises:
+            ValueError if the function takes fewer arguments than there are inputs, or lacks a named input
+        """
+        parameters = inspect.signature(self.get_func()).parameters.values()
+        kinds = {parameter.kind for parameter in parameters}
+        if isinstance(self.inputs, dict):
+            missing = set(self.inputs) - {parameter.name for parameter in parameters}
+            if missing and inspect.Parameter.VAR_KEYWORD not in kinds:
+                raise ValueError(f"{self.name} declares inputs its function does not take: {', '.join(sorted(missing))}")
+        elif inspect.Parameter.VAR_POSITIONAL not in kinds:
+            positional = [parameter for parameter in parameters if parameter.kind in
+                          (inspect.Parameter.POSITIONAL_ONLY, inspect.Parameter.POSITIONAL_OR_KEYWORD)]
+            if len(self.inputs) > len(positional):
+                raise ValueError(f"{self.name} declares {len(self.inputs)} inputs but its function takes {len(positional)}")
+
     def get_description(self) -> str:
         """
         Returns the description of the field.
         Equivelent to self.tool.description
         """
-        return self.tool.description
-    
+        return self.description
+
     def input_str(self) -> str:
         """
         Returns strings rep of input
         """
         if not self.inputs:
             return ""
+        if isinstance(self.inputs, dict):
+            inputs = self.inputs.items()
+        else:
+            inputs = ((input.get("name", f"arg{i}"), input) for i, input in enumerate(self.inputs))
         result = "\nInputs:"
-        for name, details in self.inputs.items():
+        for name, details in inputs:
             try:
-                result += f" {name} ({details['type']}): {details['description']}, " 
+                result += f" {name} ({details['type']}): {details['description']}, "
             except Exception as e:
                 print("ERROR:", e)
                 continue
-            
+        return result
+
     def output_str(self) -> str:
         """
         Returns strings rep of output
@@ -79,7 +177,24 @@ class RegisteredTool():
         except Exception as e:
             print("Error:", e)
         return result
-    
+
+    def document(self) -> str:
+        """
+        Returns the canonical text the tool is indexed and matched by. Built once and cached.
+        """
+        if self._document is None:
+            self._document = self.name + ": " + self.description + self.input_str() + self.output_str()
+        return self._document
+
+    def content_hash(self) -> str:
+        """
+        Returns a hash of everything that identifies the tool's content: its document, provider and clearance
+        """
+        if self._content_hash is None:
+            content = "\0".join((self.document(), self.provider, self.clearence.name))
+            self._content_hash = hashlib.blake2b(content.encode(), digest_size=16).hexdigest()
+        return self._content_hash
+
     def get_clearance_level(self) -> int:
         """
         Returns the clearence level of the tool
@@ -89,8 +204,8 @@ class RegisteredTool():
         except Exception as e:
             print("Error Occured:", e)
             return 0
-        
+
     def __str__(self) -> str:
         result = f"{self.get_name()}\n {self.get_description()}"
         return result
-        
\ No newline at end of file
+
@@ -0,0 +1,58 @@
+from contextlib import contextmanager
+from typing import Iterator
+
+import threading
+
+
+class ReadWriteLock:
+    """
+    Lets any number of readers hold the lock at once, or a single writer.
+
+    Has the following responsibilities:
+        - Keep writers out while anyone is reading, and everyone out while someone is writing
+        - Stop admitting new readers once a writer is waiting, so a steady stream of searches cannot starve it
+    The lock is not reentrant: a thread holding it must not acquire it again.
+    """
+
+    def __init__(self):
+        self._condition: threading.Condition = threading.Condition()
+        self._readers: int = 0
+        self._writing: bool = False
+        self._waiting_writers: int = 0
+
+    @contextmanager
+    def read(self) -> Iterator[None]:
+        """
+        Holds the lock shared for the duration of the with block
+        """
+        with self._condition:
+            while self._writing or self._waiting_writers:
+                self._condition.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+                if not self._readers:
+                    self._condition.notify_all()
+
+    @contextmanager
+    def write(self) -> Iterator[None]:
+        """
+        Holds the lock exclusively for the duration of the with block
+        """
+        with self._condition:
+            self._waiting_writers += 1
+            try:
+                while self._writing or self._readers:
+                    self._condition.wait()
+            finally:
+                self._waiting_writers -= 1
+            self._writing = True
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writing = False
+                self._condition.notify_all()
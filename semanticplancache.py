@@ -0,0 +1,151 @@
+from toolindex import ToolIndex
+from toolregistry import CatalogSnapshot
+from clearence import Clearence
+
+from collections import OrderedDict
+from typing import Any
+
+import ast
+import itertools
+import re
+import threading
+
+
+"""
+Semantic cache of finished plans, for paraphrased queries that the exact PlanCache misses.
+
+Each planned query is embedded and kept in a vector index along with its plan. A new query reuses the plan of the most
+similar past query when:
+    - their cosine similarity is at least the threshold
+    - it was planned by the same planner (mode and models) at the same clearance
+    - every concrete tool the plan was matched to is still registered, unchanged
+    - every string or number literal of its plan appears in the new query as a whole word, so a plan for "Boston" is
+      never run for "Paris", nor one for 1 donut for 10 donuts. Literals without letters or digits are ignored.
+Unlike the exact cache, tools added to or removed from the rest of the catalog do not invalidate a plan.
+"""
+
+
+class SemanticPlanCache:
+    """
+    Bounded store of plans searchable by query embedding.
+
+    Has the following responsibilities:
+        - Find the closest reusable plan of a query embedding
+        - Evict the least recently used plan once maxsize plans are stored
+        - Report the hit rate and the planning (LLM) time saved by hits
+    """
+
+    def __init__(self, threshold: float = 0.9, maxsize: int = 1024, candidates: int = 8):
+        """
+        params:
+            threshold: The lowest cosine similarity at which a past query's plan is reused
+            maxsize: Most plans kept
+            candidates: How many of the closest past queries are checked for a reusable plan
+        """
+        if not 0 < threshold <= 1:
+            raise ValueError("The similarity threshold must be in (0, 1]")
+        self.threshold: float = threshold
+        self.maxsize: int = maxsize
+        self.candidates: int = candidates
+        self.index: ToolIndex = ToolIndex()
+        self._entries: OrderedDict[str, dict[str, Any]] = OrderedDict()
+        self._ids = itertools.count()
+        self._lock: threading.Lock = threading.Lock()
+        self.hits: int = 0
+        self.misses: int = 0
+        # Candidates over the threshold that could not be used, because one of their tools changed or is gone, or their
+        # plan has literals the new query does not mention
+        self.stale: int = 0
+        self.saved_seconds: float = 0.0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, query: str, vector, snapshot: CatalogSnapshot, planner: str,
+            clearance: Clearence = None) -> dict[str, Any] | None:
+        """
+        Returns the reusable plan closest to a query embedding, or None
+
+        params:
+            query: The query, the literals of a reused plan must all appear in it
+            vector: The embedding of the query
+            snapshot: The catalog the plan would run against
+            planner: Identifies what produces plans, see Orchestrator
+            clearance: The clearance the query runs at
+        """
+        with self._lock:
+            for entry_id, similarity in self.index.search(vector, self.candidates)[0]:
+                if similarity < self.threshold:
+                    break
+                entry = self._entries[entry_id]
+                if entry["planner"] != planner or entry["clearance"] != (clearance.name if clearance else None):
+                    continue
+                if not self._registered(entry["tools"], snapshot) or not self._mentioned(entry["literals"], query):
+                    self.stale += 1
+                    continue
+                self._entries.move_to_end(entry_id)
+                self.hits += 1
+                self.saved_seconds += entry["plan"].get("planning_seconds", 0.0)
+                return {**entry["plan"], "similarity": similarity, "cached_query": entry["query"]}
+            self.misses += 1
+            return None
+
+    def put(self, query: str, vector, plan: dict[str, Any], snapshot: CatalogSnapshot, planner: str,
+            clearance: Clearence = None):
+        """
+        Stores the plan of a query, see plancache for its fields
+        """
+        tools = {name: snapshot.get(name).content_hash() for name in plan["matches"].values() if name in snapshot}
+        with self._lock:
+            entry_id = str(next(self._ids))
+            self._entries[entry_id] = {"query": query, "plan": plan, "planner": planner, "tools": tools,
+                                       "literals": self._literals(plan["abstract_code"]),
+                                       "clearance": clearance.name if clearance else None}
+            self.index.add(entry_id, vector)
+            while len(self._entries) > self.maxsize:
+                evicted, _ = self._entries.popitem(last=False)
+                self.index.remove(evicted)
+
+    def stats(self) -> dict[str, float]:
+        """
+        Returns the hit rate and the planning time saved by hits, in seconds
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "threshold": self.threshold,
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale": self.stale,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "saved_seconds": self.saved_seconds,
+            }
+
+    @staticmethod
+    def _literals(code: str) -> set[str]:
+        """
+        Returns the string and number literals of plan code that hold a letter or a digit
+        """
+        literals = set()
+        for node in ast.walk(ast.parse(code)):
+            if isinstance(node, ast.Constant) and isinstance(node.value, (str, int, float)) \
+                    and not isinstance(node.value, bool):
+                literal = str(node.value)
+                if any(character.isalnum() for character in literal):
+                    literals.add(literal)
+        return literals
+
+    @staticmethod
+    def _mentioned(literals: set[str], query: str) -> bool:
+        # Whole words only, so "1" is not found in "10", nor "Bo" in "Boston"
+        return all(re.search(rf"(?<!\w){re.escape(literal)}(?!\w|\.\d)", query, re.IGNORECASE) for literal in literals)
+
+    @staticmethod
+    def _registered(tools: dict[str, str], snapshot: CatalogSnapshot) -> bool:
+        for name, content_hash in tools.items():
+            tool = snapshot.get(name)
+            if tool is None or tool.content_hash() != content_hash:
+                return False
+        return True
@@ -0,0 +1,113 @@
+import builtins
+import importlib
+import importlib.util
+import sys
+import threading
+import time
+
+
+"""
+Startup time report for the CLI, in the style of python -X importtime.
+
+    python main.py --startup-report
+
+prints every module imported on the way to the first prompt with its self and cumulative import time in microseconds,
+followed by the time to the first prompt.
+"""
+
+
+class ImportTimer:
+    """
+    Times the imports made while it is installed by wrapping builtins.__import__ and importlib.import_module
+    (e.g. RegisteredTool's lazy "module:function" references).
+    Submodules loaded by "from package import submodule" are timed on their own, since importlib loads them without
+    going through builtins.__import__.
+    Self time excludes the time spent in the module's own (nested) imports, cumulative time includes it.
+    """
+
+    def __init__(self):
+        self.start: float = time.perf_counter()
+        # (depth, module, self time, cumulative time) in the order imports finish, as -X importtime prints them
+        self.timings: list[tuple[int, str, float, float]] = []
+        self._local: threading.local = threading.local()
+        self._import = builtins.__import__
+        self._import_module = importlib.import_module
+
+    def install(self):
+        """
+        Starts timing imports
+
+        returns:
+            self for easy callback
+        """
+        builtins.__import__ = self._timed_import
+        importlib.import_module = self._timed_import_module
+        return self
+
+    def uninstall(self):
+        """
+        Stops timing imports
+        """
+        builtins.__import__ = self._import
+        importlib.import_module = self._import_module
+
+    def report(self, max_depth: int = 2, file=sys.stderr):
+        """
+        Prints the imports up to max_depth levels deep (1 is the top level) and the time elapsed since the timer was
+        created
+        """
+        elapsed = time.perf_counter() - self.start
+        print("import time: self [us] | cumulative | imported package", file=file)
+        for depth, name, own, cumulative in self.timings:
+            if depth < max_depth:
+                print(f"import time: {own * 1e6:9.0f} | {cumulative * 1e6:10.0f} | {'  ' * depth}{name}", file=file)
+        imported = sum(cumulative for depth, _, _, cumulative in self.timings if depth == 0)
+        print(f"startup: {elapsed * 1e3:.0f} ms to first prompt, {imported * 1e3:.0f} ms of it importing "
+              f"{len(self.timings)} modules", file=file)
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        module = name
+        if level:
+            package = (globals or {}).get("__package__") or ""
+            module = importlib.util.resolve_name("." * level + name, package)
+        if module in sys.modules:
+            package = sys.modules[module]
+            if fromlist and hasattr(package, "__path__"):
+                for attribute in fromlist:
+                    if attribute != "*" and not hasattr(package, attribute):
+                        self._import_submodule(f"{module}.{attribute}")
+            return self._import(name, globals, locals, fromlist, level)
+        return self._timed(module, lambda: self._import(name, globals, locals, fromlist, level))
+
+    def _timed_import_module(self, name, package=None):
+        module = importlib.util.resolve_name(name, package) if name.startswith(".") else name
+        if module in sys.modules:
+            return self._import_module(name, package)
+        return self._timed(module, lambda: self._import_module(name, package))
+
+    def _import_submodule(self, module: str):
+        """
+        Imports a submodule named in a fromlist ahead of the import that names it, so that it is timed
+        """
+        if module in sys.modules:
+            return
+        try:
+            self._timed(module, lambda: self._import_module(module))
+        except ModuleNotFoundError as error:
+            # Not a submodule: the from import itself reports the missing name, like importlib does
+            if error.name != module:
+                raise
+
+    def _timed(self, module: str, load):
+        # Each entry of the stack collects the time spent in imports nested under the import being timed
+        stack = self._local.__dict__.setdefault("stack", [])
+        stack.append(0.0)
+        started = time.perf_counter()
+        try:
+            return load()
+        finally:
+            cumulative = time.perf_counter() - started
+            nested = stack.pop()
+            if stack:
+                stack[-1] += cumulative
+            self.timings.append((len(stack), module, cumulative - nested, cumulative))
@@ -0,0 +1,148 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from concreteplanner import ConcretePlanner
+from embeddingbackends import HashedNgramEmbeddings
+from registeredtool import RegisteredTool
+from clearence import Clearence
+from toolregistry import ToolRegistry
+
+FORECASTER = {"name": "WeatherForecaster", "description": "Gets the weather forecast for a city",
+              "inputs": {"city": {"type": "str", "description": "The city"}},
+              "output": {"type": "str", "description": "The forecast"}}
+
+
+def forecast(city: str) -> str:
+    return f"Sunny in {city}"
+
+
+class FailingEmbeddings(HashedNgramEmbeddings):
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        raise ConnectionError("The embedding backend is down")
+
+
+def make_planner(embeddings=None) -> tuple[ConcretePlanner, set[RegisteredTool]]:
+    tools = {RegisteredTool("Forecast", forecast, "Gets the weather forecast for a city",
+                            inputs=[{"name": "city", "type": "str", "description": "The city"}])}
+    return ConcretePlanner(debug=False, embeddings=embeddings or HashedNgramEmbeddings()), tools
+
+
+def test_batch_isolates_malformed_apps():
+    planner, tools = make_planner()
+    malformed = [[{"name": "Broken", "description": "No inputs or output"}],
+                 [{"description": "No name", "inputs": {}, "output": {"type": "str", "description": "x"}}],
+                 [{"name": "BadInputs", "description": "x", "inputs": None, "output": {}}]]
+    results = planner.match_tools_batch(tools, [[FORECASTER], *malformed])
+    assert results[0]["WeatherForecaster"].get_name() == "Forecast", "Well formed plans must still be matched"
+    assert all(isinstance(result, Exception) for result in results[1:]), \
+        "A malformed abstract tool must only fail its own plan"
+
+
+def test_batch_embedding_failure():
+    planner, tools = make_planner(FailingEmbeddings())
+    results = planner.match_tools_batch(tools, [[FORECASTER], [FORECASTER]])
+    assert all(isinstance(result, ConnectionError) for result in results), \
+        "An embedding failure must be returned for every plan instead of raised"
+
+
+def test_prefilter_never_scores_higher_clearance():
+    planner = ConcretePlanner(debug=False, embeddings=HashedNgramEmbeddings(), prefilter=2)
+    inputs = [{"name": "city", "type": "str", "description": "The city"}]
+    tools = {RegisteredTool("Forecast", forecast, "Gets the weather forecast for a city", inputs=inputs),
+             RegisteredTool("SecretForecast", forecast, "Gets the weather forecast for a city", inputs=inputs,
+                            clearance=Clearence.HIGH)}
+    scored = []
+    scores = planner.lexical_index.scores
+    planner.lexical_index.scores = lambda text, allowed=None: scored.append(allowed) or scores(text, allowed)
+    matches = planner.match_tools(tools, [FORECASTER], Clearence.LOW)
+    assert matches["WeatherForecaster"].get_name() == "Forecast"
+    assert scored and all(allowed is not None and "SecretForecast" not in allowed for allowed in scored), \
+        "Tools above the clearance must never be scored"
+
+
+def test_no_permitted_tool():
+    planner = ConcretePlanner(debug=False, embeddings=HashedNgramEmbeddings())
+    tools = {RegisteredTool("SecretForecast", forecast, "Gets the weather forecast for a city",
+                            inputs=[{"name": "city", "type": "str", "description": "The city"}],
+                            clearance=Clearence.HIGH)}
+    try:
+        planner.match_tools(tools, [FORECASTER], Clearence.LOW)
+    except ValueError as error:
+        assert "WeatherForecaster" in str(error) and "LOW" in str(error), \
+            "The error must name the abstract tool and the clearance"
+        return
+    raise AssertionError("Matching with no tool at the clearance must raise a ValueError")
+
+
+def test_index_options():
+    options = {"nprobe": 3, "ef_search": 7, "min_ann_size": 50, "cascade_candidates": 9}
+    planner = ConcretePlanner(debug=False, embeddings=HashedNgramEmbeddings(), index_mode="ivf", index_options=options)
+    assert all((index.nprobe, index.ef_search, index.min_ann_size, index.cascade_candidates) == (3, 7, 50, 9)
+               for index in planner.indexes.values()), "index_options must reach the index of every clearance level"
+
+
+def test_stale_snapshot_is_read_only():
+    planner, tools = make_planner()
+    registry = ToolRegistry()
+    for tool in tools:
+        registry.add(tool)
+    planner.add_tools(list(tools))
+    snapshot = registry.snapshot()
+    registry.remove("Forecast")
+    planner.remove_tool("Forecast")
+    try:
+        planner.match_tools(snapshot, [FORECASTER])
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("Tools removed after the snapshot was taken must not be matched")
+    assert "Forecast" not in planner.tools and all("Forecast" not in index for index in planner.indexes.values()), \
+        "Matching against a snapshot must never add its tools back to the indexes"
+
+
+def test_same_function_names():
+    planner, _ = make_planner()
+    inputs = [{"name": "city", "type": "str", "description": "The city"}]
+    first = RegisteredTool("Sunny", "pkg_a:run", "Forecast", inputs=inputs,
+                           source="def run(city):\n    return 'Sunny in ' + city\n")
+    second = RegisteredTool("Rainy", "pkg_b:run", "Forecast", inputs=inputs,
+                            source="def run(city):\n    return 'Rainy in ' + city\n")
+    code = planner.concretize("def main():\n    sun = GetSun('Boston')\n    return sun + ', ' + GetRain('Paris')\n",
+                              {"GetSun": first, "GetRain": second})
+    assert planner.run_plan(code) == "Sunny in Boston, Rainy in Paris", \
+        "Tools whose functions share a bare name must each run their own source"
+
+
+def test_batch_reusing_a_name_across_clearances():
+    planner = ConcretePlanner(debug=False, embeddings=HashedNgramEmbeddings())
+    inputs = [{"name": "city", "type": "str", "description": "The city"}]
+    low = RegisteredTool("Forecast", forecast, "Gets the weather forecast for a city", inputs=inputs)
+    high = RegisteredTool("Forecast", forecast, "Gets the weather forecast for a city", inputs=inputs,
+                          clearance=Clearence.HIGH)
+    planner.add_tools([low, high])
+    assert planner.tools["Forecast"] is high and "Forecast" not in planner.indexes[Clearence.LOW], \
+        "The last tool of a name in a batch must replace the others in every partition"
+    try:
+        planner.match_tools([high], [FORECASTER], Clearence.LOW)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("A tool moved to a higher clearance must not be matched below it")
+    planner.remove_tool("Forecast")
+    assert all("Forecast" not in index for index in planner.indexes.values()), "Removal must leave no stale rows"
+
+
+def test_concreteplanner():
+    test_batch_isolates_malformed_apps()
+    test_batch_embedding_failure()
+    test_prefilter_never_scores_higher_clearance()
+    test_no_permitted_tool()
+    test_index_options()
+    test_stale_snapshot_is_read_only()
+    test_same_function_names()
+    test_batch_reusing_a_name_across_clearances()
+    print("Tests Passed!")
+
+test_concreteplanner()
@@ -0,0 +1,79 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import asyncio
+import tempfile
+
+import numpy as np
+
+from embeddingcache import CachedEmbeddings, EmbeddingCache
+from langchain_core.embeddings import Embeddings
+
+
+class PrefixedEmbeddings(Embeddings):
+    """
+    Embeds queries differently from documents, like instruction-tuned backends do
+    """
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return [[1.0, 0.0] for _ in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        return [0.0, 1.0]
+
+    async def aembed_query(self, text: str) -> list[float]:
+        return [0.0, -1.0]
+
+
+def test_round_trip():
+    path = tempfile.mkdtemp()
+    EmbeddingCache(path).put_many("model", ["a", "b"], [[1, 0], [0, 1]])
+    cache = EmbeddingCache(path)
+    assert np.array_equal(cache.get_many("model", ["b"])[0], [0, 1]), "Vectors must be read back by text"
+    assert cache.get_many("other model", ["a"]) == [None], "Vectors must be keyed by model"
+
+
+def test_recovers_from_crashed_writer():
+    path = tempfile.mkdtemp()
+    EmbeddingCache(path).put_many("model", ["a"], [[1, 0]])
+    directory = EmbeddingCache(path).arena_path("model")
+    # A writer that crashed after appending its row, and halfway through its key
+    with open(os.path.join(directory, "vectors.f32"), "ab") as arena:
+        arena.write(np.array([[9, 9]], dtype=np.float32).tobytes())
+    with open(os.path.join(directory, "keys.bin"), "ab") as keys:
+        keys.write(b"torn")
+
+    cache = EmbeddingCache(path)
+    cache.put_many("model", ["b", "c"], [[0, 1], [1, 1]])
+    assert [list(vector) for vector in EmbeddingCache(path).get_many("model", ["a", "b", "c"])] == \
+        [[1, 0], [0, 1], [1, 1]], "Rows left by a crashed writer must not shift later keys onto the wrong vectors"
+
+
+def test_models_of_different_dimensions():
+    path = tempfile.mkdtemp()
+    EmbeddingCache(path).put_many("small", ["a"], [[1, 0]])
+    EmbeddingCache(path).put_many("large", ["a"], [[1, 0, 0]])
+    cache = EmbeddingCache(path)
+    assert (cache.dim("small"), cache.dim("large")) == (2, 3), "Each model must have its own dimension"
+    assert [list(cache.get_many(model, ["a"])[0]) for model in ("small", "large")] == [[1, 0], [1, 0, 0]]
+
+
+def test_queries_cached_apart_from_documents():
+    embeddings = CachedEmbeddings(PrefixedEmbeddings(), EmbeddingCache(tempfile.mkdtemp()))
+    assert embeddings.embed_documents(["weather"]) == [[1.0, 0.0]]
+    assert embeddings.embed_query("weather") == [0.0, 1.0], "A cached document must not be returned for a query"
+    assert embeddings.embed_documents(["weather"]) == [[1.0, 0.0]], "A cached query must not be returned for a document"
+    assert asyncio.run(embeddings.aembed_query("forecast")) == [0.0, -1.0], \
+        "aembed_query must call the backend's aembed_query"
+
+
+def test_embeddingcache():
+    test_round_trip()
+    test_models_of_different_dimensions()
+    test_queries_cached_apart_from_documents()
+    test_recovers_from_crashed_writer()
+    print("Tests Passed!")
+
+test_embeddingcache()
@@ -0,0 +1,87 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import asyncio
+import threading
+
+from llmregistry import LLMClientRegistry, InFlightLimiter
+
+
+class OkHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+
+def test_async_client_across_event_loops():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), OkHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/"
+    registry = LLMClientRegistry()
+    registry._create_http_clients()
+    client = registry._http_async_client
+
+    async def fetch() -> list[str]:
+        return [(await client.get(url)).text for _ in range(3)]
+
+    try:
+        # Each asyncio.run is a new loop, the keep-alive connections of the previous one are bound to a closed loop
+        assert asyncio.run(fetch()) == asyncio.run(fetch()) == ["ok"] * 3, \
+            "The shared async client must work from a second event loop"
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(asyncio.run(fetch()))) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert results == [["ok"] * 3] * 4, "Loops running at once on different threads must each get their own pool"
+        assert registry.stats()["in_flight"] == 0, "Every in-flight slot must be released"
+    finally:
+        registry.close()
+        server.shutdown()
+
+
+def test_limiter_serves_waiters_in_order():
+    limiter = InFlightLimiter(1)
+    order = []
+
+    async def request(number: int):
+        await limiter.acquire_async()
+        order.append(number)
+        await asyncio.sleep(0)
+        limiter.release()
+
+    async def run():
+        limiter.acquire()
+        tasks = [asyncio.create_task(request(number)) for number in range(5)]
+        await asyncio.sleep(0)
+        cancelled = asyncio.create_task(request(99))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        limiter.release()
+        await asyncio.gather(*tasks)
+        return cancelled
+
+    cancelled = asyncio.run(run())
+    assert order == list(range(5)), "Waiters must be handed slots in the order they arrived"
+    assert cancelled.cancelled() and limiter.in_flight == 0 and limiter.peak == 1, \
+        "A cancelled waiter must leave the queue without holding a slot"
+
+
+def test_llmregistry():
+    test_async_client_across_event_loops()
+    test_limiter_serves_waiters_in_order()
+    print("Tests Passed!")
+
+test_llmregistry()
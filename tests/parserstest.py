@@ -0,0 +1,76 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import json
+
+from parsers import AppStreamParser
+
+APPS = {"apps": [
+    {"name": "DocumentSummarizer", "description": "Summarizes {braces} and [brackets] and \"quotes\" \\ too",
+     "inputs": {"name": {"type": "str", "description": "The document name"}},
+     "output": {"type": "str", "description": "A summary"}},
+    {"name": "EmailSender", "description": "Sends \"}\" safely", "inputs": {}, "output": {}}]}
+
+
+def stream(text: str, size: int) -> tuple[AppStreamParser, list[list[dict]]]:
+    parser = AppStreamParser()
+    completed = [parser.feed(text[start:start + size]) for start in range(0, len(text), size)]
+    return parser, completed
+
+
+def test_every_chunk_boundary():
+    text = "Here are the tools:\n" + json.dumps(APPS, indent=4)
+    for size in (1, 2, 3, 5, 7, len(text)):
+        parser, completed = stream(text, size)
+        parser.close()
+        assert parser.apps == APPS["apps"], f"Chunks of {size} characters must give the same apps"
+        assert [app for apps in completed for app in apps] == APPS["apps"], "Each app must be handed out once"
+
+
+def test_apps_handed_out_when_complete():
+    text = json.dumps(APPS)
+    end = text.index('"EmailSender"')
+    parser = AppStreamParser()
+    assert parser.feed(text[:end]) == [APPS["apps"][0]], "An app must be handed out as soon as it is closed"
+    assert parser.feed(text[end:]) == [APPS["apps"][1]]
+
+
+def test_escape_split_across_chunks():
+    text = '{"apps": [{"name": "A", "description": "ends with \\\\"}, {"name": "B", "description": "\\"}\\""}]}'
+    for split in range(len(text)):
+        parser = AppStreamParser()
+        parser.feed(text[:split])
+        parser.feed(text[split:])
+        parser.close()
+        assert parser.apps == json.loads(text)["apps"], f"Splitting at {split} must not change the apps"
+
+
+def test_empty_list():
+    parser, completed = stream('{"apps": []}', 1)
+    parser.close()
+    assert parser.apps == [] and not any(completed), "An empty apps list must complete with no apps"
+
+
+def test_truncated_stream():
+    text = json.dumps(APPS)
+    for end in (0, text.index("["), text.index('"EmailSender"'), len(text) - 2):
+        parser = AppStreamParser()
+        parser.feed(text[:end])
+        try:
+            parser.close()
+        except ValueError:
+            continue
+        raise AssertionError(f"close() must raise when the stream stops after {end} characters")
+
+
+def test_parsers():
+    test_every_chunk_boundary()
+    test_apps_handed_out_when_complete()
+    test_escape_split_across_chunks()
+    test_empty_list()
+    test_truncated_stream()
+    print("Tests Passed!")
+
+test_parsers()
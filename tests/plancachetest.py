@@ -0,0 +1,104 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import tempfile
+import time
+
+from clearence import Clearence
+from orchestrator import Orchestrator
+from plancache import PlanCache, normalize_query, plan_key
+from registeredtool import RegisteredTool
+
+PLAN = {"abstract_tools": {"apps": []}, "abstract_code": "def main():\n    return 1", "matches": {},
+        "planning_seconds": 0.5}
+
+
+def forecast(city: str) -> str:
+    return f"Sunny in {city}"
+
+
+def make_tool(name: str = "Forecast") -> RegisteredTool:
+    return RegisteredTool(name, forecast, "Gets the weather forecast for a city",
+                          inputs=[{"name": "city", "type": "str", "description": "The city"}])
+
+
+def test_normalize_query():
+    assert normalize_query("  What is\tthe weather\n in  Boston? ") == "What is the weather in Boston?"
+    assert normalize_query("Café") == normalize_query("Café"), "Queries must be unicode normalized"
+    assert normalize_query("Findings") != normalize_query("findings"), "Case must be kept"
+
+
+def test_key_invalidation():
+    orchestrator = Orchestrator(debug=False, embedding_cache_path=None, embedding_backend="hashed")
+    orchestrator.add_tool(make_tool())
+
+    def key(query: str = "weather in Boston", clearance: Clearence = None) -> str:
+        return plan_key(query, orchestrator.tools.snapshot().fingerprint(), "two_call", clearance)
+
+    original = key()
+    assert key(" weather  in Boston ") == original, "Queries differing only in whitespace must share a key"
+    assert key(clearance=Clearence.LOW) != original, "Plans must be keyed by clearance"
+    orchestrator.add_tool(make_tool("Email"))
+    added = key()
+    assert added != original, "Adding a tool must invalidate cached plans"
+    orchestrator.remove_tool_by_name("Email")
+    assert key() == original, "The key must only depend on the catalog's content"
+    orchestrator.remove_tool_by_name("Forecast")
+    assert key() not in (original, added), "Removing a tool must invalidate cached plans"
+
+
+def test_disk_round_trip():
+    path = tempfile.mkdtemp()
+    PlanCache(path=path).put("key", PLAN)
+    cache = PlanCache(path=path)
+    assert cache.get("key") == PLAN, "Plans must be read back from disk by a new cache"
+    assert cache.get("key") == PLAN and cache.stats()["disk_hits"] == 1, "Plans read from disk must be kept in memory"
+    assert cache.get("other") is None
+    cache.clear()
+    assert PlanCache(path=path).get("key") is None, "clear() must remove plans from disk"
+
+
+def test_disk_eviction_and_ttl():
+    path = tempfile.mkdtemp()
+    cache = PlanCache(maxsize=1, path=path, disk_maxsize=2)
+    for number in range(3):
+        cache.put(f"key{number}", PLAN)
+        # Files are evicted by mtime, keep the writes apart
+        os.utime(os.path.join(path, f"key{number}.json"), (number, number + 1_000_000_000))
+    cache.put("key3", PLAN)
+    assert sorted(os.listdir(path)) == ["key2.json", "key3.json"], "Only the newest disk_maxsize plans must be kept"
+    os.utime(os.path.join(path, "key2.json"), (0, time.time() - 120))
+    cache = PlanCache(path=path, ttl=60)
+    assert cache.get("key2") is None and not os.path.exists(os.path.join(path, "key2.json")), \
+        "Plans older than ttl must not be read back from disk"
+    assert cache.get("key3") == PLAN and len(cache.memory) == 1, "Only unexpired plans must be loaded into memory"
+
+
+def test_failed_embedding_registers_nothing():
+    orchestrator = Orchestrator(debug=False, embedding_cache_path=None, embedding_backend="hashed")
+    orchestrator.add_tool(make_tool())
+    fingerprint = orchestrator.tools.snapshot().fingerprint()
+
+    def fail(texts):
+        raise ConnectionError("The embedding backend is down")
+
+    orchestrator.embeddings.embed_array = fail
+    try:
+        orchestrator.add_tools([make_tool("Email"), make_tool("Calendar")])
+    except ConnectionError:
+        pass
+    assert "Email" not in orchestrator.tools and orchestrator.tools.snapshot().fingerprint() == fingerprint, \
+        "Tools that could not be indexed must not be registered, nor change the plan cache keys"
+
+
+def test_plancache():
+    test_normalize_query()
+    test_key_invalidation()
+    test_disk_round_trip()
+    test_disk_eviction_and_ttl()
+    test_failed_embedding_registers_nothing()
+    print("Tests Passed!")
+
+test_plancache()
@@ -0,0 +1,160 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import ast
+import time
+
+from planexecutor import PlanExecutor, plan_graph
+
+TOOLS = '''
+import time
+
+def summarize_document(name: str) -> str:
+    time.sleep(0.2)
+    return f"document {name}"
+
+def summarize_graph(name: str) -> str:
+    time.sleep(0.2)
+    return f"graph {name}"
+
+def summarize_slideshow(name: str) -> str:
+    time.sleep(0.2)
+    return f"slideshow {name}"
+
+def send_email(address: str, content: str) -> str:
+    time.sleep(0.1)
+    return f"sent {content} to {address}"
+'''
+
+OFFICE_PLAN = TOOLS + '''
+def main():
+    document: str = summarize_document("Findings")
+    graph: str = summarize_graph("Analysis")
+    slides: str = summarize_slideshow("Results")
+    content = ", ".join([document, graph, slides])
+    return send_email("johndoe@northeastern.edu", content)
+'''
+
+
+def run(code: str, executor: PlanExecutor):
+    scope = {}
+    exec(code, scope)
+    return executor.run(code, scope)
+
+
+def test_independent_calls_run_concurrently():
+    executor = PlanExecutor(8)
+    start = time.perf_counter()
+    result = run(OFFICE_PLAN, executor)
+    elapsed = time.perf_counter() - start
+    assert result == "sent document Findings, graph Analysis, slideshow Results to johndoe@northeastern.edu", \
+        "Results must be bound back to the plan variables"
+    assert elapsed < 0.5, f"The plan must take about its critical path (0.3s), took {elapsed:.2f}s"
+    assert executor.stats()["parallel"] == 1
+
+    start = time.perf_counter()
+    assert run(OFFICE_PLAN, PlanExecutor(1)) == result, "Sequential runs must give the same result"
+    assert time.perf_counter() - start >= 0.7, "max_workers=1 must run the plan sequentially"
+
+
+def test_dependencies():
+    main = ast.parse(
+        "def main():\n"
+        "    a = f()\n"
+        "    b = g()\n"
+        "    a = h(a)\n"
+        "    items = []\n"
+        "    items.append(b)\n"
+        "    items.append(a)\n"
+        "    return items\n").body[0]
+    _, dependencies = plan_graph(main)
+    assert dependencies[1] == set(), "Calls without shared variables must be independent"
+    assert dependencies[2] == {0}, "Reassigning a variable must wait for its earlier value"
+    assert dependencies[5] == {0, 2, 3, 4}, "Method calls must be ordered like writes"
+    assert dependencies[6] == set(range(6)), "The return must run last"
+
+
+def test_side_effects_keep_their_order():
+    main = ast.parse(
+        "def main():\n"
+        "    document = create_document(\"Report\")\n"
+        "    text = summarize_graph(\"Analysis\")\n"
+        "    write_document(\"Report\", text)\n"
+        "    notify(\"done\")\n"
+        "    archive()\n").body[0]
+    _, dependencies = plan_graph(main)
+    assert dependencies[1] == set(), "Calls without shared variables or literals must be independent"
+    assert dependencies[2] == {0, 1}, "Calls passing the same literal must keep their order"
+    assert dependencies[3] == {2} and dependencies[4] == {2, 3}, "Unbound calls must run in program order"
+
+    code = """
+import time
+
+events = []
+
+def create_document(name):
+    time.sleep(0.1)
+    events.append(("create", name))
+
+def write_document(name, text):
+    events.append(("write", name))
+
+def notify(message):
+    time.sleep(0.1)
+    events.append(("notify", message))
+
+def archive():
+    events.append(("archive",))
+
+def main():
+    document = create_document("Report")
+    write_document("Report", "text")
+    notify("done")
+    archive()
+"""
+    scope = {}
+    exec(code, scope)
+    PlanExecutor(8).run(code, scope)
+    assert scope["events"] == [("create", "Report"), ("write", "Report"), ("notify", "done"), ("archive",)], \
+        "Side effects must happen in program order"
+
+
+def test_sequential_fallback():
+    executor = PlanExecutor(8)
+    code = TOOLS + '''
+def main():
+    summaries = []
+    for name in ("Findings", "Analysis"):
+        summaries.append(summarize_document(name))
+    return summaries
+'''
+    assert run(code, executor) == ["document Findings", "document Analysis"]
+    assert executor.stats() == {"parallel": 0, "sequential": 1, "max_workers": 8}, \
+        "Plans with control flow must be run as they are"
+
+
+def test_errors_propagate():
+    code = TOOLS + '''
+def main():
+    document = summarize_document("Findings")
+    missing = undefined_tool()
+    return document
+'''
+    try:
+        run(code, PlanExecutor(8))
+    except NameError:
+        return
+    raise AssertionError("Errors raised by a statement must reach the caller")
+
+
+def test_planexecutor():
+    test_independent_calls_run_concurrently()
+    test_dependencies()
+    test_side_effects_keep_their_order()
+    test_sequential_fallback()
+    test_errors_propagate()
+    print("Tests Passed!")
+
+test_planexecutor()
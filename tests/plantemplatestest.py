@@ -0,0 +1,87 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from plantemplates import PlanTemplates, extract_slots, query_shape
+
+TOOLS = {"apps": [{"name": "DocumentSummarizer", "description": "Summarizes a document"},
+                  {"name": "EmailSender", "description": "Sends an email"}]}
+QUERY = 'Summarize the document "Findings" and send it to johndoe@northeastern.edu'
+PLAN = {
+    "abstract_tools": TOOLS,
+    "abstract_code": "def main():\n"
+                     "    summary: str = DocumentSummarizer(\"Findings\")\n"
+                     "    return EmailSender('johndoe@northeastern.edu', summary)",
+    "matches": {"DocumentSummarizer": "Summarize", "EmailSender": "Email"},
+    "planning_seconds": 1.0,
+}
+
+
+def test_extract_slots():
+    slots = extract_slots("I've got 3 files, what's 'Findings' at https://example.com/a.")
+    assert [(kind, value) for _, _, kind, value in slots] == \
+        [("number", "3"), ("text", "Findings"), ("url", "https://example.com/a")], \
+        "Apostrophes must not be read as quotes, and trailing punctuation must not be part of a URL"
+    assert query_shape(QUERY, extract_slots(QUERY)) == 'Summarize the document "<text>" and send it to <email>'
+    assert extract_slots('Summarize the document "Findings and send it') is None, "Unbalanced quotes are ambiguous"
+    assert extract_slots("Summarize the document “Findings and send it") is None
+
+
+def test_learn_and_fill():
+    templates = PlanTemplates()
+    assert templates.learn(QUERY, PLAN, "catalog", "planner")
+    plan = templates.fill('Summarize the document "Q3 \'Budget\'" and send it to jane@example.org',
+                          "catalog", "planner")
+    assert plan["abstract_code"] == ("def main():\n"
+                                     "    summary: str = DocumentSummarizer(\"Q3 'Budget'\")\n"
+                                     "    return EmailSender('jane@example.org', summary)"), \
+        "Entities must be filled in as literals"
+    assert plan["matches"] == PLAN["matches"] and plan["abstract_tools"] == TOOLS
+    assert templates.fill('Summarize the document "Findings" and email it to a@b.org', "catalog", "planner") is None, \
+        "Queries of another shape must miss"
+    assert templates.fill('Summarize the document "Findings" and send it to a@b.org', "other", "planner") is None, \
+        "Templates must be keyed by catalog"
+    stats = templates.stats()
+    assert (stats["hits"], stats["misses"], stats["learned"]) == (1, 2, 1)
+
+
+def test_refuses_unsafe_plans():
+    templates = PlanTemplates()
+    in_tools = {**PLAN, "abstract_tools": {"apps": [{"name": "FindingsSummarizer", "description": "Summarizes Findings"}]}}
+    assert not templates.learn(QUERY, in_tools, "catalog", "planner"), \
+        "Plans whose abstract tools mention an entity must not become templates"
+    unused = {**PLAN, "abstract_code": "def main():\n    return EmailSender('johndoe@northeastern.edu', 'hi')"}
+    assert not templates.learn(QUERY, unused, "catalog", "planner"), "Every entity must be a literal of the plan"
+    embedded = {**PLAN, "abstract_code": PLAN["abstract_code"] + " + ' about Findings'"}
+    assert not templates.learn(QUERY, embedded, "catalog", "planner"), \
+        "Entities inside longer literals must not be templated"
+    assert templates.stats()["unlearnable"] == 3 and templates.stats()["size"] == 0
+
+
+def test_refuses_incidental_constants():
+    templates = PlanTemplates()
+    query = "Order 2 donuts"
+    tools = {"apps": [{"name": "DonutOrder", "description": "Orders donuts"}]}
+    twice = {**PLAN, "abstract_tools": tools,
+             "abstract_code": "def main():\n    first = DonutOrder(2)\n    return DonutOrder(2)"}
+    assert not templates.learn(query, twice, "catalog", "planner"), \
+        "An entity passed to more than one call is ambiguous"
+    constant = {**PLAN, "abstract_tools": tools,
+                "abstract_code": "def main():\n    orders = [DonutOrder(1) for _ in range(2)]\n    return orders"}
+    assert not templates.learn(query, constant, "catalog", "planner"), \
+        "Constants that are not tool call arguments must not become slots"
+    single = {**PLAN, "abstract_tools": tools, "abstract_code": "def main():\n    return DonutOrder(count=2)"}
+    assert templates.learn(query, single, "catalog", "planner")
+    assert templates.fill("Order 5 donuts", "catalog", "planner")["abstract_code"] == \
+        "def main():\n    return DonutOrder(count=5)"
+
+
+def test_plantemplates():
+    test_extract_slots()
+    test_learn_and_fill()
+    test_refuses_unsafe_plans()
+    test_refuses_incidental_constants()
+    print("Tests Passed!")
+
+test_plantemplates()
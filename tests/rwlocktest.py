@@ -0,0 +1,61 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import threading
+import time
+
+from rwlock import ReadWriteLock
+
+
+def test_readers_share():
+    lock = ReadWriteLock()
+    inside = threading.Barrier(3, timeout=5)
+
+    def read():
+        with lock.read():
+            inside.wait()
+
+    threads = [threading.Thread(target=read) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not inside.broken, "Readers must hold the lock at the same time"
+
+
+def test_writer_excludes_readers():
+    lock = ReadWriteLock()
+    events = []
+
+    def write():
+        with lock.write():
+            events.append("write start")
+            time.sleep(0.05)
+            events.append("write end")
+
+    def read():
+        with lock.read():
+            events.append("read")
+
+    with lock.read():
+        writer = threading.Thread(target=write)
+        writer.start()
+        time.sleep(0.02)
+        assert events == [], "A writer must wait for readers to leave"
+        reader = threading.Thread(target=read)
+        reader.start()
+        time.sleep(0.02)
+        assert events == [], "New readers must wait behind a waiting writer"
+    writer.join()
+    reader.join()
+    assert events == ["write start", "write end", "read"], "Readers must not enter while a writer holds the lock"
+
+
+def test_rwlock():
+    test_readers_share()
+    test_writer_excludes_readers()
+    print("Tests Passed!")
+
+test_rwlock()
@@ -0,0 +1,90 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+
+from clearence import Clearence
+from registeredtool import RegisteredTool
+from semanticplancache import SemanticPlanCache
+from toolregistry import ToolRegistry
+
+QUERY = "Order 1 donut from MyDonutDelivery"
+PLAN = {"abstract_tools": {"apps": []}, "abstract_code": "def main():\n    return DonutOrder(1, 'MyDonutDelivery')",
+        "matches": {"DonutOrder": "OrderDonuts"}, "planning_seconds": 2.0}
+
+
+def order(count: int, shop: str) -> str:
+    return f"Ordered {count} from {shop}"
+
+
+def make_registry(description: str = "Orders donuts from a shop") -> ToolRegistry:
+    registry = ToolRegistry()
+    registry.add(RegisteredTool("OrderDonuts", order, description,
+                                inputs=[{"name": "count", "type": "int", "description": "How many"},
+                                        {"name": "shop", "type": "str", "description": "The shop"}]))
+    return registry
+
+
+def make_cache(registry: ToolRegistry, threshold: float = 0.9) -> SemanticPlanCache:
+    cache = SemanticPlanCache(threshold)
+    cache.put(QUERY, np.array([1.0, 0.0]), PLAN, registry.snapshot(), "planner")
+    return cache
+
+
+def test_get_and_put():
+    registry = make_registry()
+    cache = make_cache(registry)
+    plan = cache.get("Please order 1 donut from MyDonutDelivery", np.array([1.0, 0.1]), registry.snapshot(), "planner")
+    assert plan["abstract_code"] == PLAN["abstract_code"] and plan["cached_query"] == QUERY
+    assert plan["similarity"] > 0.99
+    assert cache.get(QUERY, np.array([1.0, 0.0]), registry.snapshot(), "other planner") is None, \
+        "Plans must only be reused by the planner that made them"
+    assert cache.get(QUERY, np.array([1.0, 0.0]), registry.snapshot(), "planner", Clearence.LOW) is None, \
+        "Plans must only be reused at the clearance they were matched at"
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["saved_seconds"]) == (1, 2, 2.0)
+
+
+def test_threshold():
+    registry = make_registry()
+    cache = make_cache(registry)
+    # cosine 0.8
+    assert cache.get(QUERY, np.array([0.8, 0.6]), registry.snapshot(), "planner") is None, \
+        "Queries under the threshold must miss"
+    assert make_cache(registry, 0.75).get(QUERY, np.array([0.8, 0.6]), registry.snapshot(), "planner") is not None
+
+
+def test_changed_or_removed_tools():
+    registry = make_registry()
+    cache = make_cache(registry)
+    changed = make_registry("Orders donuts and coffee from a shop")
+    assert cache.get(QUERY, np.array([1.0, 0.0]), changed.snapshot(), "planner") is None, \
+        "Plans matched to a tool that changed must not be reused"
+    registry.remove("OrderDonuts")
+    assert cache.get(QUERY, np.array([1.0, 0.0]), registry.snapshot(), "planner") is None, \
+        "Plans matched to a removed tool must not be reused"
+    assert cache.stats()["stale"] == 2
+
+
+def test_literal_mismatch():
+    registry = make_registry()
+    cache = make_cache(registry)
+    for query in ("Order 10 donuts from MyDonutDelivery", "Order 1.5 donuts from MyDonutDelivery",
+                  "Order 1 donut from MyDonutDeliveryExpress", "Order one donut from MyDonutDelivery"):
+        assert cache.get(query, np.array([1.0, 0.0]), registry.snapshot(), "planner") is None, \
+            f"The plan for {QUERY!r} must not be reused for {query!r}"
+    assert cache.stats()["stale"] == 4
+    assert cache.get("order 1 donut from mydonutdelivery!", np.array([1.0, 0.0]), registry.snapshot(), "planner"), \
+        "Literals must be matched regardless of case and punctuation"
+
+
+def test_semanticplancache():
+    test_get_and_put()
+    test_threshold()
+    test_changed_or_removed_tools()
+    test_literal_mismatch()
+    print("Tests Passed!")
+
+test_semanticplancache()
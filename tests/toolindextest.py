@@ -0,0 +1,133 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+
+from toolindex import ToolIndex, normalize
+
+
+def make_index(mode: str = "exact", n: int = 500, dim: int = 32) -> tuple[ToolIndex, np.ndarray]:
+    vectors = np.random.default_rng(0).standard_normal((n, dim))
+    index = ToolIndex(mode=mode, min_ann_size=100)
+    index.add_many([f"tool_{i}" for i in range(n)], vectors)
+    return index, vectors
+
+
+def test_scores_match_cosine_similarity():
+    index, vectors = make_index()
+    query = vectors[3] + 0.1
+    expected = vectors @ query / (np.linalg.norm(vectors, axis=1) * np.linalg.norm(query))
+    scores = index.scores(query)
+    assert np.allclose([scores[index.rows[f"tool_{i}"]] for i in range(len(vectors))], expected, atol=1e-5), \
+        "Scores must be the cosine similarity against each tool"
+
+
+def test_remove_and_replace():
+    index, vectors = make_index()
+    assert index.remove("tool_0") and not index.remove("tool_0"), "Removing must only succeed once"
+    assert "tool_0" not in index and len(index) == len(vectors) - 1, "Removed tools must leave the index"
+    assert index.search(vectors[0], 1)[0][0][0] != "tool_0", "Removed tools must not be found"
+    index.add("tool_1", vectors[2])
+    assert len(index) == len(vectors) - 1, "Re-adding a name must replace its row"
+    top = {name for name, _ in index.search(vectors[2], 2)[0]}
+    assert top == {"tool_1", "tool_2"}, "Replaced rows must be searched by their new embedding"
+
+
+def test_search_allowed():
+    index, vectors = make_index()
+    allowed = {"tool_5", "tool_6"}
+    found = index.search(vectors[0], 4, allowed)[0]
+    assert {name for name, _ in found} == allowed, "Search must only return allowed tools"
+
+
+def test_ann_modes():
+    for mode in ("ivf", "hnsw", "cascade"):
+        index, vectors = make_index(mode)
+        index.nprobe = index.ef_search = 1000
+        assert index.search(vectors[7], 1)[0][0][0] == "tool_7", f"{mode} must find an indexed tool"
+        index.remove("tool_7")
+        assert index.search(vectors[7], 1)[0][0][0] != "tool_7", f"{mode} must not find removed tools"
+        index.add("tool_new", vectors[7])
+        assert index.search(vectors[7], 1)[0][0][0] == "tool_new", f"{mode} must find tools added after it was built"
+
+
+def test_quantized_storage():
+    rng = np.random.default_rng(1)
+    vectors = rng.standard_normal((200, 32))
+    names = [f"tool_{i}" for i in range(len(vectors))]
+    queries = vectors[:20] + 0.5 * rng.standard_normal((20, 32))
+    reference = ToolIndex()
+    reference.add_many(names, vectors)
+    expected = reference.search(queries, 6)
+    for dtype, tolerance in (("float16", 1e-3), ("int8", 1e-2)):
+        index = ToolIndex(dtype=dtype)
+        index.add_many(names, vectors)
+        error = max(np.abs(index.scores(query) - reference.scores(query)).max() for query in queries)
+        assert error < tolerance, f"{dtype} scores must be within {tolerance} of float32"
+        compared = 0
+        for want, got in zip(expected, index.search(queries, 5)):
+            # Only ranks further apart than twice the score error are certain not to swap
+            if want[4][1] - want[5][1] > 2 * error:
+                assert [name for name, _ in got] == [name for name, _ in want[:5]], \
+                    f"{dtype} storage must return the same top-k as float32"
+                compared += 1
+        assert compared >= len(queries) // 2
+        assert index.nbytes < reference.nbytes, f"{dtype} storage must use less memory"
+
+
+def test_int8_scale():
+    vectors = np.random.default_rng(2).standard_normal((50, 16))
+    index = ToolIndex(dtype="int8")
+    index.add_many([f"tool_{i}" for i in range(len(vectors))], vectors)
+    index.remove("tool_0")
+    unit = normalize(vectors)
+    for i in (1, 25, 49):
+        row = index.rows[f"tool_{i}"]
+        scale = np.abs(unit[i]).max() / 127
+        assert np.isclose(index._scales[row], scale), "Each row must be scaled by its largest component / 127"
+        assert np.abs(index._data[row]).max() == 127, "The largest component must use the full int8 range"
+        assert np.allclose(index.matrix[row], unit[i], atol=scale / 2 + 1e-6), \
+            "Dequantized rows must be within half a step of the original"
+
+
+def test_float16_scores():
+    vectors = np.random.default_rng(3).standard_normal((300, 16))
+    # Zeros, negative zeros and float16 subnormals must survive the bit-level conversion
+    vectors[:10, :4] = 0.0
+    vectors[10:20, :4] = -0.0
+    vectors[20:30, :4] = 1e-7 * np.linalg.norm(vectors[20:30], axis=1, keepdims=True)
+    vectors[30:40, :4] = -3e-6 * np.linalg.norm(vectors[30:40], axis=1, keepdims=True)
+    index = ToolIndex(dtype="float16")
+    index.add_many([f"tool_{i}" for i in range(len(vectors))], vectors)
+    query = normalize(vectors[5] + 0.2)
+    expected = index.matrix[:len(vectors)] @ query
+    assert np.allclose(index.scores(query), expected, atol=1e-6), \
+        "float16 rows must be scored as their exact float32 values"
+    rows = np.asarray([39, 0, 25, 12])
+    assert np.allclose(index._score_rows(query[None, :], rows)[0], expected[rows], atol=1e-6)
+
+
+def test_search_only_reads():
+    for mode in ("ivf", "hnsw", "cascade"):
+        index, vectors = make_index(mode)
+        state = (index._ann, index._components, index._reduced)
+        assert any(part is not None for part in state), f"{mode} must be built when tools are added, not searched"
+        index.search(vectors[:3], 5)
+        assert all(before is after for before, after in zip(state, (index._ann, index._components, index._reduced))), \
+            f"{mode} searches must not rebuild shared state"
+
+
+def test_toolindex():
+    test_scores_match_cosine_similarity()
+    test_remove_and_replace()
+    test_search_allowed()
+    test_ann_modes()
+    test_quantized_storage()
+    test_int8_scale()
+    test_float16_scores()
+    test_search_only_reads()
+    print("Tests Passed!")
+
+test_toolindex()
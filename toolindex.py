@@ -0,0 +1,469 @@
+import numpy as np
+
+import math
+
+# float16 bits shifted left by 13 and masked to sign, exponent and mantissa are a float32 of the value times 2 ** -112
+HALF_MASK = np.int32(-0x70002000)  # 0x8FFFE000
+HALF_BIAS = 2.0 ** 112
+
+def normalize(vectors) -> np.ndarray:
+    """
+    Given a vector or a matrix of row vectors, return a float32 copy scaled to unit length
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class ToolIndex:
+    """
+    Stores one pre-normalized embedding per tool as a row of a single NumPy matrix.
+
+    Has the following responsibilities:
+        - Add, replace and remove tool rows as the catalog changes
+        - Score a query against every tool with a single matrix-vector product
+        - Find the closest tools to a batch of queries, exactly or through an approximate (FAISS) index
+
+    Modes:
+        - "exact": brute force search over the matrix
+        - "ivf": FAISS inverted file index. Recall/effort is tuned with nprobe (clusters visited per query)
+        - "hnsw": FAISS HNSW graph. Recall/effort is tuned with ef_search (candidate list size per query)
+        - "cascade": scores every tool on a PCA projection to reduced_dim dimensions, then rescores the
+          cascade_candidates best ones at full dimension. Returned scores are always full dimension.
+    Approximate modes only kick in once the catalog holds min_ann_size tools, smaller catalogs are searched exactly.
+
+    Storage (dtype):
+        - "float32": full precision
+        - "float16": half precision, half the memory
+        - "int8": scalar quantized with one float32 scale per row, about a quarter of the memory
+    Quantized rows are dequantized block by block while scoring, approximate indexes use the matching FAISS
+    scalar quantizer.
+
+    The index is not thread safe. Its owners (ToolSelector, ConcretePlanner) hold a ReadWriteLock around it, so
+    searches run concurrently but never while rows are added or removed. Searches only read: the cascade projection
+    and the approximate indexes are refitted and rebuilt by add_many and remove, under the owners' write lock.
+    """
+
+    def __init__(self, capacity: int = 64, mode: str = "exact", min_ann_size: int = 10_000,
+                 nlist: int = None, nprobe: int = 16, hnsw_m: int = 32, ef_search: int = 64, dtype: str = "float32",
+                 reduced_dim: int = 128, cascade_candidates: int = 256):
+        if mode not in ("exact", "ivf", "hnsw", "cascade"):
+            raise ValueError(f"Unrecognized index mode: {mode}")
+        if dtype not in ("float32", "float16", "int8"):
+            raise ValueError(f"Unrecognized storage type: {dtype}")
+        self.names: list[str] = []
+        self.rows: dict[str, int] = {}
+        self._capacity: int = capacity
+        self.dtype: str = dtype
+        self._data: np.ndarray = None
+        # Per-row dequantization scales, only used by int8 storage
+        self._scales: np.ndarray = None
+
+        self.mode: str = mode
+        self.min_ann_size: int = min_ann_size
+        self.nlist: int | None = nlist
+        self.nprobe: int = nprobe
+        self.hnsw_m: int = hnsw_m
+        self.ef_search: int = ef_search
+        self.reduced_dim: int = reduced_dim
+        self.cascade_candidates: int = cascade_candidates
+
+        # Approximate indexes address tools by a stable integer id instead of their (moving) matrix row
+        self.ids: dict[str, int] = {}
+        self._id_names: dict[int, str] = {}
+        self._next_id: int = 0
+        self._ann = None
+        self._quantizer = None
+        self._hnsw = None
+        self._ann_size: int = 0
+        self._tombstones: set[int] = set()
+
+        # PCA projection of the cascade mode, and the projected rows (kept in the same row order as the matrix)
+        self._mean: np.ndarray = None
+        self._components: np.ndarray = None
+        self._reduced: np.ndarray = None
+        self._fitted_size: int = 0
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.rows
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """
+        Returns the (n_tools, dim) float32 matrix of normalized tool embeddings.
+        Quantized storage is dequantized into a new matrix.
+        """
+        if self._data is None:
+            return np.zeros((0, 0), dtype=np.float32)
+        if self.dtype == "float32":
+            return self._data[:len(self.names)]
+        return self._dequantize(np.arange(len(self.names)))
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Returns the memory used by the stored rows, excluding any approximate index
+        """
+        if self._data is None:
+            return 0
+        size = len(self.names) * self._data.shape[1] * self._data.itemsize
+        if self._scales is not None:
+            size += len(self.names) * self._scales.itemsize
+        return size
+
+    def add(self, name: str, vector) -> None:
+        """
+        Adds a tool embedding to the index. Replaces the row in place if the name is already indexed.
+        """
+        self.add_many([name], [vector])
+
+    def add_many(self, names: list[str], vectors, normalized: bool = False) -> None:
+        """
+        Adds several tool embeddings to the index at once.
+
+        params:
+            names: The tool names, one per row
+            vectors: The raw (unnormalized) embeddings, one per name
+            normalized: Whether the embeddings are already unit length. A writable float32 matrix of normalized rows
+                added to an empty float32 index becomes its storage without a copy (e.g. a memory mapped catalog).
+        """
+        if not names:
+            return
+        if (normalized and self._data is None and self.dtype == "float32" and isinstance(vectors, np.ndarray)
+                and vectors.dtype == np.float32 and vectors.flags.writeable and len(set(names)) == len(names)):
+            self._adopt(names, vectors)
+            self._refresh()
+            return
+        vectors = np.asarray(vectors, dtype=np.float32) if normalized else normalize(vectors)
+        if self._data is None:
+            self._data = np.zeros((max(self._capacity, len(names)), vectors.shape[1]), dtype=self.dtype)
+            if self.dtype == "int8":
+                self._scales = np.zeros(self._data.shape[0], dtype=np.float32)
+        elif vectors.shape[1] != self._data.shape[1]:
+            raise ValueError(f"Expected embeddings of dimension {self._data.shape[1]}, got {vectors.shape[1]}")
+
+        ids: list[int] = []
+        for name, vector in zip(names, vectors):
+            row = self.rows.get(name)
+            if row is None:
+                row = len(self.names)
+                if row == self._data.shape[0]:
+                    self._grow()
+                self.names.append(name)
+                self.rows[name] = row
+            else:
+                self._release_id(name)
+            self._store(row, vector)
+            ids.append(self._assign_id(name))
+
+        if self._ann is not None:
+            self._ann.add_with_ids(vectors, np.asarray(ids, dtype=np.int64))
+        self._refresh()
+
+    def remove(self, name: str) -> bool:
+        """
+        Removes a tool from the index by moving the last row into its place.
+
+        returns:
+            Whether the tool was indexed
+        """
+        row = self.rows.pop(name, None)
+        if row is None:
+            return False
+        last = len(self.names) - 1
+        if row != last:
+            moved = self.names[last]
+            self._data[row] = self._data[last]
+            if self._scales is not None:
+                self._scales[row] = self._scales[last]
+            if self._reduced is not None:
+                self._reduced[row] = self._reduced[last]
+            self.names[row] = moved
+            self.rows[moved] = row
+        self.names.pop()
+        self._release_id(name)
+        self._refresh()
+        return True
+
+    def scores(self, query_vector) -> np.ndarray:
+        """
+        Returns the cosine similarity of the query against every row, in row order
+        """
+        if not self.names:
+            return np.zeros(0, dtype=np.float32)
+        return self._score_rows(normalize(np.atleast_2d(query_vector)))[0]
+
+    def search(self, query_vectors, k: int, allowed: set[str] = None) -> list[list[tuple[str, float]]]:
+        """
+        Finds the k closest tools to each query
+
+        params:
+            query_vectors: One raw query embedding per row
+            k: The number of tools to return per query
+            allowed: If given, only these tool names are considered
+
+        returns:
+            For each query, (tool name, cosine similarity) pairs, most similar first
+        """
+        queries = normalize(np.atleast_2d(query_vectors))
+        if not self.names or k <= 0:
+            return [[] for _ in queries]
+        if allowed is not None and len(allowed) <= k * 4:
+            # Small candidate sets are cheaper to score directly than to dig out of an approximate index
+            return self._search_exact(queries, k, allowed)
+        if self._components is not None and len(self.names) >= self.min_ann_size:
+            return self._search_cascade(queries, k, allowed)
+        if self._ann is not None and len(self.names) >= self.min_ann_size:
+            return self._search_ann(queries, k, allowed)
+        return self._search_exact(queries, k, allowed)
+
+    def _search_exact(self, queries: np.ndarray, k: int, allowed: set[str] = None) -> list[list[tuple[str, float]]]:
+        if allowed is None:
+            names = self.names
+            scores = self._score_rows(queries)
+        else:
+            names = [name for name in allowed if name in self.rows]
+            scores = self._score_rows(queries, np.asarray([self.rows[name] for name in names], dtype=np.int64))
+        k = min(k, len(names))
+        if k == 0:
+            return [[] for _ in queries]
+
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results: list[list[tuple[str, float]]] = []
+        for row_scores, row_top in zip(scores, top):
+            row_top = row_top[np.argsort(-row_scores[row_top])]
+            results.append([(names[i], float(row_scores[i])) for i in row_top])
+        return results
+
+    def _search_cascade(self, queries: np.ndarray, k: int, allowed: set[str] = None) -> list[list[tuple[str, float]]]:
+        if allowed is None:
+            rows = np.arange(len(self.names))
+            reduced = self._reduced[:len(self.names)]
+        else:
+            rows = np.asarray([self.rows[name] for name in allowed if name in self.rows], dtype=np.int64)
+            reduced = self._reduced[rows]
+        if not len(rows):
+            return [[] for _ in queries]
+
+        # The projected mean adds the same constant to every tool's score, so ranking can ignore it
+        coarse = (queries @ self._components.T) @ reduced.T
+        count = min(max(self.cascade_candidates, k), len(rows))
+        candidates = np.argpartition(-coarse, count - 1, axis=1)[:, :count]
+
+        results: list[list[tuple[str, float]]] = []
+        for query, row_candidates in zip(queries, candidates):
+            candidate_rows = rows[row_candidates]
+            scores = self._score_rows(query[None, :], candidate_rows)[0]
+            top = np.argsort(-scores)[:k]
+            results.append([(self.names[candidate_rows[i]], float(scores[i])) for i in top])
+        return results
+
+    def _fit_projection(self, sample_size: int = 20_000) -> None:
+        """
+        Fits the cascade PCA projection on (a sample of) the catalog and projects every row
+        """
+        count = len(self.names)
+        sample = np.random.default_rng(0).permutation(count)[:sample_size]
+        vectors = self._dequantize(sample)
+        mean = vectors.mean(axis=0)
+        centered = vectors - mean
+        # Principal axes are the top eigenvectors of the (dim, dim) covariance, cheaper than an SVD of the sample
+        _, eigenvectors = np.linalg.eigh(centered.T @ centered)
+        dims = min(self.reduced_dim, eigenvectors.shape[1])
+        components = np.ascontiguousarray(eigenvectors[:, ::-1][:, :dims].T, dtype=np.float32)
+
+        reduced = np.zeros((self._data.shape[0], len(components)), dtype=np.float32)
+        for start in range(0, count, 8192):
+            rows = np.arange(start, min(start + 8192, count))
+            reduced[rows] = (self._dequantize(rows) - mean) @ components.T
+        self._mean, self._components, self._reduced = mean, components, reduced
+        self._fitted_size = count
+
+    def _search_ann(self, queries: np.ndarray, k: int, allowed: set[str] = None) -> list[list[tuple[str, float]]]:
+        import faiss
+
+        # Search parameters are passed per call rather than set on the shared index, which concurrent searches read
+        if self.mode == "ivf":
+            params = faiss.SearchParametersIVF(nprobe=self.nprobe)
+        else:
+            params = faiss.SearchParametersHNSW(efSearch=max(self.ef_search, k))
+        fetch = k + len(self._tombstones)
+        if allowed is not None:
+            fetch *= 4
+        scores, ids = self._ann.search(queries, min(fetch, self._ann.ntotal), params=params)
+
+        results: list[list[tuple[str, float]]] = []
+        for row_scores, row_ids in zip(scores, ids):
+            found = []
+            for score, id in zip(row_scores, row_ids):
+                if id == -1 or id in self._tombstones:
+                    continue
+                name = self._id_names[id]
+                if allowed is None or name in allowed:
+                    found.append((name, float(score)))
+                    if len(found) == k:
+                        break
+            results.append(found)
+        return results
+
+    def _refresh(self) -> None:
+        """
+        Refits the cascade projection, or (re)builds the approximate index, once the catalog is large enough and they
+        have gone stale. Called after every change so that searches never have to.
+        """
+        if len(self.names) < self.min_ann_size:
+            return
+        if self.mode == "cascade":
+            # The projection was fitted on a much smaller catalog
+            if self._components is None or len(self.names) > 2 * self._fitted_size:
+                self._fit_projection()
+        elif self.mode in ("ivf", "hnsw"):
+            if (self._ann is None
+                    # IVF clusters were trained on a much smaller catalog
+                    or (self.mode == "ivf" and len(self.names) > 4 * self._ann_size)
+                    # Too much of the HNSW graph is deleted tools
+                    or len(self._tombstones) > len(self.names) // 4):
+                self._build_ann()
+
+    def _build_ann(self) -> None:
+        import faiss
+
+        dim = self._data.shape[1]
+        vectors = np.ascontiguousarray(self.matrix)
+        ids = np.asarray([self.ids[name] for name in self.names], dtype=np.int64)
+        if self.mode == "ivf":
+            # FAISS wants ~39 training points per cluster
+            nlist = self.nlist or max(1, min(int(4 * math.sqrt(len(self.names))), len(self.names) // 39))
+            quantizer = faiss.IndexFlatIP(dim)
+            if self.dtype == "float32":
+                index = faiss.IndexIVFFlat(quantizer, dim, nlist, faiss.METRIC_INNER_PRODUCT)
+            else:
+                index = faiss.IndexIVFScalarQuantizer(quantizer, dim, nlist, self._faiss_quantizer_type(),
+                                                      faiss.METRIC_INNER_PRODUCT)
+            sample = vectors[np.random.default_rng(0).permutation(len(vectors))[:nlist * 64]]
+            index.train(sample)
+            # Keep the quantizer alive for as long as the index that refers to it
+            self._quantizer = quantizer
+        else:
+            if self.dtype == "float32":
+                self._hnsw = faiss.IndexHNSWFlat(dim, self.hnsw_m, faiss.METRIC_INNER_PRODUCT)
+            else:
+                self._hnsw = faiss.IndexHNSWSQ(dim, self._faiss_quantizer_type(), self.hnsw_m, faiss.METRIC_INNER_PRODUCT)
+                self._hnsw.train(vectors)
+            index = faiss.IndexIDMap2(self._hnsw)
+        index.add_with_ids(vectors, ids)
+        self._ann = index
+        self._ann_size = len(self.names)
+        self._tombstones = set()
+
+    def _faiss_quantizer_type(self):
+        import faiss
+
+        return faiss.ScalarQuantizer.QT_fp16 if self.dtype == "float16" else faiss.ScalarQuantizer.QT_8bit
+
+    def _adopt(self, names: list[str], vectors: np.ndarray) -> None:
+        """
+        Takes a matrix of normalized rows as the storage of an empty index. It is copied once the index grows.
+        """
+        self._data = vectors
+        self.names = list(names)
+        self.rows = {name: row for row, name in enumerate(self.names)}
+        for name in self.names:
+            self._assign_id(name)
+
+    def _store(self, row: int, vector: np.ndarray) -> None:
+        """
+        Writes a normalized vector into a row, quantizing it for int8 storage
+        """
+        if self.dtype == "int8":
+            scale = float(np.abs(vector).max()) / 127 or 1.0
+            self._data[row] = np.round(vector / scale).astype(np.int8)
+            self._scales[row] = scale
+        else:
+            self._data[row] = vector
+        if self._components is not None:
+            self._reduced[row] = (vector - self._mean) @ self._components.T
+
+    def _dequantize(self, rows: np.ndarray) -> np.ndarray:
+        """
+        Returns the given rows as a float32 matrix
+        """
+        block = self._data[rows].astype(np.float32)
+        if self._scales is not None:
+            block *= self._scales[rows, None]
+        return block
+
+    def _score_rows(self, queries: np.ndarray, rows: np.ndarray = None, block_size: int = 256) -> np.ndarray:
+        """
+        Returns the (n_queries, n_rows) cosine similarities of normalized queries against the given rows (default all).
+        Quantized rows are dequantized a small, cache-sized block at a time so scoring never materializes the full
+        float32 matrix.
+        """
+        if self.dtype == "float32":
+            if rows is None:
+                return queries @ self._data[:len(self.names)].T
+            return queries @ self._data[rows].T
+
+        count = len(self.names) if rows is None else len(rows)
+        scores = np.empty((len(queries), count), dtype=np.float32)
+        if self.dtype == "float16":
+            # NumPy converts float16 one element at a time. Integer widening and shifts are vectorized, so the
+            # exponent and mantissa bits are shifted into float32 position instead, which leaves every value
+            # scaled by 2 ** -112 (subnormals and zeros included). The queries are scaled up to cancel it.
+            queries = queries * np.float32(HALF_BIAS)
+            buffer = np.empty((block_size, self._data.shape[1]), dtype=np.int32)
+            for start in range(0, count, block_size):
+                stop = min(start + block_size, count)
+                block = buffer[:stop - start]
+                half = self._data[start:stop] if rows is None else self._data[rows[start:stop]]
+                np.left_shift(half.view(np.int16), 13, out=block, dtype=np.int32)
+                block &= HALF_MASK
+                scores[:, start:stop] = queries @ block.view(np.float32).T
+            return scores
+
+        buffer = np.empty((block_size, self._data.shape[1]), dtype=np.float32)
+        for start in range(0, count, block_size):
+            stop = min(start + block_size, count)
+            block = buffer[:stop - start]
+            np.copyto(block, self._data[start:stop] if rows is None else self._data[rows[start:stop]], casting="unsafe")
+            scores[:, start:stop] = queries @ block.T
+        # int8 codes are scored as is and scaled afterwards, one multiply per score instead of per element
+        scores *= self._scales[:count] if rows is None else self._scales[rows]
+        return scores
+
+    def _assign_id(self, name: str) -> int:
+        id = self._next_id
+        self._next_id += 1
+        self.ids[name] = id
+        self._id_names[id] = name
+        return id
+
+    def _release_id(self, name: str) -> None:
+        id = self.ids.pop(name, None)
+        if id is None:
+            return
+        del self._id_names[id]
+        if self._ann is None:
+            return
+        if self.mode == "ivf":
+            self._ann.remove_ids(np.asarray([id], dtype=np.int64))
+        else:
+            # HNSW graphs do not support removal, deleted tools are skipped at search time until the next rebuild
+            self._tombstones.add(id)
+
+    def _grow(self) -> None:
+        data = np.zeros((self._data.shape[0] * 2, self._data.shape[1]), dtype=self._data.dtype)
+        data[:self._data.shape[0]] = self._data
+        self._data = data
+        if self._scales is not None:
+            scales = np.zeros(data.shape[0], dtype=np.float32)
+            scales[:len(self._scales)] = self._scales
+            self._scales = scales
+        if self._reduced is not None:
+            reduced = np.zeros((data.shape[0], self._reduced.shape[1]), dtype=np.float32)
+            reduced[:len(self._reduced)] = self._reduced
+            self._reduced = reduced
@@ -0,0 +1,161 @@
+from registeredtool import RegisteredTool
+from clearence import Clearence
+
+from types import MappingProxyType
+from typing import Iterator
+
+import hashlib
+import threading
+
+
+class CatalogSnapshot:
+    """
+    Immutable view of the tool registry at one version.
+    Planning reads a snapshot, so tools added or removed while a query is being planned do not affect it.
+    """
+
+    __slots__ = ("version", "by_name", "by_provider", "by_clearance", "_fingerprint")
+
+    def __init__(self, version: int, by_name: dict[str, RegisteredTool], by_provider: dict[str, frozenset[RegisteredTool]],
+                 by_clearance: dict[Clearence, frozenset[RegisteredTool]]):
+        self.version: int = version
+        self.by_name: MappingProxyType[str, RegisteredTool] = MappingProxyType(by_name)
+        self.by_provider: MappingProxyType[str, frozenset[RegisteredTool]] = MappingProxyType(by_provider)
+        self.by_clearance: MappingProxyType[Clearence, frozenset[RegisteredTool]] = MappingProxyType(by_clearance)
+        self._fingerprint: str | None = None
+
+    def __len__(self) -> int:
+        return len(self.by_name)
+
+    def __iter__(self) -> Iterator[RegisteredTool]:
+        return iter(self.by_name.values())
+
+    def __contains__(self, tool: RegisteredTool | str) -> bool:
+        if isinstance(tool, str):
+            return tool in self.by_name
+        return self.by_name.get(tool.get_name()) is tool
+
+    def get(self, name: str) -> RegisteredTool | None:
+        """
+        Returns the tool registered under name, if any
+        """
+        return self.by_name.get(name)
+
+    def fingerprint(self) -> str:
+        """
+        Returns a hash of the content of every tool in the catalog. Unlike version, it is the same in every process
+        that registers the same tools. Computed once per snapshot.
+        """
+        if self._fingerprint is None:
+            digest = hashlib.blake2b(digest_size=16)
+            for name in sorted(self.by_name):
+                tool = self.by_name[name]
+                digest.update(f"{tool.content_hash()}\0{tool.get_func_name()}\0".encode())
+            self._fingerprint = digest.hexdigest()
+        return self._fingerprint
+
+    def provider(self, provider: str) -> frozenset[RegisteredTool]:
+        """
+        Returns every tool of a provider
+        """
+        return self.by_provider.get(provider, frozenset())
+
+    def clearance(self, clearance: Clearence) -> frozenset[RegisteredTool]:
+        """
+        Returns every tool with exactly the given clearance level
+        """
+        return self.by_clearance.get(clearance, frozenset())
+
+
+class ToolRegistry:
+    """
+    The set of tools registered in the orchestrator.
+
+    Has the following responsibilities:
+        - Look tools up by name in O(1), and by provider or clearance through secondary indexes
+        - Bump a catalog version on every change
+        - Hand out immutable snapshots, built at most once per version
+    """
+
+    def __init__(self):
+        self._lock: threading.RLock = threading.RLock()
+        self._by_name: dict[str, RegisteredTool] = {}
+        self._by_provider: dict[str, dict[str, RegisteredTool]] = {}
+        self._by_clearance: dict[Clearence, dict[str, RegisteredTool]] = {}
+        self.version: int = 0
+        self._snapshot: CatalogSnapshot | None = None
+
+    def __len__(self) -> int:
+        return len(self._by_name)
+
+    def __iter__(self) -> Iterator[RegisteredTool]:
+        return iter(self.snapshot())
+
+    def __contains__(self, tool: RegisteredTool | str) -> bool:
+        return tool in self.snapshot()
+
+    def get(self, name: str) -> RegisteredTool | None:
+        """
+        Returns the tool registered under name, if any
+        """
+        return self._by_name.get(name)
+
+    def add(self, tool: RegisteredTool) -> RegisteredTool | None:
+        """
+        Registers a tool, replacing any tool with the same name
+
+        returns:
+            The replaced tool, if any
+        """
+        with self._lock:
+            previous = self._by_name.get(tool.get_name())
+            if previous is tool:
+                return None
+            if previous is not None:
+                self._unindex(previous)
+            self._by_name[tool.get_name()] = tool
+            self._by_provider.setdefault(tool.provider, {})[tool.get_name()] = tool
+            self._by_clearance.setdefault(tool.clearence, {})[tool.get_name()] = tool
+            self._changed()
+            return previous
+
+    def remove(self, name: str) -> RegisteredTool | None:
+        """
+        Unregisters a tool by name
+
+        returns:
+            The removed tool, if any
+        """
+        with self._lock:
+            tool = self._by_name.pop(name, None)
+            if tool is None:
+                return None
+            self._unindex(tool)
+            self._changed()
+            return tool
+
+    def snapshot(self) -> CatalogSnapshot:
+        """
+        Returns an immutable view of the current catalog
+        """
+        with self._lock:
+            if self._snapshot is None:
+                self._snapshot = CatalogSnapshot(
+                    self.version,
+                    dict(self._by_name),
+                    {provider: frozenset(tools.values()) for provider, tools in self._by_provider.items()},
+                    {clearance: frozenset(tools.values()) for clearance, tools in self._by_clearance.items()},
+                )
+            return self._snapshot
+
+    def _unindex(self, tool: RegisteredTool):
+        for index, key in ((self._by_provider, tool.provider), (self._by_clearance, tool.clearence)):
+            tools = index.get(key)
+            if tools is not None:
+                tools.pop(tool.get_name(), None)
+                if not tools:
+                    del index[key]
+
+    def _changed(self):
+        self.version += 1
+        self._snapshot = None
@@ -1,6 +1,12 @@
-from langchain.tools import StructuredTool
-from langchain_openai import OpenAIEmbeddings
+from langchain_core.embeddings import Embeddings
+from embeddingbackends import load_embeddings
 from registeredtool import RegisteredTool
+from toolregistry import CatalogSnapshot
+from toolindex import ToolIndex
+from lexicalindex import BM25Index, hybrid_scores
+from embeddingcache import EmbeddingCache, CachedEmbeddings, embed_query_cached, embed_matrix
+from lrucache import LRUCache
+from rwlock import ReadWriteLock
 import numpy as np
 
 def cosine_similarity(vec1, vec2) -> float:
@@ -18,35 +24,143 @@ class ToolSelector:
         - Group relevant tools by their provider
     """
     
-    def __init__(self):
-        self.embedding: OpenAIEmbeddings = OpenAIEmbeddings()
-        # self.tools: dict[str, set[str]] = {} Not sure yet if this should be a returned value or a part of state
+    def __init__(self, embedding_cache: EmbeddingCache = None, index_mode: str = "exact", embedding: Embeddings = None,
+                 prefilter: int = None, hybrid_weight: float = 0.0, index_dtype: str = "float32",
+                 query_cache: LRUCache = None, index_options: dict = None):
+        self.embedding: Embeddings = embedding or load_embeddings()
+        if embedding_cache is not None:
+            self.embedding = CachedEmbeddings(self.embedding, embedding_cache)
+        # Tool descriptions are embedded once, on registration, and kept as rows of a normalized matrix
+        # index_dtype="float16"/"int8" trades a little precision for 2-4x less memory per tool.
+        # index_options are passed to the ToolIndex, e.g. {"nprobe": 32, "ef_search": 128, "min_ann_size": 5000}
+        self.index_options: dict = dict(index_options or {})
+        self.index: ToolIndex = ToolIndex(mode=index_mode, dtype=index_dtype, **self.index_options)
+        # If prefilter is set, only the prefilter best BM25 matches of a query are scored by embedding similarity.
+        # hybrid_weight mixes the BM25 score into the returned similarity.
+        self.lexical_index: BM25Index = BM25Index()
+        self.prefilter: int | None = prefilter
+        self.hybrid_weight: float = hybrid_weight
+        self.tools: dict[str, RegisteredTool] = {}
+        # Bumped on every change to the index, so a snapshot found to hold exactly the indexed tools is only checked once
+        self._generation: int = 0
+        self._matching_catalog: tuple[int, int] | None = None
+        # Adding and removing tools changes the index, the lexical index and tools together, so it excludes searches
+        self._index_lock: ReadWriteLock = ReadWriteLock()
+        # In-memory cache of query embeddings, may be shared with other pipeline stages
+        self.query_cache: LRUCache | None = query_cache
 
-    
-    def get_similarities(self, query: str, tools: set[RegisteredTool]) -> dict[RegisteredTool, float]:
+    def add_tool(self, tool: RegisteredTool):
+        """
+        Embeds the tool description and adds it to the index.
+        Re-adding the same tool is a no-op, re-adding a tool with the same name replaces it.
+        """
+        self.add_tools([tool])
+
+    def add_tools(self, tools: list[RegisteredTool]):
+        """
+        Embeds the descriptions of several tools in one request and adds them to the index.
+        """
+        new_tools = [tool for tool in tools if self.tools.get(tool.get_name()) is not tool]
+        if not new_tools:
+            return
+        self.add_embedded_tools(new_tools, embed_matrix(self.embedding, [tool.get_description() for tool in new_tools]))
+
+    def add_embedded_tools(self, tools: list[RegisteredTool], vectors, normalized: bool = False):
+        """
+        Adds tools whose description embeddings were computed ahead of time, e.g. by a compiled catalog (see catalogartifact)
+
+        params:
+            tools: The tools to add
+            vectors: One description embedding per tool
+            normalized: Whether the embeddings are already unit length, which lets the index use them without a copy
+        """
+        with self._index_lock.write():
+            self.index.add_many([tool.get_name() for tool in tools], vectors, normalized)
+            for tool in tools:
+                # The lexical index is only read when prefiltering
+                if self.prefilter is not None:
+                    self.lexical_index.add(tool.get_name(), tool.document())
+                self.tools[tool.get_name()] = tool
+            self._generation += 1
+
+    def remove_tool(self, name: str):
+        """
+        Removes a tool from the index by name
+        """
+        with self._index_lock.write():
+            self.tools.pop(name, None)
+            self.index.remove(name)
+            self.lexical_index.remove(name)
+            self._generation += 1
+
+    def get_similarities(self, query: str, tools: set[RegisteredTool] | CatalogSnapshot = None,
+                         top_k: int = None) -> dict[RegisteredTool, float]:
         """
         Uses vector embeddings to get a numerical representation of simalirities between each tools description and the user prompt
 
         params:
             Relevant User query/task
             - Example Query: I would like to buy some donuts
-            List of RegisteredTools to examine
+            List of RegisteredTools to examine. Defaults to every indexed tool; tools that are not yet indexed get added.
+            A CatalogSnapshot is only read, its tools that are no longer indexed are left out.
+            top_k: If given, only the top_k most similar tools are scored and returned, using the index's search mode
+            With a prefilter, only the tools among the best BM25 matches are scored and returned. Queries with no
+            lexical match fall back to scoring every tool.
 
         returns:
             A dictionary mapping tool names to their similarity scores
         """
-        # NOTE: In the future, we may want to implement FAISS embedding
-        result: dict[str, float] = {}
-        query_embedding = self.embedding.embed_query(query)
-                    
-        for tool in tools:
-            description_embedding = self.embedding.embed_query(tool.get_description())
-            similarity = cosine_similarity(query_embedding, description_embedding)
-            result[tool] = similarity
-        
-        return result
+        version = None
+        if tools is None:
+            tools = set(self.tools.values())
+        if isinstance(tools, CatalogSnapshot):
+            names = tools.by_name
+            version = tools.version
+        else:
+            self.add_tools(list(tools))
+            names = {tool.get_name(): tool for tool in tools}
+
+        query_embedding = embed_query_cached(self.embedding, query, self.query_cache)
+        result: dict[RegisteredTool, float] = {}
+        with self._index_lock.read():
+            allowed = self.__allowed(names, version)
+
+            lexical: dict[str, float] = {}
+            if self.prefilter is not None:
+                lexical = dict(self.lexical_index.search(query, self.prefilter, allowed))
+            if lexical:
+                scored = self.index.search(query_embedding, len(lexical), set(lexical))[0]
+                for name, score in hybrid_scores(scored, lexical, self.hybrid_weight)[:top_k]:
+                    result[names[name]] = score
+                return result
+
+            if top_k is not None:
+                for name, score in self.index.search(query_embedding, top_k, allowed)[0]:
+                    result[names[name]] = score
+                return result
+
+            scores = self.index.scores(query_embedding)
+            for name, tool in names.items():
+                row = self.index.rows.get(name)
+                if row is not None:
+                    result[tool] = float(scores[row])
+
+            return result
+
+    def __allowed(self, names: dict[str, RegisteredTool], version: int | None) -> set[str] | None:
+        """
+        Returns the names searches must be restricted to, or None when the index holds exactly the catalog's tools.
+        Must be called under the index lock.
+        """
+        if version is not None and self._matching_catalog == (version, self._generation):
+            return None
+        if len(names) != len(self.tools) or any(name not in self.tools for name in names):
+            return set(names)
+        if version is not None:
+            self._matching_catalog = (version, self._generation)
+        return None
     
-    def filter_tools(self, similarities: dict[str, float], threshold = 0.83) -> set[StructuredTool]:
+    def filter_tools(self, similarities: dict[str, float], threshold = 0.83) -> set[RegisteredTool]:
         """
         Filters out the tools based on their similarity scores, removing any that don't meet a certain threshold. 
         By default, the threshold will be 0.83
@@ -72,10 +186,13 @@ class ToolSelector:
         return:
             A dictionary mapping providers and their associated tool's
         """
+        if isinstance(tools, CatalogSnapshot):
+            return {provider: set(group) for provider, group in tools.by_provider.items()}
+
         result: dict[str, set[RegisteredTool]] = {}
         
         for tool in tools:
-            result[tool.provider] = result.get(tool.provider, set()).union({tool})
+            result.setdefault(tool.provider, set()).add(tool)
         
         return result
             